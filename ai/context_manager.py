@@ -0,0 +1,195 @@
+# ========================================
+# AI 학습 도우미 - 대화 맥락 관리 (토큰 예산)
+# ========================================
+# 긴 대화에서 매번 전체 기록을 보내지 않도록 맥락을 줄여줍니다.
+# - 시스템 프롬프트 + 최근 대화는 그대로 보내고,
+# - 예산을 넘는 오래된 대화는 "이전 대화 요약" 한 개로 바꿉니다.
+# - 요약은 대화 앞부분(접두부) 해시로 캐시하고,
+#   대화가 길어지면 이전 요약 + 새로 밀려난 대화만 다시 요약합니다 (점진적 갱신).
+# 요약 호출은 deepseek_handler가 넘겨주는 함수로 합니다 (순환 import 방지).
+# ========================================
+
+import hashlib
+import json
+import re
+import threading
+from collections import OrderedDict
+
+import config
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[AI-CONTEXT-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 예산을 넘으면 최근 대화를 예산의 이 비율까지만 남깁니다 (매 턴 요약을 다시 하지 않도록 여유 확보)
+RECENT_RATIO = 0.6
+# 요약 길이 (토큰)
+SUMMARY_MAX_TOKENS = 400
+# 메시지 하나당 역할/구분자 등 부가 토큰
+MESSAGE_OVERHEAD_TOKENS = 4
+# 캐시할 요약 개수
+SUMMARY_CACHE_SIZE = 512
+
+SUMMARY_PROMPT = (
+    "다음은 학생/교사와 AI의 이전 대화입니다. 이후 대화를 이어가는 데 필요한 내용만 한국어로 간결하게 요약하세요. "
+    "사용자의 학년/목표/질문 주제, 이미 설명한 개념, 합의한 결론, 아직 남은 질문을 빠짐없이 포함하고, "
+    "인사말이나 불필요한 표현은 빼세요."
+)
+
+
+_HANGUL_RE = re.compile(r"[가-힣ㄱ-ㅎㅏ-ㅣ]")
+
+_summaries: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_stats = {'trimmed': 0, 'summaries': 0, 'summary_reused': 0, 'summary_failed': 0}
+
+
+def count_tokens(text: str) -> int:
+    """토큰 수 추정 (한글은 글자당 약 1토큰, 그 외는 약 4글자당 1토큰)"""
+    text = text or ""
+    hangul = len(_HANGUL_RE.findall(text))
+    return hangul + (len(text) - hangul + 3) // 4
+
+
+def message_tokens(message: dict) -> int:
+    return count_tokens(message.get('content') or "") + MESSAGE_OVERHEAD_TOKENS
+
+
+def _prefix_hashes(messages: list[dict]) -> list[str]:
+    """hashes[i] = 앞에서부터 i개 메시지의 해시 (hashes[0]은 빈 접두부)"""
+    hashes = [""]
+    h = hashlib.sha256()
+    for m in messages:
+        h.update(json.dumps([m.get('role'), m.get('content')], ensure_ascii=False).encode('utf-8'))
+        hashes.append(h.copy().hexdigest())
+    return hashes
+
+
+def _summary_get(key: str) -> str | None:
+    with _lock:
+        if key in _summaries:
+            _summaries.move_to_end(key)
+            return _summaries[key]
+    return None
+
+
+def _summary_put(key: str, summary: str):
+    with _lock:
+        _summaries[key] = summary
+        _summaries.move_to_end(key)
+        while len(_summaries) > SUMMARY_CACHE_SIZE:
+            _summaries.popitem(last=False)
+
+
+def _transcript(messages: list[dict]) -> str:
+    names = {'user': '사용자', 'assistant': 'AI', 'system': '참고'}
+    return "\n".join(f"{names.get(m.get('role'), m.get('role'))}: {m.get('content') or ''}" for m in messages)
+
+
+def _summarize(summarize_fn, previous: str | None, messages: list[dict]) -> str | None:
+    """이전 요약 + 새로 밀려난 대화를 하나의 요약으로"""
+    body = _transcript(messages)
+    if previous:
+        body = f"[지금까지의 요약]\n{previous}\n\n[이어진 대화]\n{body}"
+    try:
+        return summarize_fn([
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": body},
+        ], SUMMARY_MAX_TOKENS)
+    except Exception as e:
+        debug_print(f"대화 요약 오류: {str(e)}", "ERROR")
+        return None
+
+
+def _summary_message(summary: str) -> dict:
+    return {"role": "system", "content": f"이전 대화 요약 (오래된 대화는 이 요약으로 대신합니다):\n{summary}"}
+
+
+def build_context(system_prompt: str, messages: list[dict], budget: int | None = None, summarize_fn=None) -> list[dict]:
+    """
+    API로 보낼 메시지 목록을 토큰 예산 안으로 맞춥니다.
+
+    매개변수:
+        system_prompt: 시스템 프롬프트
+        messages: 전체 대화 [{"role", "content"}]
+        budget: 입력 토큰 예산 (기본: LLM_CONTEXT_TOKENS)
+        summarize_fn: (messages, max_tokens) → 요약 텍스트. 없으면 오래된 대화는 잘라냅니다.
+
+    반환값:
+        [시스템 프롬프트, (이전 대화 요약), 최근 대화...]
+    """
+    budget = budget or config.LLM_CONTEXT_TOKENS
+    head = [{"role": "system", "content": system_prompt}]
+    if not messages:
+        # 대화가 없으면 자를 것도 없음 (시스템 프롬프트만으로 예산을 넘어도 그대로 보냄)
+        return head
+    sizes = [message_tokens(m) for m in messages]
+    fixed = message_tokens(head[0])
+    if fixed + sum(sizes) <= budget:
+        return head + list(messages)
+
+    hashes = _prefix_hashes(messages)
+    n = len(messages)
+
+    def fits(cut: int, summary: str | None) -> bool:
+        extra = count_tokens(summary) + MESSAGE_OVERHEAD_TOKENS if summary else 0
+        return fixed + extra + sum(sizes[cut:]) <= budget
+
+    # 1) 이미 만든 요약 중 지금도 예산에 맞는 것이 있으면 그대로 사용 (LLM 호출 없음)
+    #    최근 대화를 가장 많이 남기는(잘라내는 지점이 가장 앞인) 요약부터 봅니다
+    for cut in range(1, n):
+        summary = _summary_get(hashes[cut])
+        if summary is not None and fits(cut, summary):
+            with _lock:
+                _stats['summary_reused'] += 1
+            return head + [_summary_message(summary)] + list(messages[cut:])
+
+    # 2) 최근 대화를 예산의 RECENT_RATIO까지만 남기고 그 앞은 요약 (마지막 메시지는 항상 유지)
+    target = max(0, int(budget * RECENT_RATIO) - fixed - SUMMARY_MAX_TOKENS)
+    cut, used = n - 1, sizes[-1]
+    while cut > 0 and used + sizes[cut - 1] <= target:
+        cut -= 1
+        used += sizes[cut]
+    with _lock:
+        _stats['trimmed'] += 1
+
+    if summarize_fn is not None and cut > 0:
+        # 가장 긴 캐시된 접두부 요약에서 이어서 요약합니다
+        base = 0
+        previous = None
+        for j in range(cut, 0, -1):
+            previous = _summary_get(hashes[j])
+            if previous is not None:
+                base = j
+                break
+        summary = _summarize(summarize_fn, previous, messages[base:cut])
+        if summary:
+            _summary_put(hashes[cut], summary)
+            with _lock:
+                _stats['summaries'] += 1
+            debug_print(f"오래된 대화 {cut}개를 요약으로 대체 (이전 요약 재사용: {base}개)", "INFO")
+            return head + [_summary_message(summary)] + list(messages[cut:])
+        with _lock:
+            _stats['summary_failed'] += 1
+
+    # 요약할 수 없으면 오래된 대화를 잘라냅니다
+    return head + list(messages[cut:])
+
+
+def get_context_stats() -> dict:
+    """
+    맥락 관리 통계
+
+    반환값:
+        {'trimmed', 'summaries', 'summary_reused', 'summary_failed', 'cached_summaries'}
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['cached_summaries'] = len(_summaries)
+    return stats
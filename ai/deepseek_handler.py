@@ -7,13 +7,21 @@
 # DeepSeek는 OpenAI와 비슷한 방식으로 사용할 수 있어요.
 # - 환경 변수에 DEEPSEEK_API_KEY가 있어야 합니다.
 # - (선택) DEEPSEEK_BASE_URL을 설정하면 커스텀 엔드포인트를 쓸 수 있어요.
+# - 실제 호출은 LLM 게이트웨이(ai/llm_gateway.py)를 거칩니다
+#   (동시 요청 제한, 속도 제한, 같은 요청 합치기).
+# - 일시적 오류는 ai/resilience.py가 자동으로 재시도하고,
+#   스트리밍이 끊기면 받은 부분 뒤부터 이어서 받습니다.
 # ========================================
 
 import os
+from contextlib import closing
+
 import streamlit as st
 from openai import OpenAI, APIError, RateLimitError, APITimeoutError
 
 import config
+from ai import response_cache, llm_gateway, resilience
+from ai.context_manager import build_context
 from ai.prompts import build_system_prompt
 
 
@@ -50,6 +58,22 @@ def get_client() -> OpenAI | None:
     return _client
 
 
+MODEL_NAME = "deepseek-chat"
+
+
+def _summarize_messages(messages: list[dict], max_tokens: int) -> str | None:
+    """대화 요약용 단순 호출 (맥락 관리자가 사용)"""
+    if not get_client():
+        return None
+    content = resilience.call(lambda timeout: llm_gateway.complete(messages, MODEL_NAME, 0.3, max_tokens, timeout=timeout))
+    return content.strip() or None
+
+
+def _build_messages(system_prompt: str, conversation_messages: list[dict]) -> list[dict]:
+    """시스템 프롬프트 + 대화를 토큰 예산(LLM_CONTEXT_TOKENS) 안으로 맞춘 메시지 목록"""
+    return build_context(system_prompt, conversation_messages, summarize_fn=_summarize_messages)
+
+
 # ========================================
 # 채팅 응답 생성
 # ========================================
@@ -82,25 +106,32 @@ def generate_chat_response(
         system_prompt = build_system_prompt(category, grade, is_teacher)
         debug_print(f"시스템 프롬프트 준비 완료 (category={category}, grade={grade})", "INFO")
         
-        # OpenAI 호환 Chat Completions
-        messages = [{"role": "system", "content": system_prompt}] + conversation_messages
+        # OpenAI 호환 Chat Completions (긴 대화는 오래된 부분을 요약으로 대체)
+        messages = _build_messages(system_prompt, conversation_messages)
         
         # 모델 이름: DeepSeek에서 제공하는 최신 모델명을 사용하세요.
         # 여기서는 예시로 'deepseek-chat'을 사용합니다.
         temp = 0.7 if temperature is None else float(temperature)
         tokens = 800 if max_tokens is None else int(max_tokens)
-        completion = client.chat.completions.create(
-            model="deepseek-chat",
-            messages=messages,
-            temperature=temp,
-            max_tokens=tokens,
-        )
-        
-        content = completion.choices[0].message.content.strip()
+        # (선택) 완전히 같은 요청이면 저장된 답변 사용
+        cache_key = response_cache.make_key(MODEL_NAME, messages, temp, tokens) if response_cache.is_enabled() else None
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                debug_print("AI 응답 캐시 적중", "INFO")
+                return True, cached
+        content = resilience.call(
+            lambda timeout: llm_gateway.complete(messages, MODEL_NAME, temp, tokens, timeout=timeout)
+        ).strip()
+        if cache_key:
+            response_cache.put(cache_key, content)
         debug_print("AI 응답 생성 성공", "SUCCESS")
         return True, content
     
-    except (RateLimitError, APITimeoutError) as e:
+    except resilience.CircuitOpenError as e:
+        debug_print(f"AI 호출 차단 (서킷 브레이커): {str(e)}", "ERROR")
+        return False, "AI 서버가 불안정해서 잠시 요청을 멈췄어요. 조금 뒤에 다시 시도해주세요."
+    except (RateLimitError, APITimeoutError, TimeoutError) as e:
         debug_print(f"AI 속도 제한 또는 시간 초과: {str(e)}", "ERROR")
         return False, "AI가 잠시 바쁜가 봐요. 잠시 후 다시 시도해주세요."
     except APIError as e:
@@ -134,32 +165,51 @@ def stream_chat_response(
         return
 
     system_prompt = build_system_prompt(category, grade, is_teacher)
-    messages = [{"role": "system", "content": system_prompt}] + conversation_messages
+    parts = []
 
     try:
+        # 긴 대화는 오래된 부분을 요약으로 대체해 토큰 예산 안으로 맞춥니다
+        messages = _build_messages(system_prompt, conversation_messages)
         temp = 0.7 if temperature is None else float(temperature)
         tokens = 800 if max_tokens is None else int(max_tokens)
-        for chunk in client.chat.completions.create(
-            model="deepseek-chat",
-            messages=messages,
-            temperature=temp,
-            max_tokens=tokens,
-            stream=True,
-        ):
-            try:
-                delta = chunk.choices[0].delta
-                if delta and getattr(delta, "content", None):
-                    yield delta.content
-            except Exception:
-                # 조용히 건너뜀 (일부 이벤트 타입은 delta가 없음)
-                continue
-    except (RateLimitError, APITimeoutError) as e:
+        # (선택) 완전히 같은 요청이면 저장된 답변을 스트림처럼 다시 내보냄
+        cache_key = response_cache.make_key(MODEL_NAME, messages, temp, tokens) if response_cache.is_enabled() else None
+        if cache_key:
+            cached = response_cache.get(cache_key)
+            if cached is not None:
+                debug_print("AI 응답 캐시 적중 (stream)", "INFO")
+                yield from response_cache.replay(cached)
+                return
+
+        def _open(request_messages, request_tokens, timeout):
+            return llm_gateway.stream(request_messages, MODEL_NAME, temp, request_tokens, timeout=timeout)
+
+        # 도중에 끊기면 받은 부분은 그대로 두고 이어서 받습니다
+        # (읽는 쪽이 그만두면 닫혀서 게이트웨이 호출까지 취소됩니다)
+        with closing(resilience.stream(_open, messages, tokens)) as chunks:
+            for text in chunks:
+                parts.append(text)
+                yield text
+        # 끝까지 정상으로 받은 답변만 저장 (오류 안내 문구/중단된 스트림은 저장하지 않음)
+        if cache_key:
+            response_cache.put(cache_key, "".join(parts))
+    except resilience.CircuitOpenError as e:
+        debug_print(f"AI 호출 차단 (서킷 브레이커, stream): {str(e)}", "ERROR")
+        yield _stream_error(parts, "AI 서버가 불안정해서 잠시 요청을 멈췄어요. 조금 뒤에 다시 시도해주세요.")
+    except (RateLimitError, APITimeoutError, TimeoutError) as e:
         debug_print(f"AI 속도 제한/시간 초과 (stream): {str(e)}", "ERROR")
-        yield "AI가 잠시 바쁜가 봐요. 잠시 후 다시 시도해주세요."
+        yield _stream_error(parts, "AI가 잠시 바쁜가 봐요. 잠시 후 다시 시도해주세요.")
     except APIError as e:
         debug_print(f"AI API 오류 (stream): {str(e)}", "ERROR")
-        yield "AI 요청 중 문제가 발생했어요."
+        yield _stream_error(parts, "AI 요청 중 문제가 발생했어요.")
     except Exception as e:
         debug_print(f"알 수 없는 오류 (stream): {str(e)}", "ERROR")
-        yield "AI 처리 중 알 수 없는 오류가 발생했어요."
+        yield _stream_error(parts, "AI 처리 중 알 수 없는 오류가 발생했어요.")
+
+
+def _stream_error(parts: list[str], message: str) -> str:
+    """이미 일부를 보여줬으면 그 뒤에 끊겼다는 안내를 붙입니다"""
+    if parts:
+        return f"\n\n(답변이 중간에 끊겼어요. {message})"
+    return message
 
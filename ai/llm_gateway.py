@@ -0,0 +1,355 @@
+#pip install openai
+
+# ========================================
+# AI 학습 도우미 - LLM 게이트웨이 (비동기)
+# ========================================
+# 모든 DeepSeek 호출을 한 곳에서 관리합니다.
+# - 전용 스레드의 asyncio 루프 + AsyncOpenAI 클라이언트 하나를 프로세스가 공유
+# - 동시 요청 수 제한(LLM_MAX_CONCURRENCY) + 토큰 버킷 속도 제한(LLM_RATE_PER_MINUTE)
+#   → 반 전체가 동시에 "보내기"를 눌러도 순서대로 처리되어 RateLimitError 폭주를 막습니다
+# - 완전히 같은 요청이 동시에 들어오면 업스트림 호출 하나를 함께 씁니다 (스트림도 공유)
+# - 마감 시간이 지난 요청은 대기열에서 버리고, 기다리던 쪽이 모두 떠난 호출은 취소합니다
+#   (느려졌을 때 아무도 받지 않을 요청이 업스트림으로 나가 대기열이 불어나지 않게)
+# - 대기열 길이/대기 시간 등은 get_gateway_stats()로 확인할 수 있습니다
+# Streamlit 스크립트 스레드에서는 complete()/stream() 동기 함수만 쓰면 됩니다.
+# ========================================
+
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+
+import config
+from ai import response_cache
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[LLM-GATEWAY-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 대기 시간 통계에 보관할 최근 요청 수
+WAIT_WINDOW = 500
+
+
+class _TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷"""
+
+    def __init__(self, rate_per_second: float, burst: int):
+        self.rate = rate_per_second
+        self.capacity = max(1, burst)
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class _SharedStream:
+    """
+    여러 구독자가 함께 읽는 스트림 (늦게 합류한 구독자는 앞부분부터 다시 받음)
+    루프 스레드가 조각을 넣고, 스크립트 스레드들이 읽습니다.
+    """
+
+    def __init__(self):
+        self.chunks: list[str] = []
+        self.done = False
+        self.error: BaseException | None = None
+        self.cond = threading.Condition()
+
+    def push(self, text: str):
+        with self.cond:
+            self.chunks.append(text)
+            self.cond.notify_all()
+
+    def finish(self, error: BaseException | None = None):
+        with self.cond:
+            self.done = True
+            self.error = error
+            self.cond.notify_all()
+
+    def read(self, timeout: float):
+        i = 0
+        while True:
+            with self.cond:
+                if not self.cond.wait_for(lambda: i < len(self.chunks) or self.done, timeout=timeout):
+                    raise TimeoutError("AI 응답 대기 시간이 초과되었습니다.")
+                pending = self.chunks[i:]
+                finished, error = self.done, self.error
+            for text in pending:
+                yield text
+            i += len(pending)
+            if finished and i >= len(self.chunks):
+                if error is not None:
+                    raise error
+                return
+
+
+_loop = None
+_loop_thread = None
+_loop_lock = threading.Lock()
+_client = None
+_semaphore = None
+_bucket = None
+
+_inflight_complete: dict[str, dict] = {}  # key -> {'future', 'waiters'}
+_inflight_stream: dict[str, dict] = {}    # key -> {'future', 'shared', 'waiters'}
+_inflight_lock = threading.Lock()
+
+_stats_lock = threading.Lock()
+_stats = {'requests': 0, 'upstream_calls': 0, 'coalesced': 0, 'errors': 0, 'expired': 0, 'cancelled': 0,
+          'waiting': 0, 'in_flight': 0}
+_waits: deque = deque(maxlen=WAIT_WINDOW)
+
+
+def _ensure_loop():
+    """게이트웨이 이벤트 루프 스레드 시작 (한 번만)"""
+    global _loop, _loop_thread
+    if _loop is not None:
+        return _loop
+    with _loop_lock:
+        if _loop is None:
+            loop = asyncio.new_event_loop()
+
+            async def _init():
+                global _semaphore, _bucket
+                _semaphore = asyncio.Semaphore(max(1, config.LLM_MAX_CONCURRENCY))
+                _bucket = _TokenBucket(max(1, config.LLM_RATE_PER_MINUTE) / 60.0, config.LLM_RATE_BURST)
+
+            _loop_thread = threading.Thread(target=loop.run_forever, name="llm-gateway", daemon=True)
+            _loop_thread.start()
+            asyncio.run_coroutine_threadsafe(_init(), loop).result()
+            _loop = loop
+            debug_print("LLM 게이트웨이 시작", "INFO")
+    return _loop
+
+
+def _get_async_client():
+    """AsyncOpenAI 클라이언트 (루프 스레드에서만 사용)"""
+    global _client
+    if _client is None:
+        from openai import AsyncOpenAI
+
+        base_url = os.getenv("DEEPSEEK_BASE_URL", "https://api.deepseek.com")
+        # 재시도는 게이트웨이 바깥(호출 측)에서 결정합니다
+        _client = AsyncOpenAI(api_key=config.DEEPSEEK_API_KEY, base_url=base_url, max_retries=0)
+    return _client
+
+
+async def _acquire():
+    await _semaphore.acquire()
+    try:
+        await _bucket.acquire()
+    except BaseException:
+        _semaphore.release()
+        raise
+
+
+async def _admit(submitted: float, expires_at: float) -> float:
+    """
+    동시 실행 자리 + 속도 제한 토큰을 얻을 때까지 대기 (마감 시간까지만)
+
+    반환값:
+        업스트림 호출에 쓸 남은 시간(초). 마감 시간이 지나면 TimeoutError
+    """
+    with _stats_lock:
+        _stats['waiting'] += 1
+    try:
+        await asyncio.wait_for(_acquire(), timeout=max(0.0, expires_at - time.monotonic()))
+    except asyncio.TimeoutError:
+        with _stats_lock:
+            _stats['expired'] += 1
+        raise TimeoutError("AI 요청 대기열에서 마감 시간이 지났습니다.") from None
+    finally:
+        with _stats_lock:
+            _stats['waiting'] -= 1
+    remaining = expires_at - time.monotonic()
+    if remaining <= 0:
+        _semaphore.release()
+        with _stats_lock:
+            _stats['expired'] += 1
+        raise TimeoutError("AI 요청 대기열에서 마감 시간이 지났습니다.")
+    with _stats_lock:
+        _stats['in_flight'] += 1
+        _stats['upstream_calls'] += 1
+        _waits.append((time.perf_counter() - submitted) * 1000)
+    return remaining
+
+
+def _release():
+    _semaphore.release()
+    with _stats_lock:
+        _stats['in_flight'] -= 1
+
+
+async def _complete(request: dict, submitted: float, expires_at: float) -> str:
+    remaining = await _admit(submitted, expires_at)
+    try:
+        completion = await _get_async_client().chat.completions.create(timeout=remaining, **request)
+        return completion.choices[0].message.content or ""
+    finally:
+        _release()
+
+
+async def _stream(request: dict, shared: _SharedStream, submitted: float, expires_at: float):
+    error = None
+    try:
+        remaining = await _admit(submitted, expires_at)
+        try:
+            response = await _get_async_client().chat.completions.create(stream=True, timeout=remaining, **request)
+            async for chunk in response:
+                try:
+                    delta = chunk.choices[0].delta
+                    if delta and getattr(delta, "content", None):
+                        shared.push(delta.content)
+                except Exception:
+                    # 일부 이벤트 타입은 delta가 없음
+                    continue
+        finally:
+            _release()
+    except asyncio.CancelledError as e:
+        # 읽는 쪽이 모두 떠나 취소됨 (오류로 세지 않음)
+        error = e
+        raise
+    except BaseException as e:
+        error = e
+        with _stats_lock:
+            _stats['errors'] += 1
+    finally:
+        shared.finish(error)
+
+
+def _request(messages: list[dict], model: str, temperature: float, max_tokens: int) -> tuple[str, dict]:
+    key = response_cache.make_key(model, messages, temperature, max_tokens)
+    return key, {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens}
+
+
+def _leave(registry: dict, key: str, entry: dict):
+    """
+    기다리던 쪽 하나가 떠남. 마지막이었고 호출이 아직 안 끝났으면 취소합니다
+    (대기열에 있으면 업스트림으로 나가지 않고, 스트리밍 중이면 연결을 끊음)
+    """
+    with _inflight_lock:
+        entry['waiters'] -= 1
+        if entry['waiters'] > 0 or entry['future'].done():
+            return
+        # 취소한 호출에 새 요청이 합류하지 않도록 먼저 목록에서 뺍니다
+        if registry.get(key) is entry:
+            del registry[key]
+    if entry['future'].cancel():
+        with _stats_lock:
+            _stats['cancelled'] += 1
+
+
+def complete(messages: list[dict], model: str, temperature: float, max_tokens: int, timeout: float | None = None) -> str:
+    """
+    응답 전체를 받아 반환합니다 (동기 호출, 스크립트 스레드용)
+    같은 요청이 이미 진행 중이면 그 결과를 함께 받습니다. OpenAI 예외는 그대로 전달됩니다.
+    timeout: 남은 마감 시간(초, 기본 LLM_REQUEST_TIMEOUT). 대기열에서 이 시간을 넘기면
+    업스트림으로 보내지 않고 버립니다. (함께 받는 요청은 처음 보낸 쪽의 마감 시간을 따름)
+    """
+    loop = _ensure_loop()
+    timeout = timeout or config.LLM_REQUEST_TIMEOUT
+    key, request = _request(messages, model, temperature, max_tokens)
+    with _inflight_lock:
+        with _stats_lock:
+            _stats['requests'] += 1
+        entry = _inflight_complete.get(key)
+        if entry is not None:
+            entry['waiters'] += 1
+            with _stats_lock:
+                _stats['coalesced'] += 1
+        else:
+            expires_at = time.monotonic() + timeout
+            future = asyncio.run_coroutine_threadsafe(_complete(request, time.perf_counter(), expires_at), loop)
+            entry = _inflight_complete[key] = {'future': future, 'waiters': 1}
+
+            def _forget(f, key=key, entry=entry):
+                with _inflight_lock:
+                    if _inflight_complete.get(key) is entry:
+                        del _inflight_complete[key]
+                if not f.cancelled() and f.exception() is not None:
+                    with _stats_lock:
+                        _stats['errors'] += 1
+
+            future.add_done_callback(_forget)
+    try:
+        return entry['future'].result(timeout=timeout)
+    finally:
+        _leave(_inflight_complete, key, entry)
+
+
+def stream(messages: list[dict], model: str, temperature: float, max_tokens: int, timeout: float | None = None):
+    """
+    응답 조각을 순서대로 내보내는 제너레이터 (스크립트 스레드용)
+    같은 요청이 이미 스트리밍 중이면 같은 업스트림 스트림을 처음부터 함께 읽습니다.
+    timeout: 남은 마감 시간(초, 기본 LLM_REQUEST_TIMEOUT). 대기열에서 이 시간을 넘기면
+    업스트림으로 보내지 않고 버립니다. (함께 읽는 요청은 처음 보낸 쪽의 마감 시간을 따름)
+    """
+    loop = _ensure_loop()
+    timeout = timeout or config.LLM_REQUEST_TIMEOUT
+    key, request = _request(messages, model, temperature, max_tokens)
+    with _inflight_lock:
+        with _stats_lock:
+            _stats['requests'] += 1
+        entry = _inflight_stream.get(key)
+        if entry is not None:
+            entry['waiters'] += 1
+            with _stats_lock:
+                _stats['coalesced'] += 1
+        else:
+            shared = _SharedStream()
+            expires_at = time.monotonic() + timeout
+            future = asyncio.run_coroutine_threadsafe(_stream(request, shared, time.perf_counter(), expires_at), loop)
+            entry = _inflight_stream[key] = {'future': future, 'shared': shared, 'waiters': 1}
+
+            def _forget(_, key=key, entry=entry):
+                with _inflight_lock:
+                    if _inflight_stream.get(key) is entry:
+                        del _inflight_stream[key]
+
+            future.add_done_callback(_forget)
+    # 다른 구독자가 남아 있으면 업스트림은 계속 받고, 마지막 구독자가 그만 읽으면(닫기/시간 초과) 취소합니다
+    try:
+        yield from entry['shared'].read(timeout)
+    finally:
+        _leave(_inflight_stream, key, entry)
+
+
+def get_gateway_stats() -> dict:
+    """
+    게이트웨이 통계
+
+    반환값:
+        {'requests', 'upstream_calls', 'coalesced', 'errors',
+         'expired'(대기열에서 마감 시간 초과), 'cancelled'(기다리던 쪽이 모두 떠나 취소),
+         'queue_depth'(자리/속도 제한 대기 중), 'in_flight',
+         'wait_ms': {'avg', 'p50', 'p95'}}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+        waits = sorted(_waits)
+    stats['queue_depth'] = stats.pop('waiting')
+    if waits:
+        stats['wait_ms'] = {
+            'avg': round(sum(waits) / len(waits), 1),
+            'p50': round(waits[len(waits) // 2], 1),
+            'p95': round(waits[min(len(waits) - 1, int(len(waits) * 0.95))], 1),
+        }
+    else:
+        stats['wait_ms'] = {'avg': 0.0, 'p50': 0.0, 'p95': 0.0}
+    return stats
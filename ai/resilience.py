@@ -0,0 +1,331 @@
+#pip install openai
+
+# ========================================
+# AI 학습 도우미 - AI 호출 복원력 (재시도/마감 시간/서킷 브레이커)
+# ========================================
+# 일시적인 오류(속도 제한, 시간 초과, 연결 끊김, 5xx)는 사용자에게 바로 사과 문구를
+# 보여주지 않고 조금 기다렸다가 자동으로 다시 시도합니다.
+# - 요청마다 마감 시간(Deadline)을 정하고, 남은 시간만 다음 시도에 넘깁니다
+# - 재시도 대기: 지수 증가 + 무작위 지터 (Retry-After 헤더가 있으면 따름)
+# - 재시도 예산: 최근 1분 요청 수 대비 재시도 비율 제한 (장애 때 부하 폭증 방지)
+# - 서킷 브레이커: 연속 실패가 쌓이면 잠시 동안 바로 실패 처리 후 한 번씩 시험 호출
+# - 스트리밍 도중 끊기면 이미 받은 부분은 두고, 그 뒤부터 이어서 쓰도록 다시 요청
+# ========================================
+
+import random
+import threading
+import time
+from collections import deque
+from contextlib import closing
+
+from openai import APIConnectionError, APIStatusError, APITimeoutError, RateLimitError
+
+import config
+from ai.context_manager import count_tokens
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[AI-RESILIENCE-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 재시도 예산을 계산하는 구간(초)과, 요청이 적을 때도 허용할 최소 재시도 수
+RETRY_WINDOW_SECONDS = 60
+RETRY_BUDGET_MIN = 3
+# 이어쓰기 요청에 남겨 둘 최소 출력 토큰
+RESUME_MIN_TOKENS = 64
+
+RESUME_PROMPT = (
+    "방금 답변이 네트워크 문제로 중간에 끊겼어요. 이미 쓴 부분은 반복하지 말고, "
+    "끊긴 지점의 바로 다음 글자부터 자연스럽게 이어서 끝까지 작성해 주세요."
+)
+
+
+class CircuitOpenError(Exception):
+    """서킷 브레이커가 열려 있어 호출하지 않고 바로 실패한 경우"""
+
+
+class Deadline:
+    """요청 하나의 마감 시간 (재시도/이어쓰기 전체에 걸쳐 공유)"""
+
+    def __init__(self, seconds: float):
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return self.remaining() <= 0
+
+
+class _RetryBudget:
+    """최근 구간의 요청 수 대비 재시도 수를 제한"""
+
+    def __init__(self):
+        self.requests: deque = deque()
+        self.retries: deque = deque()
+        self.lock = threading.Lock()
+
+    def _trim(self, now: float):
+        for q in (self.requests, self.retries):
+            while q and now - q[0] > RETRY_WINDOW_SECONDS:
+                q.popleft()
+
+    def record_request(self):
+        now = time.monotonic()
+        with self.lock:
+            self._trim(now)
+            self.requests.append(now)
+
+    def try_spend(self) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            self._trim(now)
+            allowed = RETRY_BUDGET_MIN + len(self.requests) * config.LLM_RETRY_BUDGET_PERCENT / 100.0
+            if len(self.retries) >= allowed:
+                return False
+            self.retries.append(now)
+            return True
+
+
+class _CircuitBreaker:
+    """
+    closed: 정상 / open: 쿨다운 동안 바로 실패 / half_open: 시험 호출 1개만 통과
+    """
+
+    def __init__(self):
+        self.state = 'closed'
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probing = False
+        self.lock = threading.Lock()
+
+    def before_call(self):
+        with self.lock:
+            if self.state == 'open':
+                if time.monotonic() - self.opened_at < config.LLM_BREAKER_COOLDOWN:
+                    raise CircuitOpenError("AI 서버 오류가 계속되어 잠시 요청을 멈췄습니다.")
+                self.state = 'half_open'
+                self.probing = False
+            if self.state == 'half_open':
+                if self.probing:
+                    raise CircuitOpenError("AI 서버 상태를 확인하는 중입니다.")
+                self.probing = True
+
+    def record_success(self):
+        with self.lock:
+            if self.state != 'closed':
+                debug_print("서킷 브레이커 닫힘 (정상 복구)", "INFO")
+            self.state = 'closed'
+            self.failures = 0
+            self.probing = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if self.state == 'half_open' or self.failures >= max(1, config.LLM_BREAKER_FAILURES):
+                if self.state != 'open':
+                    _bump('breaker_opens')
+                    debug_print(f"서킷 브레이커 열림 (연속 실패 {self.failures}회)", "WARNING")
+                self.state = 'open'
+                self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """재시도할 수 없는 오류(요청 자체 문제)로 끝난 시험 호출은 결과로 치지 않음"""
+        with self.lock:
+            self.probing = False
+
+
+_budget = _RetryBudget()
+_breaker = _CircuitBreaker()
+_stats_lock = threading.Lock()
+_stats = {'calls': 0, 'retries': 0, 'resumed': 0, 'recovered': 0,
+          'budget_exhausted': 0, 'deadline_exceeded': 0, 'breaker_opens': 0, 'breaker_rejected': 0}
+
+
+def _bump(name: str, n: int = 1):
+    with _stats_lock:
+        _stats[name] += n
+
+
+def is_retryable(error: BaseException) -> bool:
+    """다시 시도하면 성공할 수 있는 일시적 오류인지"""
+    if isinstance(error, (RateLimitError, APITimeoutError, APIConnectionError, TimeoutError, ConnectionError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code >= 500 or error.status_code in (408, 409, 429)
+    return False
+
+
+def _retry_after(error: BaseException) -> float | None:
+    """Retry-After 헤더(초)가 있으면 반환"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return max(0.0, float(headers.get('retry-after')))
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_seconds(attempt: int, error: BaseException | None = None) -> float:
+    """attempt번째 재시도 전 대기 시간 (full jitter, Retry-After 우선)"""
+    hinted = _retry_after(error) if error is not None else None
+    if hinted is not None:
+        return min(hinted, config.LLM_RETRY_MAX_MS / 1000.0)
+    cap = min(config.LLM_RETRY_MAX_MS, config.LLM_RETRY_BASE_MS * (2 ** attempt)) / 1000.0
+    return random.uniform(0, cap)
+
+
+def _should_retry(error: BaseException, attempt: int, deadline: Deadline) -> float | None:
+    """재시도하면 대기 시간(초), 하지 않으면 None"""
+    if not is_retryable(error) or attempt >= config.LLM_MAX_RETRIES:
+        return None
+    delay = backoff_seconds(attempt, error)
+    if delay >= deadline.remaining():
+        _bump('deadline_exceeded')
+        return None
+    if not _budget.try_spend():
+        _bump('budget_exhausted')
+        debug_print("재시도 예산 소진, 재시도하지 않음", "WARNING")
+        return None
+    return delay
+
+
+def _fail(error: BaseException):
+    if is_retryable(error):
+        _breaker.record_failure()
+    else:
+        _breaker.release_probe()
+
+
+def _before_call(deadline: Deadline):
+    if deadline.expired():
+        _bump('deadline_exceeded')
+        raise TimeoutError("AI 응답 마감 시간이 지났습니다.")
+    try:
+        _breaker.before_call()
+    except CircuitOpenError:
+        _bump('breaker_rejected')
+        raise
+
+
+def call(fn, deadline: Deadline | None = None):
+    """
+    fn(timeout)을 일시적 오류에 한해 재시도하며 호출합니다.
+
+    매개변수:
+        fn: 남은 시간(초)을 받아 결과를 돌려주는 함수
+        deadline: 전체 마감 시간 (기본: LLM_REQUEST_TIMEOUT초)
+
+    반환값:
+        fn의 결과. 재시도할 수 없으면 마지막 예외를 그대로 올립니다.
+    """
+    deadline = deadline or Deadline(config.LLM_REQUEST_TIMEOUT)
+    _budget.record_request()
+    _bump('calls')
+    attempt = 0
+    while True:
+        _before_call(deadline)
+        try:
+            result = fn(deadline.remaining())
+        except Exception as e:
+            _fail(e)
+            delay = _should_retry(e, attempt, deadline)
+            if delay is None:
+                raise
+            attempt += 1
+            _bump('retries')
+            debug_print(f"일시적 오류로 {delay:.2f}초 후 재시도 ({attempt}/{config.LLM_MAX_RETRIES}): {type(e).__name__}", "WARNING")
+            time.sleep(delay)
+            continue
+        _breaker.record_success()
+        if attempt:
+            _bump('recovered')
+        return result
+
+
+def continuation_messages(messages: list[dict], partial: str) -> list[dict]:
+    """끊긴 답변을 이어서 쓰도록 하는 메시지 목록"""
+    return list(messages) + [
+        {"role": "assistant", "content": partial},
+        {"role": "user", "content": RESUME_PROMPT},
+    ]
+
+
+def stream(open_stream, messages: list[dict], max_tokens: int, deadline: Deadline | None = None):
+    """
+    끊기면 이어서 받는 스트리밍 제너레이터
+
+    매개변수:
+        open_stream: (messages, max_tokens, timeout) → 텍스트 조각 반복자
+        messages: 원래 요청 메시지
+        max_tokens: 원래 출력 토큰 한도 (이어쓰기 때는 이미 받은 만큼 줄여서 요청)
+        deadline: 전체 마감 시간 (기본: LLM_REQUEST_TIMEOUT초)
+
+    이미 내보낸 조각은 다시 내보내지 않습니다. 재시도할 수 없으면 마지막 예외를 올립니다.
+    """
+    deadline = deadline or Deadline(config.LLM_REQUEST_TIMEOUT)
+    _budget.record_request()
+    _bump('calls')
+    parts: list[str] = []
+    attempt = 0
+    while True:
+        _before_call(deadline)
+        if parts:
+            partial = "".join(parts)
+            request_messages = continuation_messages(messages, partial)
+            request_tokens = max(RESUME_MIN_TOKENS, max_tokens - count_tokens(partial))
+        else:
+            request_messages, request_tokens = messages, max_tokens
+        try:
+            # 읽기를 그만두면 바로 닫아 게이트웨이가 업스트림 호출을 취소할 수 있게 합니다
+            with closing(open_stream(request_messages, request_tokens, deadline.remaining())) as chunks:
+                for text in chunks:
+                    parts.append(text)
+                    yield text
+        except GeneratorExit:
+            # 화면 쪽에서 읽기를 그만둔 경우 (성공/실패로 치지 않음)
+            _breaker.release_probe()
+            raise
+        except Exception as e:
+            _fail(e)
+            delay = _should_retry(e, attempt, deadline)
+            if delay is None:
+                raise
+            attempt += 1
+            _bump('retries')
+            if parts:
+                _bump('resumed')
+            debug_print(
+                f"스트림 오류로 {delay:.2f}초 후 {'이어쓰기' if parts else '재시도'} "
+                f"({attempt}/{config.LLM_MAX_RETRIES}, 받은 글자 {sum(len(p) for p in parts)}): {type(e).__name__}",
+                "WARNING",
+            )
+            time.sleep(delay)
+            continue
+        _breaker.record_success()
+        if attempt:
+            _bump('recovered')
+        return
+
+
+def get_resilience_stats() -> dict:
+    """
+    재시도/브레이커 통계
+
+    반환값:
+        {'calls', 'retries', 'resumed', 'recovered', 'budget_exhausted',
+         'deadline_exceeded', 'breaker_opens', 'breaker_rejected', 'breaker_state'}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+    with _breaker.lock:
+        stats['breaker_state'] = _breaker.state
+    return stats
@@ -0,0 +1,162 @@
+# ========================================
+# AI 학습 도우미 - AI 응답 캐시 (선택 기능)
+# ========================================
+# 시스템 프롬프트와 대화 내용이 완전히 같은 요청은 DeepSeek를 다시 부르지 않고
+# 저장해 둔 답변을 돌려줍니다. (빠른 질문 버튼, 같은 퀴즈 프롬프트 등)
+# - 키: (모델, 전체 메시지, temperature, max_tokens)의 SHA-256
+# - 1단계: 메모리 LRU (LLM_CACHE_MAX_MEMORY개)
+# - 2단계: 디스크 SQLite (temp/llm_cache.sqlite3, LLM_CACHE_MAX_DISK개)
+# - 두 단계 모두 LLM_CACHE_TTL초가 지나면 만료됩니다.
+# LLM_CACHE_ENABLED=true일 때만 사용합니다 (기본 꺼짐).
+# ========================================
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[AI-CACHE-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+CACHE_PATH = os.path.join(config.CURRENT_DIR, 'temp', 'llm_cache.sqlite3')
+# 캐시된 답변을 스트림으로 돌려줄 때 한 번에 내보내는 글자 수
+REPLAY_CHUNK_CHARS = 24
+
+
+_memory: OrderedDict = OrderedDict()
+_lock = threading.Lock()
+_conn = None
+_stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'writes': 0}
+
+
+def is_enabled() -> bool:
+    return config.LLM_CACHE_ENABLED
+
+
+def make_key(model: str, messages: list[dict], temperature: float, max_tokens: int) -> str:
+    """요청 내용으로 캐시 키 생성"""
+    payload = json.dumps(
+        {'model': model, 'messages': messages, 'temperature': temperature, 'max_tokens': max_tokens},
+        ensure_ascii=False,
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+def _get_conn():
+    """SQLite 연결 (프로세스당 1개, 호출 측에서 _lock 보유)"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY,"
+            " response TEXT NOT NULL,"
+            " created_at REAL NOT NULL)"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_created ON responses(created_at)")
+    return _conn
+
+
+def _remember(key: str, response: str, created_at: float):
+    """메모리 LRU에 넣고 한도를 넘으면 오래 안 쓴 항목 제거 (호출 측에서 _lock 보유)"""
+    _memory[key] = (created_at, response)
+    _memory.move_to_end(key)
+    while len(_memory) > config.LLM_CACHE_MAX_MEMORY:
+        _memory.popitem(last=False)
+
+
+def get(key: str) -> str | None:
+    """캐시된 답변 (없거나 만료되면 None)"""
+    now = time.time()
+    with _lock:
+        hit = _memory.get(key)
+        if hit and now - hit[0] < config.LLM_CACHE_TTL:
+            _memory.move_to_end(key)
+            _stats['memory_hits'] += 1
+            return hit[1]
+        _memory.pop(key, None)
+        try:
+            row = _get_conn().execute(
+                "SELECT response, created_at FROM responses WHERE key = ? AND created_at > ?",
+                (key, now - config.LLM_CACHE_TTL),
+            ).fetchone()
+        except Exception as e:
+            debug_print(f"디스크 캐시 조회 오류(무시): {str(e)}", "WARNING")
+            row = None
+        if row:
+            _remember(key, row[0], row[1])
+            _stats['disk_hits'] += 1
+            return row[0]
+        _stats['misses'] += 1
+        return None
+
+
+def put(key: str, response: str):
+    """답변 저장 (메모리 + 디스크). 디스크가 한도를 넘으면 만료/오래된 항목부터 삭제"""
+    if not response:
+        return
+    now = time.time()
+    with _lock:
+        _remember(key, response, now)
+        _stats['writes'] += 1
+        try:
+            conn = _get_conn()
+            conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created_at) VALUES (?, ?, ?)",
+                (key, response, now),
+            )
+            conn.execute("DELETE FROM responses WHERE created_at <= ?", (now - config.LLM_CACHE_TTL,))
+            conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (config.LLM_CACHE_MAX_DISK,),
+            )
+            conn.commit()
+        except Exception as e:
+            debug_print(f"디스크 캐시 저장 오류(무시): {str(e)}", "WARNING")
+
+
+def replay(response: str):
+    """캐시된 답변을 스트리밍 응답처럼 조각내어 내보냅니다"""
+    for i in range(0, len(response), REPLAY_CHUNK_CHARS):
+        yield response[i:i + REPLAY_CHUNK_CHARS]
+
+
+def get_cache_stats() -> dict:
+    """
+    캐시 적중 통계
+
+    반환값:
+        {'memory_hits', 'disk_hits', 'misses', 'hit_rate', 'writes', 'memory_entries'}
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['memory_entries'] = len(_memory)
+    total = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / total * 100, 1) if total else 0.0
+    return stats
+
+
+def clear_cache():
+    """메모리/디스크 캐시 전체 삭제"""
+    with _lock:
+        _memory.clear()
+        conn = _get_conn()
+        conn.execute("DELETE FROM responses")
+        conn.commit()
+    debug_print("AI 응답 캐시 초기화", "INFO")
@@ -77,6 +77,14 @@ except Exception as e:
     debug_print(f"관리자 계정 생성 중 오류: {str(e)}", "ERROR")
     # 오류가 있어도 앱은 계속 실행
 
+# 문서 도우미 임베딩 모델 미리 불러오기 (백그라운드, 앱은 기다리지 않음)
+if config.EMBED_WARMUP:
+    try:
+        from rag.embedding_service import start_embedding_service
+        start_embedding_service()
+    except Exception as e:
+        debug_print(f"임베딩 서비스 시작 오류: {str(e)}", "ERROR")
+
 
 # ========================================
 # 사이드바 - 로그인/회원가입
@@ -46,6 +46,14 @@ def _as_bool(value) -> bool:
         return False
 
 
+# 문자열 환경 값을 안전하게 정수로 변환 (실패 시 기본값)
+def _as_int(value, default: int) -> int:
+    try:
+        return int(str(value).strip())
+    except Exception:
+        return default
+
+
 # ========================================
 # 한글 경로 처리
 # ========================================
@@ -142,6 +150,106 @@ SUPER_ADMIN_PASSWORD = get_env("SUPER_ADMIN_PASSWORD")
 DEV_SKIP_AUTH = _as_bool(get_env("DEV_SKIP_AUTH", "true" if DEBUG_MODE else "false"))
 
 
+# ========================================
+# 데이터베이스 연결 설정 (선택)
+# ========================================
+# 서버 프로세스 하나가 Supabase 클라이언트 1개를 공유합니다.
+# 동시 접속 학생이 많다면 최대 연결 수를 늘려주세요.
+SUPABASE_MAX_CONNECTIONS = _as_int(get_env("SUPABASE_MAX_CONNECTIONS", "20"), 20)
+SUPABASE_MAX_KEEPALIVE = _as_int(get_env("SUPABASE_MAX_KEEPALIVE", "10"), 10)
+SUPABASE_TIMEOUT_SECONDS = _as_int(get_env("SUPABASE_TIMEOUT_SECONDS", "30"), 30)
+# 백그라운드 연결 점검 주기 (초). 0이면 점검 스레드를 띄우지 않습니다.
+SUPABASE_HEALTH_CHECK_INTERVAL = _as_int(get_env("SUPABASE_HEALTH_CHECK_INTERVAL", "60"), 60)
+# 카테고리 캐시 유지 시간 (초). 카테고리 테이블은 거의 바뀌지 않습니다.
+CATEGORY_CACHE_TTL = _as_int(get_env("CATEGORY_CACHE_TTL", "600"), 600)
+
+
+# ========================================
+# 문서 도우미(RAG) 설정 (선택)
+# ========================================
+# 문서 인덱싱을 동시에 처리할 작업자 수 (서버 CPU 코어 수에 맞춰 조절)
+RAG_INGEST_WORKERS = _as_int(get_env("RAG_INGEST_WORKERS", "2"), 2)
+# 파일 하나당 최대 청크 수 (0이면 제한 없음)
+RAG_MAX_CHUNKS = _as_int(get_env("RAG_MAX_CHUNKS", "5000"), 5000)
+# PDF 텍스트 추출 프로세스 수와, 추출해 두고 아직 처리하지 않은 텍스트의 메모리 한도(MB)
+RAG_PDF_WORKERS = _as_int(get_env("RAG_PDF_WORKERS", str(min(4, os.cpu_count() or 1))), 1)
+RAG_PDF_MEMORY_MB = _as_int(get_env("RAG_PDF_MEMORY_MB", "64"), 64)
+# 임베딩 디스크 캐시 (temp/embed_cache.sqlite3). 항목 1개 ≈ 1.5KB
+EMBED_CACHE_ENABLED = _as_bool(get_env("EMBED_CACHE_ENABLED", "true"))
+EMBED_CACHE_MAX_ENTRIES = _as_int(get_env("EMBED_CACHE_MAX_ENTRIES", "50000"), 50000)
+# 임베딩 서비스: 앱 시작 때 모델 미리 로드, 동시 요청을 묶는 최대 배치 크기/최대 대기 시간(ms)
+EMBED_WARMUP = _as_bool(get_env("EMBED_WARMUP", "true"))
+EMBED_MAX_BATCH = _as_int(get_env("EMBED_MAX_BATCH", "64"), 64)
+EMBED_MAX_WAIT_MS = _as_int(get_env("EMBED_MAX_WAIT_MS", "10"), 10)
+# 문서 검색 결과 캐시 (사용자별, 문서가 바뀌면 자동으로 비워짐)
+RETRIEVAL_CACHE_TTL = _as_int(get_env("RETRIEVAL_CACHE_TTL", "600"), 600)
+RETRIEVAL_CACHE_MAX_PER_USER = _as_int(get_env("RETRIEVAL_CACHE_MAX_PER_USER", "64"), 64)
+# 문서 검색 백엔드: pgvector(Supabase RPC) 또는 local(temp/vector_index, numpy 필요)
+RAG_RETRIEVAL_BACKEND = get_env("RAG_RETRIEVAL_BACKEND", "pgvector")
+# local 백엔드에서 청크 수가 이 값 이상이면 HNSW 근사 검색 (hnswlib 설치 시)
+RAG_LOCAL_ANN_THRESHOLD = _as_int(get_env("RAG_LOCAL_ANN_THRESHOLD", "20000"), 20000)
+# 임베딩 양자화 1차 검색: none | int8(local 백엔드) | binary(local/pgvector, schema.sql 17번 필요)
+RAG_VECTOR_QUANTIZATION = get_env("RAG_VECTOR_QUANTIZATION", "none").lower()
+# 1차 검색 후보 수 = 요청 개수 × 이 값 (후보만 float로 재채점)
+RAG_RESCORE_FACTOR = _as_int(get_env("RAG_RESCORE_FACTOR", "10"), 10)
+# 하이브리드 검색 (벡터 + 키워드 BM25 순위 융합)
+RAG_HYBRID_ENABLED = _as_bool(get_env("RAG_HYBRID_ENABLED", "true"))
+# 검색 전체 시간 예산(ms)과 단계별 후보 수
+RAG_SEARCH_BUDGET_MS = _as_int(get_env("RAG_SEARCH_BUDGET_MS", "1500"), 1500)
+RAG_SEARCH_CANDIDATES = _as_int(get_env("RAG_SEARCH_CANDIDATES", "20"), 20)
+# (선택) cross-encoder 재정렬 모델 (예: BAAI/bge-reranker-base). 비워두면 재정렬하지 않습니다.
+RAG_RERANK_MODEL = get_env("RAG_RERANK_MODEL", "")
+RAG_RERANK_TOP_N = _as_int(get_env("RAG_RERANK_TOP_N", "20"), 20)
+
+
+# ========================================
+# AI 대화 맥락 설정 (선택)
+# ========================================
+# AI에게 보내는 입력(시스템 프롬프트 + 대화)의 토큰 예산. 넘으면 오래된 대화를 요약합니다.
+LLM_CONTEXT_TOKENS = _as_int(get_env("LLM_CONTEXT_TOKENS", "6000"), 6000)
+# 동시에 DeepSeek로 보내는 최대 요청 수, 분당 요청 수(토큰 버킷)와 순간 허용량, 응답 대기 한도(초)
+LLM_MAX_CONCURRENCY = _as_int(get_env("LLM_MAX_CONCURRENCY", "8"), 8)
+LLM_RATE_PER_MINUTE = _as_int(get_env("LLM_RATE_PER_MINUTE", "120"), 120)
+LLM_RATE_BURST = _as_int(get_env("LLM_RATE_BURST", "10"), 10)
+LLM_REQUEST_TIMEOUT = _as_int(get_env("LLM_REQUEST_TIMEOUT", "120"), 120)
+# 일시적 오류(속도 제한/시간 초과/연결 끊김/5xx) 재시도: 최대 횟수, 대기 시간(ms, 지수 증가 + 무작위 지터)
+LLM_MAX_RETRIES = _as_int(get_env("LLM_MAX_RETRIES", "3"), 3)
+LLM_RETRY_BASE_MS = _as_int(get_env("LLM_RETRY_BASE_MS", "500"), 500)
+LLM_RETRY_MAX_MS = _as_int(get_env("LLM_RETRY_MAX_MS", "8000"), 8000)
+# 재시도 예산: 최근 1분 요청 수 대비 재시도 비율(%) 한도 (장애 때 재시도가 부하를 키우지 않도록)
+LLM_RETRY_BUDGET_PERCENT = _as_int(get_env("LLM_RETRY_BUDGET_PERCENT", "20"), 20)
+# 서킷 브레이커: 연속 실패 횟수가 넘으면 일정 시간(초) 동안 바로 실패 처리
+LLM_BREAKER_FAILURES = _as_int(get_env("LLM_BREAKER_FAILURES", "5"), 5)
+LLM_BREAKER_COOLDOWN = _as_int(get_env("LLM_BREAKER_COOLDOWN", "30"), 30)
+
+
+# ========================================
+# AI 응답 캐시 설정 (선택)
+# ========================================
+# 시스템 프롬프트/대화/설정이 완전히 같은 요청은 저장된 답변을 재사용합니다 (기본 꺼짐)
+LLM_CACHE_ENABLED = _as_bool(get_env("LLM_CACHE_ENABLED", "false"))
+LLM_CACHE_TTL = _as_int(get_env("LLM_CACHE_TTL", "86400"), 86400)
+LLM_CACHE_MAX_MEMORY = _as_int(get_env("LLM_CACHE_MAX_MEMORY", "256"), 256)
+LLM_CACHE_MAX_DISK = _as_int(get_env("LLM_CACHE_MAX_DISK", "5000"), 5000)
+
+
+# ========================================
+# 퀴즈 풀 / 문제은행 설정 (선택)
+# ========================================
+# 같은 (과목, 학년, 유형, 난이도) 문제를 미리 만들어 두고 바로 꺼내 줍니다
+QUIZ_POOL_ENABLED = _as_bool(get_env("QUIZ_POOL_ENABLED", "true"))
+# 한 번에 미리 만들 문제 수, 학생에게 남은 새 문제가 이보다 적으면 보충
+QUIZ_POOL_BATCH = _as_int(get_env("QUIZ_POOL_BATCH", "10"), 10)
+QUIZ_POOL_LOW_WATER = _as_int(get_env("QUIZ_POOL_LOW_WATER", "10"), 10)
+# 풀 하나에 보관할 최대 문제 수, 문제/풀 유지 시간(초), 보충 작업 스레드 수
+QUIZ_POOL_MAX = _as_int(get_env("QUIZ_POOL_MAX", "60"), 60)
+QUIZ_POOL_TTL = _as_int(get_env("QUIZ_POOL_TTL", "3600"), 3600)
+QUIZ_POOL_WORKERS = _as_int(get_env("QUIZ_POOL_WORKERS", "2"), 2)
+# 문제은행 중복 검사: 이 유사도(%) 이상이면 비슷한 문항으로 보고, 최근 몇 개 문항과 비교할지
+QB_DUP_SIMILARITY = _as_int(get_env("QB_DUP_SIMILARITY", "92"), 92)
+QB_DUP_SCAN_LIMIT = _as_int(get_env("QB_DUP_SCAN_LIMIT", "2000"), 2000)
+
+
 # ========================================
 # 환경 변수 검증
 # ========================================
@@ -285,6 +285,12 @@ ALTER TABLE document_chunks DISABLE ROW LEVEL SECURITY;
 
 CREATE INDEX IF NOT EXISTS idx_document_chunks_document ON document_chunks(document_id);
 CREATE INDEX IF NOT EXISTS idx_document_chunks_user ON document_chunks(user_id);
+-- 문서 안에서 청크 위치는 하나뿐 (배치 저장을 재시도해도 같은 청크가 두 번 들어가지 않게 upsert 기준으로 사용)
+-- 예전 재시도로 생긴 중복 행은 가장 먼저 저장된 것만 남기고 정리합니다
+DELETE FROM document_chunks a
+  USING document_chunks b
+  WHERE a.document_id = b.document_id AND a.chunk_index = b.chunk_index AND a.id > b.id;
+CREATE UNIQUE INDEX IF NOT EXISTS idx_document_chunks_doc_position ON document_chunks(document_id, chunk_index);
 -- 코사인 유사도용 벡터 인덱스 (성능 향상). 테이블에 데이터가 충분히 있을 때 생성 권장
 CREATE INDEX IF NOT EXISTS idx_document_chunks_embedding ON document_chunks USING ivfflat (embedding vector_cosine_ops) WITH (lists=100);
 
@@ -319,3 +325,333 @@ INSERT INTO categories (name, icon, display_name, description, target_role) VALU
 ('doc_assistant', '📄', '문서 도우미', '업로드 문서 기반 설명', 'teacher')
 ON CONFLICT (name) DO NOTHING;
 
+
+-- ========================================
+-- 14. 퀴즈 통계 집계 함수 (서버 측 집계)
+-- quiz_data(JSON)를 내려받지 않고 Postgres에서 개수/정답 수만 계산합니다
+-- ========================================
+
+CREATE INDEX IF NOT EXISTS idx_quiz_user_created ON quiz_attempts(user_id, created_at DESC);
+
+-- 전체(또는 카테고리별) 시도 수/정답 수
+CREATE OR REPLACE FUNCTION quiz_stats_summary(
+  user_id_input INT,
+  category_id_input INT DEFAULT NULL
+)
+RETURNS TABLE(total BIGINT, correct BIGINT)
+LANGUAGE SQL STABLE AS $$
+  SELECT COUNT(*) AS total,
+         COUNT(*) FILTER (WHERE qa.is_correct) AS correct
+  FROM quiz_attempts qa
+  WHERE qa.user_id = user_id_input
+    AND (category_id_input IS NULL OR qa.category_id = category_id_input);
+$$;
+
+-- 일자별 시도 수/정답 수는 learning_stats(quiz_count/quiz_correct) 일별 집계에서 읽습니다 (15번 참고)
+DROP FUNCTION IF EXISTS quiz_stats_by_day(INT, INT);
+
+-- 카테고리별 시도 수/정답 수
+CREATE OR REPLACE FUNCTION quiz_stats_by_category(
+  user_id_input INT
+)
+RETURNS TABLE(category_id INT, category_name TEXT, total BIGINT, correct BIGINT)
+LANGUAGE SQL STABLE AS $$
+  SELECT qa.category_id,
+         COALESCE(c.display_name, c.name) AS category_name,
+         COUNT(*) AS total,
+         COUNT(*) FILTER (WHERE qa.is_correct) AS correct
+  FROM quiz_attempts qa
+  LEFT JOIN categories c ON c.id = qa.category_id
+  WHERE qa.user_id = user_id_input
+  GROUP BY qa.category_id, c.display_name, c.name
+  ORDER BY total DESC;
+$$;
+
+
+-- ========================================
+-- 15. 학습 통계(learning_stats) 일별 집계 자동 갱신
+-- conversations / quiz_attempts에 행이 추가될 때마다 트리거가
+-- (user_id, date) 행을 upsert로 1씩 증가시킵니다.
+-- 대시보드는 원본 대화 행 대신 이 집계 테이블을 읽습니다.
+-- ========================================
+
+CREATE OR REPLACE FUNCTION bump_learning_stats(
+  p_user_id INT,
+  p_date DATE,
+  p_messages INT,
+  p_quizzes INT,
+  p_correct INT,
+  p_category TEXT
+)
+RETURNS VOID
+LANGUAGE SQL AS $$
+  INSERT INTO learning_stats (user_id, date, message_count, quiz_count, quiz_correct, categories_used)
+  VALUES (
+    p_user_id, p_date, p_messages, p_quizzes, p_correct,
+    CASE WHEN p_category IS NULL THEN ARRAY[]::TEXT[] ELSE ARRAY[p_category] END
+  )
+  ON CONFLICT (user_id, date) DO UPDATE SET
+    message_count = learning_stats.message_count + EXCLUDED.message_count,
+    quiz_count = learning_stats.quiz_count + EXCLUDED.quiz_count,
+    quiz_correct = learning_stats.quiz_correct + EXCLUDED.quiz_correct,
+    categories_used = CASE
+      WHEN p_category IS NULL OR p_category = ANY(COALESCE(learning_stats.categories_used, ARRAY[]::TEXT[]))
+        THEN learning_stats.categories_used
+      ELSE array_append(COALESCE(learning_stats.categories_used, ARRAY[]::TEXT[]), p_category)
+    END;
+$$;
+
+CREATE OR REPLACE FUNCTION trg_conversations_learning_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF NEW.user_id IS NOT NULL THEN
+    PERFORM bump_learning_stats(
+      NEW.user_id, COALESCE(NEW.created_at, NOW())::date, 1, 0, 0,
+      (SELECT c.name FROM categories c WHERE c.id = NEW.category_id)
+    );
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS conversations_learning_stats ON conversations;
+CREATE TRIGGER conversations_learning_stats
+  AFTER INSERT ON conversations
+  FOR EACH ROW EXECUTE FUNCTION trg_conversations_learning_stats();
+
+CREATE OR REPLACE FUNCTION trg_quiz_attempts_learning_stats()
+RETURNS TRIGGER
+LANGUAGE plpgsql AS $$
+BEGIN
+  IF NEW.user_id IS NOT NULL THEN
+    PERFORM bump_learning_stats(
+      NEW.user_id, COALESCE(NEW.created_at, NOW())::date, 0, 1,
+      CASE WHEN NEW.is_correct THEN 1 ELSE 0 END,
+      (SELECT c.name FROM categories c WHERE c.id = NEW.category_id)
+    );
+  END IF;
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS quiz_attempts_learning_stats ON quiz_attempts;
+CREATE TRIGGER quiz_attempts_learning_stats
+  AFTER INSERT ON quiz_attempts
+  FOR EACH ROW EXECUTE FUNCTION trg_quiz_attempts_learning_stats();
+
+-- 기존 데이터 백필: 원본 테이블에서 정확한 값을 다시 계산해 덮어씁니다 (여러 번 실행해도 안전)
+INSERT INTO learning_stats (user_id, date, message_count, quiz_count, quiz_correct, categories_used)
+SELECT user_id, date,
+       SUM(messages)::INT, SUM(quizzes)::INT, SUM(correct)::INT,
+       COALESCE(array_agg(DISTINCT category) FILTER (WHERE category IS NOT NULL), ARRAY[]::TEXT[])
+FROM (
+  SELECT cv.user_id, cv.created_at::date AS date, 1 AS messages, 0 AS quizzes, 0 AS correct, c.name AS category
+  FROM conversations cv LEFT JOIN categories c ON c.id = cv.category_id
+  WHERE cv.user_id IS NOT NULL
+  UNION ALL
+  SELECT qa.user_id, qa.created_at::date, 0, 1, CASE WHEN qa.is_correct THEN 1 ELSE 0 END, c.name
+  FROM quiz_attempts qa LEFT JOIN categories c ON c.id = qa.category_id
+  WHERE qa.user_id IS NOT NULL
+) src
+GROUP BY user_id, date
+ON CONFLICT (user_id, date) DO UPDATE SET
+  message_count = EXCLUDED.message_count,
+  quiz_count = EXCLUDED.quiz_count,
+  quiz_correct = EXCLUDED.quiz_correct,
+  categories_used = EXCLUDED.categories_used;
+
+-- 관리자용: 전체 사용자의 일자별 합계 (최근 days_input일)
+CREATE OR REPLACE FUNCTION learning_stats_daily_totals(
+  days_input INT DEFAULT 30
+)
+RETURNS TABLE(date DATE, message_count BIGINT, quiz_count BIGINT, quiz_correct BIGINT, active_users BIGINT)
+LANGUAGE SQL STABLE AS $$
+  SELECT ls.date,
+         SUM(ls.message_count) AS message_count,
+         SUM(ls.quiz_count) AS quiz_count,
+         SUM(ls.quiz_correct) AS quiz_correct,
+         COUNT(DISTINCT ls.user_id) AS active_users
+  FROM learning_stats ls
+  WHERE ls.date >= CURRENT_DATE - (days_input - 1)
+  GROUP BY ls.date
+  ORDER BY ls.date;
+$$;
+
+CREATE INDEX IF NOT EXISTS idx_stats_date ON learning_stats(date DESC);
+
+
+-- ========================================
+-- 16. 문서 내용 해시 (중복 업로드 방지 / 변경분만 재인덱싱)
+-- documents.content_hash: 파일 바이트의 SHA-256
+-- document_chunks.chunk_hash: 정규화한 청크 텍스트의 SHA-256
+-- ========================================
+
+ALTER TABLE documents ADD COLUMN IF NOT EXISTS content_hash TEXT;
+ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS chunk_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_documents_user_hash ON documents(user_id, content_hash);
+CREATE INDEX IF NOT EXISTS idx_documents_user_file ON documents(user_id, file_name);
+CREATE INDEX IF NOT EXISTS idx_document_chunks_doc_hash ON document_chunks(document_id, chunk_hash);
+
+
+-- ========================================
+-- 17. 임베딩 양자화 (부호 비트 1차 검색 → float 재채점)
+-- pgvector 0.7 이상 필요 (binary_quantize, bit 해밍 거리 연산자 <~>)
+-- embedding_bits: 384비트 = 48바이트 (float32 벡터 1536바이트의 1/32)
+-- 트리거가 DB 안에서 계산하므로 클라이언트가 보내는 데이터는 늘지 않습니다.
+-- pgvector가 0.7보다 낮으면 이 절 전체를 건너뜁니다
+-- (트리거만 설치되면 이후 모든 청크 INSERT가 실패하므로).
+-- 앱은 match_document_chunks_binary가 없으면 기본 검색을 씁니다.
+-- ========================================
+
+DO $section17$
+DECLARE
+  vector_version TEXT;
+BEGIN
+  SELECT extversion INTO vector_version FROM pg_extension WHERE extname = 'vector';
+  IF vector_version IS NULL
+     OR string_to_array(split_part(vector_version, '-', 1), '.')::INT[] < ARRAY[0, 7] THEN
+    RAISE NOTICE 'pgvector % < 0.7: 임베딩 양자화(17번)를 건너뜁니다', coalesce(vector_version, '(없음)');
+    RETURN;
+  END IF;
+
+  ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS embedding_bits BIT(384);
+
+  CREATE OR REPLACE FUNCTION set_embedding_bits()
+  RETURNS TRIGGER LANGUAGE plpgsql AS $fn$
+  BEGIN
+    NEW.embedding_bits := binary_quantize(NEW.embedding)::BIT(384);
+    RETURN NEW;
+  END;
+  $fn$;
+
+  DROP TRIGGER IF EXISTS document_chunks_embedding_bits ON document_chunks;
+  CREATE TRIGGER document_chunks_embedding_bits
+    BEFORE INSERT OR UPDATE OF embedding ON document_chunks
+    FOR EACH ROW EXECUTE FUNCTION set_embedding_bits();
+
+  -- 기존 청크 채우기 (여러 번 실행해도 안전)
+  UPDATE document_chunks
+  SET embedding_bits = binary_quantize(embedding)::BIT(384)
+  WHERE embedding_bits IS NULL AND embedding IS NOT NULL;
+
+  -- 1차: 사용자 청크 전체를 해밍 거리로 훑어 candidate_count개 추림
+  -- 2차: 후보만 float 코사인 거리로 다시 정렬
+  CREATE OR REPLACE FUNCTION match_document_chunks_binary(
+    query_embedding VECTOR(384),
+    match_count INT,
+    user_id_input INT,
+    document_id_input BIGINT DEFAULT NULL,
+    candidate_count INT DEFAULT 50
+  )
+  RETURNS TABLE(
+    id BIGINT,
+    document_id BIGINT,
+    content TEXT,
+    metadata JSONB,
+    similarity FLOAT
+  )
+  LANGUAGE SQL STABLE AS $fn$
+    WITH candidates AS (
+      SELECT dc.id, dc.document_id, dc.content, dc.metadata, dc.embedding
+      FROM document_chunks dc
+      WHERE dc.user_id = user_id_input
+        AND (document_id_input IS NULL OR dc.document_id = document_id_input)
+        AND dc.embedding_bits IS NOT NULL
+      ORDER BY dc.embedding_bits <~> binary_quantize(query_embedding)::BIT(384)
+      LIMIT candidate_count
+    )
+    SELECT c.id, c.document_id, c.content, c.metadata,
+           1 - (c.embedding <=> query_embedding) AS similarity
+    FROM candidates c
+    ORDER BY c.embedding <=> query_embedding
+    LIMIT match_count;
+  $fn$;
+END;
+$section17$;
+
+
+-- ========================================
+-- 18. 문제은행 중복 방지
+-- question_bank.question_hash: 유형 + 정규화한 문항 텍스트의 SHA-256 (quiz/dedup.py에서 계산)
+-- 저장 전에 같은 교사의 문제은행에서 같은 해시를 찾아 건너뜁니다.
+-- 해시가 없는 기존 문항은 앱이 중복 검사 때 텍스트로 다시 계산해 비교합니다.
+-- ========================================
+
+ALTER TABLE question_bank ADD COLUMN IF NOT EXISTS question_hash TEXT;
+
+CREATE INDEX IF NOT EXISTS idx_question_bank_owner_hash ON question_bank(created_by, question_hash);
+
+
+-- ========================================
+-- 19. 문제은행 검색 인덱스
+-- 문항/해설/태그를 합친 검색용 컬럼 두 개를 DB가 자동으로 계산합니다.
+--   search_text: 소문자 텍스트 → pg_trgm GIN 인덱스 (부분 일치, 한국어 3글자 이상)
+--   search_document: tsvector('simple') → GIN 인덱스 (단어 일치)
+-- 학년/과목/난이도 조건과 (created_at, id) 기준 keyset 페이지 나누기를 DB에서 처리합니다.
+-- ========================================
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+ALTER TABLE question_bank ADD COLUMN IF NOT EXISTS search_text TEXT
+  GENERATED ALWAYS AS (
+    lower(coalesce(question, '') || ' ' || coalesce(explanation, '') || ' ' || coalesce(tags::text, ''))
+  ) STORED;
+
+ALTER TABLE question_bank ADD COLUMN IF NOT EXISTS search_document TSVECTOR
+  GENERATED ALWAYS AS (
+    to_tsvector('simple'::regconfig, coalesce(question, '') || ' ' || coalesce(explanation, '') || ' ' || coalesce(tags::text, ''))
+  ) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_question_bank_search_trgm ON question_bank USING GIN (search_text gin_trgm_ops);
+CREATE INDEX IF NOT EXISTS idx_question_bank_search_fts ON question_bank USING GIN (search_document);
+-- 교사별 최신순 목록 + keyset 페이지 나누기
+CREATE INDEX IF NOT EXISTS idx_question_bank_owner_recent
+  ON question_bank(created_by, created_at DESC, id DESC) WHERE is_active;
+
+-- 검색 결과 한 페이지 (after_created_at/after_id: 이전 페이지 마지막 문항)
+CREATE OR REPLACE FUNCTION search_question_bank(
+  created_by_input INT,
+  search_input TEXT DEFAULT NULL,
+  category_input TEXT DEFAULT NULL,
+  grade_input TEXT DEFAULT NULL,
+  difficulty_input INT DEFAULT NULL,
+  after_created_at TIMESTAMP DEFAULT NULL,
+  after_id INT DEFAULT NULL,
+  limit_input INT DEFAULT 50
+)
+RETURNS TABLE(
+  id INT,
+  created_by INT,
+  type TEXT,
+  question TEXT,
+  options JSONB,
+  answer TEXT,
+  explanation TEXT,
+  category TEXT,
+  grade TEXT,
+  difficulty INT,
+  tags JSONB,
+  question_hash TEXT,
+  created_at TIMESTAMP
+)
+LANGUAGE SQL STABLE AS $$
+  SELECT qb.id, qb.created_by, qb.type, qb.question, qb.options, qb.answer, qb.explanation,
+         qb.category, qb.grade, qb.difficulty, qb.tags, qb.question_hash, qb.created_at
+  FROM question_bank qb
+  WHERE qb.created_by = created_by_input
+    AND qb.is_active
+    AND (category_input IS NULL OR qb.category = category_input)
+    AND (grade_input IS NULL OR qb.grade = grade_input)
+    AND (difficulty_input IS NULL OR qb.difficulty = difficulty_input)
+    AND (
+      search_input IS NULL OR search_input = ''
+      OR qb.search_document @@ plainto_tsquery('simple'::regconfig, search_input)
+      -- LIKE 특수문자(\ % _)는 글자 그대로 찾도록 이스케이프
+      OR qb.search_text LIKE '%' || replace(replace(replace(lower(search_input), '\', '\\'), '%', '\%'), '_', '\_') || '%'
+    )
+    AND (after_created_at IS NULL OR (qb.created_at, qb.id) < (after_created_at, after_id))
+  ORDER BY qb.created_at DESC, qb.id DESC
+  LIMIT limit_input;
+$$;
@@ -7,15 +7,28 @@
 # 데이터를 저장하고 불러오는 모듈
 # ========================================
 
+import hashlib
+import json
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from supabase import create_client, Client
-from datetime import datetime
+from datetime import datetime, timedelta
 import config
 
 
 # ========================================
-# 사용자가 설정할 변수 (없음 - config.py에서 가져옴)
+# 사용자가 설정할 변수 (연결 설정은 config.py에서 가져옴)
 # ========================================
 
+# 연속으로 이만큼 네트워크 오류가 나면 클라이언트를 폐기하고 재연결합니다
+RECONNECT_AFTER_FAILURES = 3
+# 재연결 대기 시간 (지수 백오프: 1초, 2초, 4초 ... 최대 60초)
+RECONNECT_BASE_DELAY = 1.0
+RECONNECT_MAX_DELAY = 60.0
+
 
 def debug_print(message, level="INFO"):
     """
@@ -36,125 +49,287 @@ def debug_print(message, level="INFO"):
 
 
 # ========================================
-# Supabase 클라이언트 초기화
+# 연결 상태 추적 (지연 감지 + 백오프 재연결)
 # ========================================
+# 쿼리마다 연결 테스트를 보내지 않고, 실제 요청의 성공/실패를
+# HTTP 전송 계층에서 관찰해 상태를 기록합니다.
 
-_supabase_client = None
+_db_health = {
+    'last_ok_at': None,        # 마지막으로 응답을 정상 수신한 시각 (time.time())
+    'consecutive_failures': 0, # 연속 네트워크 오류 횟수
+    'last_error': None,        # 마지막 오류 메시지
+    'retry_at': 0.0,           # 이 시각 전에는 클라이언트를 다시 만들지 않음
+}
+_db_health_lock = threading.Lock()
 
-def get_supabase_client():
+
+def _mark_db_ok():
+    """응답을 정상 수신했음을 기록"""
+    with _db_health_lock:
+        _db_health['last_ok_at'] = time.time()
+        _db_health['consecutive_failures'] = 0
+        _db_health['retry_at'] = 0.0
+
+
+def _report_db_error(error):
     """
-    Supabase 클라이언트를 반환 (싱글톤 패턴)
-    Streamlit 환경에서는 세션 상태를 사용
+    네트워크 오류를 기록하고, 연속 실패가 쌓이면 공유 클라이언트를 폐기합니다.
+    다음 재생성은 지수 백오프 시간이 지난 뒤에만 시도합니다.
     """
-    global _supabase_client
+    global _shared_client
+    with _db_health_lock:
+        _db_health['consecutive_failures'] += 1
+        _db_health['last_error'] = str(error)
+        failures = _db_health['consecutive_failures']
+        if failures < RECONNECT_AFTER_FAILURES:
+            return
+        delay = min(RECONNECT_BASE_DELAY * (2 ** (failures - RECONNECT_AFTER_FAILURES)), RECONNECT_MAX_DELAY)
+        _db_health['retry_at'] = time.time() + delay
+    debug_print(f"연속 연결 오류 {failures}회 → {delay:.0f}초 후 재연결: {str(error)}", "WARNING")
+    # 참조만 끊고 직접 닫지는 않습니다. 다른 세션의 요청이 아직 이 클라이언트로 진행 중일 수 있고
+    # (이 함수가 그 전송 계층 안에서 호출되기도 함), 마지막 요청이 끝나 참조가 사라지면 연결도 정리됩니다.
+    with _shared_client_lock:
+        _shared_client = None
+
+
+def get_db_health() -> dict:
+    """
+    연결 상태 요약 반환 (관리/진단용)
     
-    # Streamlit 환경 확인
-    try:
-        import streamlit as st
-        use_streamlit = True
-    except:
-        use_streamlit = False
-    
-    # Streamlit 환경에서는 세션 상태 사용
-    if use_streamlit:
-        if 'supabase_client' not in st.session_state:
+    반환값:
+        {'last_ok_at', 'seconds_since_ok', 'consecutive_failures', 'last_error', 'retrying_in'}
+    """
+    with _db_health_lock:
+        info = dict(_db_health)
+    now = time.time()
+    last_ok = info.pop('last_ok_at')
+    retry_at = info.pop('retry_at')
+    info['last_ok_at'] = datetime.fromtimestamp(last_ok).isoformat() if last_ok else None
+    info['seconds_since_ok'] = round(now - last_ok, 1) if last_ok else None
+    info['retrying_in'] = round(max(0.0, retry_at - now), 1)
+    return info
+
+
+def _make_health_transport(limits):
+    """실제 요청 결과로 연결 상태를 갱신하는 httpx 전송 계층"""
+    import httpx
+
+    class _HealthTrackingTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
             try:
-                debug_print("Supabase 클라이언트 생성 (Streamlit 세션)...", "INFO")
-                
-                url = config.SUPABASE_URL
-                key = config.SUPABASE_KEY
-                
-                if not url or not key:
-                    debug_print("Supabase URL 또는 KEY가 설정되지 않았습니다!", "ERROR")
-                    return None
-                
-                debug_print(f"URL: {url[:30]}..., KEY: {key[:10]}...", "INFO")
-                
-                # 클라이언트 생성
-                client = create_client(url, key)
-                
-                # 연결 테스트
-                try:
-                    client.table('users').select('id').limit(1).execute()
-                    debug_print("Supabase 연결 성공 (Streamlit)!", "SUCCESS")
-                except Exception as test_error:
-                    debug_print(f"연결 테스트 실패(무시): {str(test_error)}", "WARNING")
-                    # 테스트가 실패해도 클라이언트를 유지합니다 (일부 환경에서 첫 쿼리 실패 사례 우회)
-                st.session_state.supabase_client = client
-            except Exception as e:
-                debug_print(f"Supabase 연결 실패 (Streamlit): {str(e)}", "ERROR")
-                import traceback
-                debug_print(f"추적: {traceback.format_exc()}", "ERROR")
-                return None
-        
-        return st.session_state.supabase_client
-    
-    # 일반 환경 (싱글톤 패턴)
-    if _supabase_client is not None:
+                response = super().handle_request(request)
+            except httpx.TransportError as e:
+                _report_db_error(e)
+                raise
+            # 5xx는 서버 측 문제이지만 연결 자체는 살아 있음
+            _mark_db_ok()
+            return response
+
+    return _HealthTrackingTransport(limits=limits)
+
+
+# ========================================
+# Supabase 클라이언트 초기화
+# ========================================
+
+# 서버 프로세스 전체가 공유하는 클라이언트 (세션/호출마다 만들지 않음)
+_shared_client = None
+_shared_client_lock = threading.RLock()
+_health_thread = None
+
+
+def _build_client_options():
+    """
+    연결 풀(keep-alive) 설정이 적용된 ClientOptions를 만듭니다.
+    설치된 supabase 버전이 httpx_client 주입을 지원하지 않으면 기본 옵션을 씁니다.
+    """
+    try:
+        import httpx
+        from supabase.lib.client_options import ClientOptions
+    except Exception as e:
+        debug_print(f"연결 풀 옵션 준비 실패(기본값 사용): {str(e)}", "WARNING")
+        return None
+
+    limits = httpx.Limits(
+        max_connections=config.SUPABASE_MAX_CONNECTIONS,
+        max_keepalive_connections=config.SUPABASE_MAX_KEEPALIVE,
+    )
+    timeout = config.SUPABASE_TIMEOUT_SECONDS
+    try:
+        http_client = httpx.Client(transport=_make_health_transport(limits), timeout=timeout)
+        return ClientOptions(httpx_client=http_client, postgrest_client_timeout=timeout)
+    except TypeError:
+        # 구버전 supabase: httpx_client 인자가 없음 (상태는 백그라운드 점검으로만 갱신)
+        return ClientOptions(postgrest_client_timeout=timeout)
+
+
+def _health_check_loop(interval: int):
+    """
+    백그라운드에서 주기적으로 연결 상태를 점검합니다.
+    최근 interval 안에 정상 응답이 있었다면 점검 쿼리를 생략합니다.
+    """
+    while True:
+        time.sleep(interval)
+        last_ok = _db_health['last_ok_at']
+        if last_ok and time.time() - last_ok < interval:
+            continue
+        client = get_supabase_client()
+        if client is None:
+            continue
         try:
-            # 클라이언트가 여전히 유효한지 확인 (간단한 테스트)
-            _supabase_client.table('users').select('id').limit(1).execute()
-            return _supabase_client
+            client.table('users').select('id').limit(1).execute()
+            _mark_db_ok()
         except Exception as e:
-            debug_print(f"기존 클라이언트 무효화: {str(e)}", "WARNING")
-            _supabase_client = None
+            debug_print(f"백그라운드 연결 점검 실패: {str(e)}", "WARNING")
+
+
+def _start_health_check():
+    """연결 점검 스레드를 프로세스당 한 번만 시작합니다."""
+    global _health_thread
+    interval = config.SUPABASE_HEALTH_CHECK_INTERVAL
+    if interval <= 0 or _health_thread is not None:
+        return
+    _health_thread = threading.Thread(
+        target=_health_check_loop,
+        args=(interval,),
+        name="supabase-health-check",
+        daemon=True,
+    )
+    _health_thread.start()
+
+
+def get_supabase_client():
+    """
+    Supabase 클라이언트를 반환 (싱글톤 패턴, 스레드 안전)
     
-    # 클라이언트 생성
-    try:
-        debug_print("Supabase 연결 시도...", "INFO")
-        
-        url = config.SUPABASE_URL
-        key = config.SUPABASE_KEY
-        
-        if not url or not key:
-            debug_print("Supabase URL 또는 KEY가 설정되지 않았습니다!", "ERROR")
-            return None
-        
-        debug_print(f"URL: {url[:30]}..., KEY: {key[:10]}...", "INFO")
-        
-        # 클라이언트 생성 시도
-        _supabase_client = create_client(url, key)
-        
-        # 연결 테스트
-        try:
-            _supabase_client.table('users').select('id').limit(1).execute()
-            debug_print("Supabase 연결 성공!", "SUCCESS")
-        except Exception as test_error:
-            debug_print(f"연결 테스트 실패(무시): {str(test_error)}", "WARNING")
-            # 테스트 실패를 무시하고 클라이언트를 반환합니다
-        
-        return _supabase_client
-        
-    except Exception as e:
-        debug_print(f"Supabase 연결 실패: {str(e)}", "ERROR")
-        debug_print(f"오류 타입: {type(e).__name__}", "ERROR")
-        import traceback
-        debug_print(f"추적: {traceback.format_exc()}", "ERROR")
-        _supabase_client = None
+    Streamlit 세션과 스크립트(fix_admin.py 등) 모두 프로세스 전역 클라이언트(연결 풀)를
+    공유하며, 호출마다 연결 테스트를 보내지 않습니다. 연결 오류는 실제 요청에서
+    감지되고, 연속 오류 시 백오프 후 클라이언트를 다시 만듭니다.
+    
+    반환값:
+        클라이언트 또는 None (설정 누락/재연결 대기 중)
+    """
+    global _shared_client
+    client = _shared_client
+    if client is not None:
+        return client
+
+    # 재연결 대기 중에는 타임아웃을 반복하지 않도록 즉시 None 반환
+    if time.time() < _db_health['retry_at']:
         return None
 
+    with _shared_client_lock:
+        if _shared_client is not None:
+            return _shared_client
+        try:
+            debug_print("Supabase 공유 클라이언트 생성...", "INFO")
+
+            url = config.SUPABASE_URL
+            key = config.SUPABASE_KEY
+
+            if not url or not key:
+                debug_print("Supabase URL 또는 KEY가 설정되지 않았습니다!", "ERROR")
+                return None
+
+            debug_print(f"URL: {url[:30]}..., KEY: {key[:10]}...", "INFO")
+
+            options = _build_client_options()
+            if options is not None:
+                _shared_client = create_client(url, key, options=options)
+            else:
+                _shared_client = create_client(url, key)
+            debug_print(
+                f"Supabase 공유 클라이언트 준비 완료 (최대 연결 {config.SUPABASE_MAX_CONNECTIONS})",
+                "SUCCESS",
+            )
+            _start_health_check()
+            return _shared_client
+        except Exception as e:
+            debug_print(f"Supabase 연결 실패: {str(e)}", "ERROR")
+            debug_print(f"오류 타입: {type(e).__name__}", "ERROR")
+            import traceback
+            debug_print(f"추적: {traceback.format_exc()}", "ERROR")
+            _report_db_error(e)
+            _shared_client = None
+            return None
+
 
 # ========================================
 # 카테고리 도우미
 # ========================================
 
+# 카테고리 테이블은 작고 거의 바뀌지 않으므로 프로세스 전역에 통째로 캐시합니다
+_category_cache = {
+    'rows': {},         # name -> row
+    'loaded_at': 0.0,   # 마지막 전체 로드 시각 (time.time())
+    'hits': 0,
+    'misses': 0,
+}
+_category_cache_lock = threading.Lock()
+
+
+def _load_categories(client) -> dict:
+    """categories 테이블 전체를 한 번에 읽어 name -> row 딕셔너리로 반환"""
+    res = client.table('categories').select('*').execute()
+    return {r['name']: r for r in (res.data or []) if r.get('name')}
+
+
 def get_category_by_name(name: str):
     """
     카테고리 이름으로 row 조회 (없으면 None)
-    """
+    CATEGORY_CACHE_TTL 동안은 캐시에서 바로 반환합니다.
+    """
+    ttl = config.CATEGORY_CACHE_TTL
+    with _category_cache_lock:
+        # 전체 테이블을 캐시하므로, 캐시가 유효하면 '없음'도 그대로 답할 수 있음
+        if time.time() - _category_cache['loaded_at'] < ttl:
+            _category_cache['hits'] += 1
+            return _category_cache['rows'].get(name)
+        _category_cache['misses'] += 1
     try:
         client = get_supabase_client()
         if not client:
             return None
-        res = client.table('categories').select('*').eq('name', name).execute()
-        if res.data and len(res.data) > 0:
-            return res.data[0]
-        return None
+        rows = _load_categories(client)
+        with _category_cache_lock:
+            _category_cache['rows'] = rows
+            _category_cache['loaded_at'] = time.time()
+        return rows.get(name)
     except Exception as e:
         debug_print(f"카테고리 조회 오류: {str(e)}", "ERROR")
         return None
 
 
+def invalidate_category_cache():
+    """카테고리 캐시 비우기 (카테고리를 추가/수정한 뒤 호출)"""
+    with _category_cache_lock:
+        _category_cache['rows'] = {}
+        _category_cache['loaded_at'] = 0.0
+    debug_print("카테고리 캐시 초기화", "INFO")
+
+
+def get_category_cache_stats() -> dict:
+    """
+    카테고리 캐시 적중 통계
+    
+    반환값:
+        {'hits', 'misses', 'hit_rate', 'size', 'age_seconds'}
+    """
+    with _category_cache_lock:
+        hits = _category_cache['hits']
+        misses = _category_cache['misses']
+        loaded_at = _category_cache['loaded_at']
+        size = len(_category_cache['rows'])
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total * 100, 1) if total else 0.0,
+        'size': size,
+        'age_seconds': round(time.time() - loaded_at, 1) if loaded_at else None,
+    }
+
+
 # ========================================
 # 사용자 관리
 # ========================================
@@ -628,6 +803,7 @@ def get_admin_teacher_codes(admin_id):
 def save_conversation(user_id, category_id, user_message, ai_response, session_id, is_private=False):
     """
     대화 기록 저장
+    (learning_stats 일별 집계는 DB 트리거가 함께 갱신합니다 - schema.sql 15번)
     
     매개변수:
         user_id: 사용자 ID
@@ -731,6 +907,7 @@ def get_conversations_by_session(user_id, session_id, limit=500):
 def save_quiz_attempt(user_id, category_id, quiz_data, user_answer, is_correct, time_taken=None):
     """
     퀴즈 시도 기록 저장
+    (learning_stats 일별 집계는 DB 트리거가 함께 갱신합니다 - schema.sql 15번)
     
     매개변수:
         user_id: 사용자 ID
@@ -772,9 +949,14 @@ def save_quiz_attempt(user_id, category_id, quiz_data, user_answer, is_correct,
         return None
 
 
+def _accuracy(correct, total) -> float:
+    """정답률(%) 계산 (소수 첫째 자리)"""
+    return round((correct / total * 100) if total else 0, 1)
+
+
 def get_user_quiz_stats(user_id, category_id=None):
     """
-    사용자의 퀴즈 통계 조회
+    사용자의 퀴즈 통계 조회 (Postgres에서 집계)
     
     매개변수:
         user_id: 사용자 ID
@@ -788,22 +970,31 @@ def get_user_quiz_stats(user_id, category_id=None):
         if not client:
             return {'total': 0, 'correct': 0, 'accuracy': 0}
         
-        query = client.table('quiz_attempts').select('*').eq('user_id', user_id)
-        
-        if category_id:
-            query = query.eq('category_id', category_id)
-        
-        result = query.execute()
-        attempts = result.data if result.data else []
-        
-        total = len(attempts)
-        correct = sum(1 for a in attempts if a['is_correct'])
-        accuracy = (correct / total * 100) if total > 0 else 0
+        try:
+            res = client.rpc('quiz_stats_summary', {
+                'user_id_input': user_id,
+                'category_id_input': category_id,
+            }).execute()
+            row = (res.data or [{}])[0]
+            total = int(row.get('total') or 0)
+            correct = int(row.get('correct') or 0)
+        except Exception as rpc_error:
+            # schema.sql의 집계 함수가 아직 없으면 개수만 세는 쿼리로 대체 (행 전송 없음)
+            debug_print(f"quiz_stats_summary RPC 사용 불가, count 쿼리로 대체: {str(rpc_error)}", "WARNING")
+            def _count(only_correct: bool) -> int:
+                query = client.table('quiz_attempts').select('id', count='exact').eq('user_id', user_id)
+                if category_id:
+                    query = query.eq('category_id', category_id)
+                if only_correct:
+                    query = query.eq('is_correct', True)
+                return int(query.limit(1).execute().count or 0)
+            total = _count(False)
+            correct = _count(True)
         
         return {
             'total': total,
             'correct': correct,
-            'accuracy': round(accuracy, 1)
+            'accuracy': _accuracy(correct, total)
         }
     
     except Exception as e:
@@ -811,6 +1002,33 @@ def get_user_quiz_stats(user_id, category_id=None):
         return {'total': 0, 'correct': 0, 'accuracy': 0}
 
 
+def get_quiz_stats_by_category(user_id):
+    """
+    카테고리별 퀴즈 시도 수/정답률 (Postgres에서 집계)
+    
+    반환값:
+        [{'category_id', 'category_name', 'total', 'correct', 'accuracy'}]
+    """
+    try:
+        client = get_supabase_client()
+        if not client:
+            return []
+        res = client.rpc('quiz_stats_by_category', {'user_id_input': user_id}).execute()
+        return [
+            {
+                'category_id': r.get('category_id'),
+                'category_name': r.get('category_name'),
+                'total': int(r.get('total') or 0),
+                'correct': int(r.get('correct') or 0),
+                'accuracy': _accuracy(int(r.get('correct') or 0), int(r.get('total') or 0)),
+            }
+            for r in (res.data or [])
+        ]
+    except Exception as e:
+        debug_print(f"카테고리별 퀴즈 통계 조회 오류: {str(e)}", "ERROR")
+        return []
+
+
 # ========================================
 # 단어장 관리
 # ========================================
@@ -949,10 +1167,11 @@ def count_conversations(user_id: int | None = None) -> int:
         client = get_supabase_client()
         if not client:
             return 0
-        q = client.table('conversations').select('*', count='exact')
+        # 개수만 필요하므로 행 본문은 1개만 받습니다
+        q = client.table('conversations').select('id', count='exact')
         if user_id:
             q = q.eq('user_id', user_id)
-        res = q.execute()
+        res = q.limit(1).execute()
         return int(res.count or 0)
     except Exception as e:
         debug_print(f"대화 수 카운트 오류: {str(e)}", "ERROR")
@@ -974,14 +1193,104 @@ def fetch_recent_conversations(user_id: int | None = None, limit: int = 50):
         return []
 
 
-def get_quiz_attempts(user_id: int | None = None):
+# ========================================
+# 학습 통계 (learning_stats 일별 집계)
+# ========================================
+
+def get_learning_stats(user_id: int, days: int = 30):
+    """
+    사용자의 일별 학습 집계 조회 (원본 대화 행을 읽지 않음)
+    
+    매개변수:
+        user_id: 사용자 ID
+        days: 최근 며칠치
+    
+    반환값:
+        [{'date', 'message_count', 'quiz_count', 'quiz_correct', 'categories_used'}] (날짜 오름차순)
+    """
     try:
         client = get_supabase_client()
         if not client:
             return []
-        q = client.table('quiz_attempts').select('*').order('created_at', desc=True)
+        since = (datetime.now() - timedelta(days=days - 1)).date().isoformat()
+        res = client.table('learning_stats')\
+            .select('date,message_count,quiz_count,quiz_correct,categories_used')\
+            .eq('user_id', user_id).gte('date', since).order('date').execute()
+        return res.data or []
+    except Exception as e:
+        debug_print(f"학습 통계 조회 오류: {str(e)}", "ERROR")
+        return []
+
+
+def get_learning_stats_totals(days: int = 30, page_size: int = 1000):
+    """
+    전체 사용자의 일별 합계 (관리자용)
+    
+    반환값:
+        [{'date', 'message_count', 'quiz_count', 'quiz_correct', 'active_users'}] (날짜 오름차순)
+    """
+    try:
+        client = get_supabase_client()
+        if not client:
+            return []
+        try:
+            res = client.rpc('learning_stats_daily_totals', {'days_input': days}).execute()
+            return [
+                {
+                    'date': str(r.get('date'))[:10],
+                    'message_count': int(r.get('message_count') or 0),
+                    'quiz_count': int(r.get('quiz_count') or 0),
+                    'quiz_correct': int(r.get('quiz_correct') or 0),
+                    'active_users': int(r.get('active_users') or 0),
+                }
+                for r in (res.data or [])
+            ]
+        except Exception as rpc_error:
+            # RPC가 없으면 기간 내 집계 행을 받아 앱에서 합산 (행 수 = 사용자 수 × 일수)
+            # PostgREST는 한 번에 최대 행 수가 정해져 있으므로 page_size씩 끝까지 나눠 받습니다
+            debug_print(f"learning_stats_daily_totals RPC 사용 불가, 앱 합산으로 대체: {str(rpc_error)}", "WARNING")
+            since = (datetime.now() - timedelta(days=days - 1)).date().isoformat()
+            rows = []
+            start = 0
+            while True:
+                res = client.table('learning_stats')\
+                    .select('user_id,date,message_count,quiz_count,quiz_correct')\
+                    .gte('date', since).order('date').order('user_id')\
+                    .range(start, start + page_size - 1).execute()
+                page = res.data or []
+                rows.extend(page)
+                if len(page) < page_size:
+                    break
+                start += page_size
+            totals = {}
+            for r in rows:
+                d = str(r.get('date'))[:10]
+                t = totals.setdefault(d, {'date': d, 'message_count': 0, 'quiz_count': 0, 'quiz_correct': 0, 'active_users': 0})
+                t['message_count'] += int(r.get('message_count') or 0)
+                t['quiz_count'] += int(r.get('quiz_count') or 0)
+                t['quiz_correct'] += int(r.get('quiz_correct') or 0)
+                t['active_users'] += 1
+            return [totals[d] for d in sorted(totals)]
+    except Exception as e:
+        debug_print(f"전체 학습 통계 조회 오류: {str(e)}", "ERROR")
+        return []
+
+
+def get_quiz_attempts(user_id: int | None = None, columns: str = '*', limit: int | None = None):
+    """
+    퀴즈 시도 원본 행 조회
+    통계만 필요하면 get_user_quiz_stats / get_quiz_stats_by_category 또는 일별 집계(get_learning_stats)를 사용하세요.
+    columns로 quiz_data(JSON) 같은 큰 컬럼을 제외할 수 있습니다.
+    """
+    try:
+        client = get_supabase_client()
+        if not client:
+            return []
+        q = client.table('quiz_attempts').select(columns).order('created_at', desc=True)
         if user_id:
             q = q.eq('user_id', user_id)
+        if limit:
+            q = q.limit(limit)
         res = q.execute()
         return res.data or []
     except Exception as e:
@@ -1005,10 +1314,11 @@ def list_teachers(limit: int = 100):
 # 문제은행 (교사용)
 # ========================================
 
-def create_question_bank_item(created_by: int, qtype: str, question: str, options: list | None, answer: str, explanation: str | None, category: str | None, grade: str | None, difficulty: int | None, tags: list | None):
+def create_question_bank_item(created_by: int, qtype: str, question: str, options: list | None, answer: str, explanation: str | None, category: str | None, grade: str | None, difficulty: int | None, tags: list | None, question_hash: str | None = None):
     """
     문제은행 문항 생성
     options와 tags는 JSON으로 저장합니다.
+    question_hash: 정규화한 문항 텍스트 해시 (quiz/dedup.py, 중복 검사용)
     """
     try:
         client = get_supabase_client()
@@ -1028,6 +1338,8 @@ def create_question_bank_item(created_by: int, qtype: str, question: str, option
             'is_active': True,
             'created_at': datetime.now().isoformat(),
         }
+        if question_hash:
+            data['question_hash'] = question_hash
         res = client.table('question_bank').insert(data).execute()
         return res.data[0] if res.data else None
     except Exception as e:
@@ -1035,27 +1347,179 @@ def create_question_bank_item(created_by: int, qtype: str, question: str, option
         return None
 
 
-def list_question_bank_items(created_by: int, category: str | None = None, search: str | None = None, limit: int = 200):
+def create_question_bank_items(created_by: int, items: list[dict], batch_size: int = 100):
+    """
+    문제은행 문항 여러 개를 다중 행 insert로 저장
+    같은 교사의 문제은행에 question_hash가 같은 문항이 이미 있으면 건너뜁니다.
+
+    매개변수:
+        items: [{'type', 'question', 'options', 'answer', 'explanation',
+                 'category', 'grade', 'difficulty', 'tags', 'question_hash'}]
+        batch_size: insert 한 번에 보낼 행 수
+
+    반환값:
+        {'inserted': 저장한 행 리스트, 'skipped': 이미 있어 건너뛴 수, 'failed': 실패한 수}
+    """
+    result = {'inserted': [], 'skipped': 0, 'failed': 0}
+    if not items:
+        return result
+    try:
+        client = get_supabase_client()
+        if not client:
+            result['failed'] = len(items)
+            return result
+        hashes = [it.get('question_hash') for it in items if it.get('question_hash')]
+        existing = set()
+        for i in range(0, len(hashes), batch_size):
+            res = client.table('question_bank').select('question_hash')\
+                .eq('created_by', created_by).eq('is_active', True)\
+                .in_('question_hash', hashes[i:i + batch_size]).execute()
+            existing.update(r['question_hash'] for r in (res.data or []))
+        now_iso = datetime.now().isoformat()
+        payload = []
+        for it in items:
+            h = it.get('question_hash')
+            if h and h in existing:
+                result['skipped'] += 1
+                continue
+            if h:
+                existing.add(h)  # 같은 요청 안의 중복도 한 번만 저장
+            payload.append({
+                'created_by': created_by,
+                'type': it.get('type'),
+                'question': it.get('question', ''),
+                'options': it.get('options') or [],
+                'answer': str(it.get('answer') or ''),
+                'explanation': it.get('explanation'),
+                'category': it.get('category'),
+                'grade': it.get('grade'),
+                'difficulty': it.get('difficulty'),
+                'tags': it.get('tags') or [],
+                'question_hash': h,
+                'is_active': True,
+                'created_at': now_iso,
+            })
+        for i in range(0, len(payload), batch_size):
+            batch = payload[i:i + batch_size]
+            try:
+                res = client.table('question_bank').insert(batch).execute()
+                result['inserted'].extend(res.data or [])
+            except Exception as e:
+                debug_print(f"문제은행 일괄 저장 배치 오류: {str(e)}", "ERROR")
+                result['failed'] += len(batch)
+        debug_print(f"문제은행 일괄 저장: {len(result['inserted'])}개 저장, {result['skipped']}개 중복 건너뜀", "INFO")
+        return result
+    except Exception as e:
+        debug_print(f"문제은행 일괄 저장 오류: {str(e)}", "ERROR")
+        result['failed'] = len(items) - len(result['inserted']) - result['skipped']
+        return result
+
+
+def list_question_bank_fingerprints(created_by: int, limit: int = 2000):
     """
-    교사가 만든 문제은행 문항 목록 조회
+    중복 검사용 최근 문항 목록 (필요한 컬럼만)
+
+    반환값:
+        [{'id', 'type', 'question', 'options', 'question_hash'}]
     """
     try:
         client = get_supabase_client()
         if not client:
             return []
-        q = client.table('question_bank').select('*').eq('created_by', created_by).eq('is_active', True)
-        if category:
-            q = q.eq('category', category)
-        # Supabase는 간단한 like 제공
-        if search:
-            q = q.like('question', f"%{search}%")
-        res = q.order('created_at', desc=True).limit(limit).execute()
+        res = client.table('question_bank').select('id,type,question,options,question_hash')\
+            .eq('created_by', created_by).eq('is_active', True)\
+            .order('created_at', desc=True).limit(limit).execute()
         return res.data or []
     except Exception as e:
-        debug_print(f"문제은행 목록 조회 오류: {str(e)}", "ERROR")
+        debug_print(f"문제은행 중복 검사 목록 조회 오류: {str(e)}", "ERROR")
         return []
 
 
+def search_question_bank_items(
+    created_by: int,
+    search: str | None = None,
+    category: str | None = None,
+    grade: str | None = None,
+    difficulty: int | None = None,
+    limit: int = 50,
+    cursor: dict | None = None,
+):
+    """
+    문제은행 검색 (한 페이지씩, 최신순)
+    문항/해설/태그 검색과 과목/학년/난이도 조건을 DB에서 처리합니다 (schema.sql 19번).
+
+    매개변수:
+        cursor: 이전 페이지가 돌려준 다음 페이지 커서 (처음이면 None)
+
+    반환값:
+        (문항 리스트, 다음 페이지 커서 또는 None)
+    """
+    try:
+        client = get_supabase_client()
+        if not client:
+            return [], None
+        search = (search or "").strip() or None
+        # 다음 페이지가 있는지 알기 위해 1개 더 받습니다
+        try:
+            res = client.rpc('search_question_bank', {
+                'created_by_input': created_by,
+                'search_input': search,
+                'category_input': category,
+                'grade_input': grade,
+                'difficulty_input': difficulty,
+                'after_created_at': cursor.get('created_at') if cursor else None,
+                'after_id': cursor.get('id') if cursor else None,
+                'limit_input': limit + 1,
+            }).execute()
+            rows = res.data or []
+        except Exception as rpc_error:
+            # schema.sql의 검색 함수가 아직 없으면 같은 조건의 일반 쿼리로 대체 (검색어는 인덱스 없이 비교)
+            debug_print(f"search_question_bank RPC 사용 불가, 일반 쿼리로 대체: {str(rpc_error)}", "WARNING")
+            q = client.table('question_bank').select('*').eq('created_by', created_by).eq('is_active', True)
+            if category:
+                q = q.eq('category', category)
+            if grade:
+                q = q.eq('grade', grade)
+            if difficulty:
+                q = q.eq('difficulty', difficulty)
+            if search:
+                q = q.ilike('question', f"%{search}%")
+            if cursor:
+                q = q.or_(f"created_at.lt.{cursor['created_at']},and(created_at.eq.{cursor['created_at']},id.lt.{cursor['id']})")
+            res = q.order('created_at', desc=True).order('id', desc=True).limit(limit + 1).execute()
+            rows = res.data or []
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = {'created_at': rows[-1]['created_at'], 'id': rows[-1]['id']}
+        return rows, next_cursor
+    except Exception as e:
+        debug_print(f"문제은행 검색 오류: {str(e)}", "ERROR")
+        return [], None
+
+
+def list_question_bank_items(
+    created_by: int,
+    category: str | None = None,
+    search: str | None = None,
+    limit: int = 200,
+    grade: str | None = None,
+    difficulty: int | None = None,
+):
+    """
+    교사가 만든 문제은행 문항 목록 조회 (첫 페이지, 다음 페이지는 search_question_bank_items 사용)
+    """
+    items, _ = search_question_bank_items(
+        created_by,
+        search=search,
+        category=category,
+        grade=grade,
+        difficulty=difficulty,
+        limit=limit,
+    )
+    return items
+
+
 # ========================================
 # 과제 관리 (교사/학생)
 # ========================================
@@ -1277,9 +1741,10 @@ def assignment_stats(assignment_id: int):
 # 문서/RAG 헬퍼
 # ========================================
 
-def create_document(user_id: int, title: str | None, file_name: str, content_type: str | None):
+def create_document(user_id: int, title: str | None, file_name: str, content_type: str | None, content_hash: str | None = None):
     """
     문서 메타 생성 후 행 반환
+    content_hash: 파일 바이트의 SHA-256 (같은 파일 재업로드 판별용)
     """
     try:
         client = get_supabase_client()
@@ -1290,6 +1755,7 @@ def create_document(user_id: int, title: str | None, file_name: str, content_typ
             'title': title or file_name,
             'file_name': file_name,
             'content_type': content_type,
+            'content_hash': content_hash,
             'created_at': datetime.now().isoformat()
         }
         res = client.table('documents').insert(data).execute()
@@ -1299,6 +1765,146 @@ def create_document(user_id: int, title: str | None, file_name: str, content_typ
         return None
 
 
+def get_document_by_hash(user_id: int, content_hash: str):
+    """같은 사용자가 같은 내용의 파일을 이미 올렸는지 조회 (없으면 None)"""
+    try:
+        client = get_supabase_client()
+        if not client:
+            return None
+        res = client.table('documents').select('*')\
+            .eq('user_id', user_id).eq('content_hash', content_hash).limit(1).execute()
+        return res.data[0] if res.data else None
+    except Exception as e:
+        debug_print(f"문서 해시 조회 오류: {str(e)}", "ERROR")
+        return None
+
+
+def get_latest_document_by_name(user_id: int, file_name: str):
+    """같은 파일명으로 올린 가장 최근 문서 조회 (수정본 업로드 시 변경분만 반영하기 위해)"""
+    try:
+        client = get_supabase_client()
+        if not client:
+            return None
+        res = client.table('documents').select('*')\
+            .eq('user_id', user_id).eq('file_name', file_name)\
+            .order('created_at', desc=True).limit(1).execute()
+        return res.data[0] if res.data else None
+    except Exception as e:
+        debug_print(f"문서 이름 조회 오류: {str(e)}", "ERROR")
+        return None
+
+
+def update_document(document_id: int, **fields):
+    """문서 메타 일부 갱신 (content_hash, title 등)"""
+    try:
+        client = get_supabase_client()
+        if not client:
+            return False
+        client.table('documents').update(fields).eq('id', document_id).execute()
+        return True
+    except Exception as e:
+        debug_print(f"문서 갱신 오류: {str(e)}", "ERROR")
+        return False
+
+
+def list_document_chunk_hashes(document_id: int, with_embeddings: bool = False, page_size: int = 500):
+    """
+    문서의 청크 해시 목록 (본문은 받지 않음, 임베딩은 with_embeddings일 때만)
+    PostgREST 최대 행 수에 잘리지 않도록 page_size씩 끝까지 나눠 받습니다.
+    
+    반환값:
+        [{'id', 'chunk_index', 'chunk_hash', 'metadata'(, 'embedding')}]
+        조회에 실패하면 None (일부만 받은 목록으로 변경분을 계산하지 않도록)
+    """
+    try:
+        client = get_supabase_client()
+        if not client:
+            return None
+        columns = 'id,chunk_index,chunk_hash,metadata'
+        if with_embeddings:
+            columns += ',embedding'
+        rows = []
+        start = 0
+        while True:
+            res = (
+                client.table('document_chunks')
+                .select(columns)
+                .eq('document_id', document_id)
+                .order('chunk_index')
+                .range(start, start + page_size - 1)
+                .execute()
+            )
+            page = res.data or []
+            if with_embeddings:
+                # pgvector 값은 '[0.1,0.2,...]' 문자열로 옵니다
+                for row in page:
+                    if isinstance(row.get('embedding'), str):
+                        row['embedding'] = json.loads(row['embedding'])
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+    except Exception as e:
+        debug_print(f"청크 해시 조회 오류: {str(e)}", "ERROR")
+        return None
+
+
+def delete_document_chunks(chunk_ids: list[int], user_id: int | None = None, batch_size: int = 200):
+    """
+    청크 여러 개 삭제 (id 목록)
+    user_id를 주면 그 사용자의 검색 캐시만, 없으면 전체 검색 캐시를 비웁니다.
+    """
+    if not chunk_ids:
+        return True
+    try:
+        client = get_supabase_client()
+        if not client:
+            return False
+        for i in range(0, len(chunk_ids), batch_size):
+            client.table('document_chunks').delete().in_('id', chunk_ids[i:i + batch_size]).execute()
+        invalidate_retrieval_cache(user_id)
+        return True
+    except Exception as e:
+        debug_print(f"청크 삭제 오류: {str(e)}", "ERROR")
+        return False
+
+
+def update_document_chunk_positions(rows: list[dict], user_id: int | None = None, batch_size: int = 200):
+    """
+    재사용하는 청크의 위치/메타만 일괄 갱신 (임베딩은 그대로)
+    
+    매개변수:
+        rows: [{'id', 'chunk_index', 'metadata'}]
+        user_id: 검색 캐시를 비울 사용자 (없으면 전체)
+    """
+    if not rows:
+        return True
+    try:
+        client = get_supabase_client()
+        if not client:
+            return False
+        # (document_id, chunk_index)가 유일하므로, 자리를 맞바꾸는 청크끼리 부딪히지 않게
+        # 먼저 음수 임시 위치로 옮긴 뒤 최종 위치로 옮깁니다.
+        # id 충돌 시 전달한 컬럼만 갱신되는 upsert로 다중 행을 한 번에 보냅니다
+        parked = [{'id': row['id'], 'chunk_index': -(n + 1)} for n, row in enumerate(rows)]
+        for stage in (parked, rows):
+            for i in range(0, len(stage), batch_size):
+                client.table('document_chunks').upsert(stage[i:i + batch_size], on_conflict='id').execute()
+        invalidate_retrieval_cache(user_id)
+        return True
+    except Exception as e:
+        debug_print(f"청크 위치 갱신 오류: {str(e)}", "ERROR")
+        return False
+
+
+def vector_literal(embedding: list[float]) -> str:
+    """
+    pgvector 텍스트 표기('[0.1,0.2,...]')로 변환 (유효숫자 6자리)
+    JSON 숫자 배열(17자리)보다 전송 크기가 절반 이하로 줄고, float32 정밀도 손실은 없습니다.
+    """
+    return "[" + ",".join(f"{x:.6g}" for x in embedding) + "]"
+
+
 def add_document_chunk(document_id: int, user_id: int, content: str, embedding: list[float], chunk_index: int, metadata: dict | None = None):
     """
     문서 청크와 임베딩 저장
@@ -1312,11 +1918,12 @@ def add_document_chunk(document_id: int, user_id: int, content: str, embedding:
             'user_id': user_id,
             'chunk_index': chunk_index,
             'content': content,
-            'embedding': embedding,
+            'embedding': vector_literal(embedding),
             'metadata': metadata or {},
             'created_at': datetime.now().isoformat()
         }
         client.table('document_chunks').insert(data).execute()
+        invalidate_retrieval_cache(user_id)
         return True
     except Exception as e:
         # 업로드 시 수백 개 청크에서 동일 오류가 반복되어 콘솔이 과도하게 지저분해질 수 있어
@@ -1324,27 +1931,212 @@ def add_document_chunk(document_id: int, user_id: int, content: str, embedding:
         return False
 
 
-def search_document_chunks(user_id: int, query_embedding: list[float], match_count: int = 5, document_id: int | None = None):
+# 청크 저장 upsert 기준 (schema.sql의 idx_document_chunks_doc_position)
+CHUNK_CONFLICT_KEY = 'document_id,chunk_index'
+
+
+def _insert_chunk_batch(client, batch: list[dict], retries: int) -> list[int]:
+    """
+    청크 묶음을 한 번의 다중 행 upsert로 저장합니다.
+    (document_id, chunk_index) 기준이라, 응답만 놓치고 실제로는 저장된 묶음을
+    다시 보내도 중복 행이 생기지 않습니다.
+    실패하면 백오프 후 재시도하고, 끝까지 실패하면 행 단위로 나눠 저장해
+    문제 있는 청크만 골라냅니다.
+    
+    반환값:
+        저장에 실패한 chunk_index 리스트
     """
-    RPC를 통해 사용자 문서 청크 중에서 유사도 높은 상위 결과를 반환합니다.
+    for attempt in range(retries + 1):
+        try:
+            client.table('document_chunks').upsert(batch, on_conflict=CHUNK_CONFLICT_KEY).execute()
+            return []
+        except Exception as e:
+            if attempt < retries:
+                time.sleep(0.5 * (2 ** attempt))
+                continue
+            debug_print(f"청크 배치 저장 실패({len(batch)}개) → 행 단위 재시도: {str(e)}", "WARNING")
+    failed = []
+    for row in batch:
+        try:
+            client.table('document_chunks').upsert(row, on_conflict=CHUNK_CONFLICT_KEY).execute()
+        except Exception:
+            failed.append(row.get('chunk_index'))
+    return failed
+
+
+def add_document_chunks(rows: list[dict], batch_size: int = 50, max_workers: int = 4, retries: int = 2):
+    """
+    문서 청크 여러 개를 다중 행 upsert로 저장 (배치 병렬 처리)
+    같은 문서의 같은 chunk_index 행이 이미 있으면 덮어씁니다.
+    
+    매개변수:
+        rows: [{'document_id', 'user_id', 'chunk_index', 'content', 'embedding', 'metadata', 'chunk_hash'}]
+        batch_size: upsert 한 번에 보낼 행 수
+        max_workers: 동시에 보낼 배치 수
+        retries: 배치별 재시도 횟수
+    
+    반환값:
+        {'inserted': 저장 성공 수, 'failed': 실패한 chunk_index 리스트}
     """
+    if not rows:
+        return {'inserted': 0, 'failed': []}
+    all_indexes = [r.get('chunk_index') for r in rows]
     try:
         client = get_supabase_client()
         if not client:
-            return []
-        params = {
-            'query_embedding': query_embedding,
-            'match_count': match_count,
-            'user_id_input': user_id,
-            'document_id_input': document_id
-        }
-        res = client.rpc('match_document_chunks', params).execute()
-        return res.data or []
+            return {'inserted': 0, 'failed': all_indexes}
+        now_iso = datetime.now().isoformat()
+        payload = [
+            {
+                'document_id': r['document_id'],
+                'user_id': r['user_id'],
+                'chunk_index': r['chunk_index'],
+                'content': r['content'],
+                'embedding': vector_literal(r['embedding']),
+                'metadata': r.get('metadata') or {},
+                'chunk_hash': r.get('chunk_hash'),
+                'created_at': now_iso,
+            }
+            for r in rows
+        ]
+        batches = [payload[i:i + batch_size] for i in range(0, len(payload), batch_size)]
+        failed = []
+        try:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(batches)))) as pool:
+                for batch_failed in pool.map(lambda b: _insert_chunk_batch(client, b, retries), batches):
+                    failed.extend(batch_failed)
+        finally:
+            # 저장이 끝난 뒤에 비워야, 저장 중에 들어온 검색이 예전 결과를 다시 캐시하지 않습니다
+            for uid in {r['user_id'] for r in rows}:
+                invalidate_retrieval_cache(uid)
+        if failed:
+            debug_print(f"청크 저장 일부 실패: {len(failed)}/{len(rows)}개", "WARNING")
+        return {'inserted': len(rows) - len(failed), 'failed': sorted(failed)}
+    except Exception as e:
+        debug_print(f"청크 일괄 저장 오류: {str(e)}", "ERROR")
+        return {'inserted': 0, 'failed': all_indexes}
+
+
+# 사용자별 검색 결과 캐시: 같은 질문(임베딩)을 다시 물으면 RPC 없이 바로 반환합니다.
+# 사용자의 문서/청크가 바뀌면 해당 사용자 캐시를 비웁니다.
+# 비울 때마다 세대 번호를 올려, 비우기 전에 시작한 검색의 결과는 캐시에 넣지 않습니다.
+_retrieval_cache: dict[int, OrderedDict] = {}
+_retrieval_cache_lock = threading.Lock()
+_retrieval_stats = {'hits': 0, 'misses': 0, 'invalidations': 0}
+_retrieval_generation: dict = {None: 0}  # user_id -> 세대 (None: 전체 비우기 세대)
+
+
+def _retrieval_gen(user_id: int) -> tuple[int, int]:
+    """사용자 캐시의 현재 세대 (호출 측에서 _retrieval_cache_lock 보유)"""
+    return _retrieval_generation[None], _retrieval_generation.get(user_id, 0)
+
+
+def _retrieval_key(query_embedding: list[float], match_count: int, document_id: int | None) -> str:
+    # float32로 맞춘 바이트를 해시해 부동소수점 표기 차이에 영향받지 않도록 합니다
+    digest = hashlib.sha256(array('f', query_embedding).tobytes()).hexdigest()
+    return f"{digest}:{document_id}:{match_count}"
+
+
+def invalidate_retrieval_cache(user_id: int | None = None):
+    """사용자(없으면 전체)의 검색 결과 캐시 비우기"""
+    with _retrieval_cache_lock:
+        if user_id is None:
+            _retrieval_cache.clear()
+        else:
+            _retrieval_cache.pop(user_id, None)
+        _retrieval_generation[user_id] = _retrieval_generation.get(user_id, 0) + 1
+        _retrieval_stats['invalidations'] += 1
+
+
+def get_retrieval_cache_stats() -> dict:
+    """
+    검색 결과 캐시 적중 통계
+    
+    반환값:
+        {'hits', 'misses', 'hit_rate', 'invalidations', 'users', 'entries'}
+    """
+    with _retrieval_cache_lock:
+        stats = dict(_retrieval_stats)
+        stats['users'] = len(_retrieval_cache)
+        stats['entries'] = sum(len(v) for v in _retrieval_cache.values())
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total * 100, 1) if total else 0.0
+    return stats
+
+
+def search_document_chunks(user_id: int, query_embedding: list[float], match_count: int = 5, document_id: int | None = None):
+    """
+    사용자 문서 청크 중에서 유사도 높은 상위 결과를 반환합니다.
+    실제 검색은 RAG_RETRIEVAL_BACKEND로 고른 백엔드(pgvector RPC 또는 로컬 인덱스)가 맡습니다.
+    같은 임베딩/문서/개수로 다시 검색하면 캐시된 결과를 돌려줍니다 (RETRIEVAL_CACHE_TTL초 동안).
+    """
+    from rag.retrieval import get_retrieval_backend
+
+    key = _retrieval_key(query_embedding, match_count, document_id)
+    now = time.time()
+    with _retrieval_cache_lock:
+        entries = _retrieval_cache.get(user_id)
+        hit = entries.get(key) if entries else None
+        if hit and now - hit[0] < config.RETRIEVAL_CACHE_TTL:
+            entries.move_to_end(key)
+            _retrieval_stats['hits'] += 1
+            return [dict(r) for r in hit[1]]
+        _retrieval_stats['misses'] += 1
+        generation = _retrieval_gen(user_id)
+    try:
+        rows = get_retrieval_backend().search(user_id, query_embedding, match_count, document_id)
+        with _retrieval_cache_lock:
+            if _retrieval_gen(user_id) != generation:
+                # 검색 중에 청크가 바뀜 → 결과는 돌려주되 캐시에는 넣지 않음
+                return [dict(r) for r in rows]
+            entries = _retrieval_cache.setdefault(user_id, OrderedDict())
+            entries[key] = (now, rows)
+            entries.move_to_end(key)
+            while len(entries) > config.RETRIEVAL_CACHE_MAX_PER_USER:
+                entries.popitem(last=False)
+        return [dict(r) for r in rows]
     except Exception as e:
         debug_print(f"문서 청크 검색 오류: {str(e)}", "ERROR")
         return []
 
 
+def export_document_chunks(user_id: int, page_size: int = 500, with_embeddings: bool = True):
+    """
+    사용자 청크 전체 반환 (로컬 검색/키워드 색인을 처음 채울 때 사용)
+    DB에 연결할 수 없으면 None
+    """
+    columns = 'id, document_id, chunk_index, content, metadata'
+    if with_embeddings:
+        columns += ', embedding'
+    try:
+        client = get_supabase_client()
+        if not client:
+            return None
+        rows = []
+        start = 0
+        while True:
+            res = (
+                client.table('document_chunks')
+                .select(columns)
+                .eq('user_id', user_id)
+                .order('id')
+                .range(start, start + page_size - 1)
+                .execute()
+            )
+            page = res.data or []
+            for row in page:
+                # PostgREST는 vector 컬럼을 '[0.1,0.2,...]' 문자열로 돌려줍니다
+                if isinstance(row.get('embedding'), str):
+                    row['embedding'] = json.loads(row['embedding'])
+            rows.extend(page)
+            if len(page) < page_size:
+                return rows
+            start += page_size
+    except Exception as e:
+        debug_print(f"문서 청크 내보내기 오류: {str(e)}", "ERROR")
+        return None
+
+
 def list_documents(user_id: int):
     """
     사용자 문서 목록 반환
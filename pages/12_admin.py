@@ -9,7 +9,7 @@ import pandas as pd
 import plotly.express as px
 
 from utils.session_manager import require_login, get_current_user
-from database.supabase_manager import count_all_users, count_users_by_role, count_conversations, list_teachers, fetch_recent_conversations
+from database.supabase_manager import count_all_users, count_users_by_role, count_conversations, list_teachers, get_learning_stats_totals
 from utils.helpers import render_auth_modals, render_sidebar_auth_controls, render_sidebar_navigation
 
 st.set_page_config(page_title="👑 관리자", page_icon="👑", layout="wide")
@@ -41,14 +41,15 @@ with col3:
 with col4:
     st.metric("총 대화 수", convs)
 
-st.subheader("대화 추이 (최근 데이터 기반)")
-limit = st.slider("가져올 개수(최대)", 100, 2000, 500, step=100)
-rows = fetch_recent_conversations(user_id=None, limit=int(limit))
+st.subheader("대화 추이 (일별 집계 기반)")
+days = st.slider("표시할 기간(일)", 7, 180, 30, step=1)
+rows = get_learning_stats_totals(days=int(days))
 if rows:
-    df = pd.DataFrame([{ 'date': r.get('created_at','')[:10], 'count': 1 } for r in rows])
-    daily = df.groupby('date')['count'].sum().reset_index()
-    fig = px.line(daily, x='date', y='count', title='일자별 대화 수')
+    df = pd.DataFrame([{ 'date': r['date'], 'count': r['message_count'], 'users': r['active_users'] } for r in rows])
+    fig = px.line(df, x='date', y='count', title='일자별 대화 수')
     st.plotly_chart(fig, use_container_width=True)
+    fig_users = px.line(df, x='date', y='users', title='일자별 활동 사용자 수')
+    st.plotly_chart(fig_users, use_container_width=True)
 else:
     st.info("표시할 대화 데이터가 아직 충분하지 않습니다.")
 
@@ -8,8 +8,9 @@ import streamlit as st
 
 from utils.session_manager import require_teacher_or_admin, get_current_user
 from utils.helpers import render_auth_modals, render_sidebar_auth_controls, render_sidebar_navigation, show_success, show_error
-from database.supabase_manager import create_question_bank_item, list_question_bank_items
-from quiz.quiz_generator import generate_quiz
+from database.supabase_manager import create_question_bank_item, create_question_bank_items, search_question_bank_items
+from quiz.quiz_generator import stream_quiz
+from quiz.dedup import check_duplicates, mark_saved
 
 
 st.set_page_config(page_title="📚 문제은행", page_icon="📚", layout="wide")
@@ -39,8 +40,19 @@ with tab_make:
             difficulty = st.slider("난이도", min_value=1, max_value=5, value=2)
         submit = st.form_submit_button("생성")
     if submit:
-        data = generate_quiz(category=category, grade=grade or None, quiz_type=quiz_type, count=int(count), difficulty=int(difficulty))
-        st.session_state.qb_generated = data.get("questions", [])
+        # 문제가 하나 완성될 때마다 바로 보여줍니다 (교사 문항은 학생용 퀴즈 풀과 섞지 않음)
+        questions = []
+        preview = st.empty()
+        for q in stream_quiz(category=category, grade=grade or None, quiz_type=quiz_type, count=int(count), difficulty=int(difficulty), user_id=user.get('id'), use_pool=False):
+            questions.append(q)
+            with preview.container():
+                st.caption(f"문제를 만드는 중이에요... ({len(questions)}/{int(count)})")
+                for i, item in enumerate(questions, start=1):
+                    st.markdown(f"**문제 {i}.** {item.get('question', '')}")
+        preview.empty()
+        st.session_state.qb_generated = questions
+        # 내 문제은행에 이미 있는(거의 같은) 문항 표시
+        st.session_state.qb_duplicates = check_duplicates(user['id'], questions) if questions else []
         if st.session_state.qb_generated:
             show_success(f"{len(st.session_state.qb_generated)}문제를 생성했어요.")
         else:
@@ -54,32 +66,52 @@ with tab_make:
         with cols[0]:
             save_all = st.button("모두 저장")
         with cols[1]:
-            st.button("새로 생성", on_click=lambda: st.session_state.pop("qb_generated", None))
+            st.button("새로 생성", on_click=lambda: [st.session_state.pop(k, None) for k in ("qb_generated", "qb_duplicates")])
 
+        duplicates = st.session_state.get("qb_duplicates") or []
         if save_all:
-            saved = 0
-            for q in generated:
-                item = create_question_bank_item(
-                    created_by=user['id'],
-                    qtype=q.get('type') or quiz_type,
-                    question=q.get('question', ''),
-                    options=q.get('options') or [],
-                    answer=str(q.get('answer') or ''),
-                    explanation=q.get('explanation') or None,
-                    category=category,
-                    grade=grade or None,
-                    difficulty=int(difficulty),
-                    tags=[],
-                )
-                if item:
-                    saved += 1
+            # 겹치는 문항은 빼고 한 번에 저장
+            items = []
+            for q, dup in zip(generated, duplicates or [None] * len(generated)):
+                if dup and dup['status'] != 'new':
+                    continue
+                items.append({
+                    'type': q.get('type') or quiz_type,
+                    'question': q.get('question', ''),
+                    'options': q.get('options') or [],
+                    'answer': str(q.get('answer') or ''),
+                    'explanation': q.get('explanation') or None,
+                    'category': category,
+                    'grade': grade or None,
+                    'difficulty': int(difficulty),
+                    'tags': [],
+                    'question_hash': dup['hash'] if dup else None,
+                })
+            result = create_question_bank_items(user['id'], items)
+            saved = len(result['inserted'])
+            skipped = len(generated) - len(items) + result['skipped']
+            if saved:
+                st.session_state.pop("_qb_list_filters", None)  # 목록 탭 다시 불러오기
+                # 방금 저장한 문항도 '이미 있음'으로 표시 (실패한 배치가 없으면 건너뛴 문항도 이미 저장돼 있음)
+                if result['failed']:
+                    saved_hashes = {row.get('question_hash') for row in result['inserted']}
+                else:
+                    saved_hashes = {it['question_hash'] for it in items}
+                duplicates = st.session_state.qb_duplicates = mark_saved(generated, duplicates, saved_hashes)
             if saved > 0:
-                show_success(f"{saved}문제를 저장했어요.")
+                show_success(f"{saved}문제를 저장했어요." + (f" (겹치는 문항 {skipped}개는 건너뛰었어요)" if skipped else ""))
+            elif skipped:
+                show_error(f"모든 문항이 이미 문제은행에 있어요. ({skipped}개 건너뜀)")
             else:
                 show_error("저장에 실패했어요.")
 
         for i, q in enumerate(generated, start=1):
-            with st.expander(f"문제 {i}: {q.get('question', '')[:40]}"):
+            dup = duplicates[i - 1] if i - 1 < len(duplicates) else None
+            flag = "⚠️ " if dup and dup['status'] != 'new' else ""
+            with st.expander(f"{flag}문제 {i}: {q.get('question', '')[:40]}"):
+                if flag:
+                    label = "이미 저장된 문항과 같아요" if dup['status'] == 'duplicate' else f"비슷한 문항이 있어요 (유사도 {dup['similarity']:.2f})"
+                    st.warning(f"{label}: {(dup.get('match') or '')[:60]}")
                 st.write(q.get('question', ''))
                 opts = q.get('options') or []
                 if isinstance(opts, list) and opts:
@@ -101,8 +133,10 @@ with tab_make:
                         grade=grade or None,
                         difficulty=int(difficulty),
                         tags=[],
+                        question_hash=dup['hash'] if dup else None,
                     )
                     if item:
+                        st.session_state.pop("_qb_list_filters", None)  # 목록 탭 다시 불러오기
                         show_success("저장했어요.")
                     else:
                         show_error("저장 실패")
@@ -112,27 +146,37 @@ with tab_make:
 
 with tab_list:
     st.subheader("내 문항 목록")
-    f_col1, f_col2, f_col3 = st.columns([1,1,1])
+    f_col1, f_col2, f_col3, f_col4, f_col5 = st.columns([1,1,1,1,1])
     with f_col1:
         f_category = st.text_input("카테고리 필터", value="")
     with f_col2:
-        f_search = st.text_input("검색어", value="")
+        f_grade = st.text_input("학년 필터", value="")
     with f_col3:
+        f_difficulty = st.selectbox("난이도 필터", options=["(전체)", 1, 2, 3, 4, 5], index=0)
+    with f_col4:
+        f_search = st.text_input("검색어", value="", help="문항/해설/태그에서 찾습니다.")
+    with f_col5:
         refresh = st.button("새로고침")
 
-    if refresh:
-        st.session_state._qb_list_refresh = True
-
-    # 목록 조회
-    items = list_question_bank_items(
-        created_by=user['id'],
-        category=(f_category.strip() or None),
-        search=(f_search.strip() or None),
-        limit=200,
-    )
+    # 목록 조회 (조건은 DB에서 처리, 50개씩 이어서 불러오기)
+    diff = None if f_difficulty == "(전체)" else int(f_difficulty)
+    filters = (f_category.strip() or None, f_grade.strip() or None, diff, f_search.strip() or None)
+    if refresh or st.session_state.get("_qb_list_filters") != filters:
+        page, cursor = search_question_bank_items(
+            created_by=user['id'],
+            search=filters[3],
+            category=filters[0],
+            grade=filters[1],
+            difficulty=diff,
+            limit=50,
+        )
+        st.session_state._qb_list_filters = filters
+        st.session_state._qb_list_items = page
+        st.session_state._qb_list_cursor = cursor
+    items = st.session_state.get("_qb_list_items", [])
 
     if items:
-        st.caption(f"총 {len(items)}문항")
+        st.caption(f"불러온 문항 {len(items)}개")
         for it in items:
             with st.container(border=True):
                 st.write(f"[{it.get('type')}] {it.get('question')}")
@@ -141,5 +185,19 @@ with tab_list:
                     st.caption("보기: " + " | ".join([str(o) for o in opts]))
                 st.caption(f"정답: {it.get('answer')} / 난이도: {it.get('difficulty') or '-'} / 카테고리: {it.get('category') or '-'} / 학년: {it.get('grade') or '-'}")
                 st.caption(f"작성시각: {it.get('created_at')}")
+        cursor = st.session_state.get("_qb_list_cursor")
+        if cursor and st.button("더 보기"):
+            page, cursor = search_question_bank_items(
+                created_by=user['id'],
+                search=filters[3],
+                category=filters[0],
+                grade=filters[1],
+                difficulty=diff,
+                limit=50,
+                cursor=cursor,
+            )
+            st.session_state._qb_list_items = items + page
+            st.session_state._qb_list_cursor = cursor
+            st.rerun()
     else:
         st.info("아직 저장된 문항이 없어요. 위에서 생성하거나 직접 추가해보세요.")
\ No newline at end of file
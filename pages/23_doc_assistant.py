@@ -16,14 +16,15 @@ from utils.helpers import (
     render_new_chat_controls,
     show_error,
     show_warning,
-    show_success,
 )
 from ai.deepseek_handler import stream_chat_response
+from rag.embeddings import load_embed_model, embed_texts
+from rag.ingest import submit_ingest_job, get_job_status, list_user_jobs, has_active_jobs
+from rag.retrieval import hybrid_search
+import config
 from database.supabase_manager import (
     get_category_by_name,
     save_conversation,
-    create_document,
-    add_document_chunk,
     search_document_chunks,
     list_documents,
     get_supabase_client,
@@ -43,176 +44,69 @@ st.title("📄 문서 도우미 (교사용)")
 st.caption("PDF/텍스트를 업로드해 지식 베이스로 만들고, 근거를 인용하며 설명합니다.")
 
 
-# ===== Embedding model loader =====
-EMBED_DIM = 384
-
-def _load_embed_model():
-    try:
-        import streamlit as st
-        from sentence_transformers import SentenceTransformer
-
-        @st.cache_resource(show_spinner=False)
-        def _cached_model():
-            return SentenceTransformer('sentence-transformers/all-MiniLM-L6-v2')
-
-        return _cached_model()
-    except Exception as e:
-        # 가벼운 폴백 임베더: 384차원 영벡터 반환 (업로드/검색은 제한적이지만 서버 중단 방지)
-        show_warning(f"임베딩 모델 로드 오류: {str(e)}. 임시로 폴백 임베더(영벡터)를 사용합니다. 'pip install sentence-transformers' 설치 후 재시도하세요.")
-        class ZeroEmbedder:
-            def encode(self, texts, normalize_embeddings=True):
-                # 순수 파이썬으로 고정 영벡터 반환 (numpy 미의존)
-                return [[0.0] * EMBED_DIM for _ in range(len(texts))]
-        return ZeroEmbedder()
-
-def _embed_texts(model, texts: list[str], batch_size: int = 32) -> list[list[float]]:
-    try:
-        # 대량 텍스트는 배치로 나눠 인코딩해 메모리/CPU 급증을 방지
-        all_vecs: list[list[float]] = []
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i+batch_size]
-            vecs = model.encode(batch, normalize_embeddings=True)
-            # encode 결과가 numpy 배열 또는 파이썬 리스트 모두 지원
-            try:
-                all_vecs.extend([v.tolist() for v in vecs])
-            except Exception:
-                all_vecs.extend([list(v) for v in vecs])
-        return all_vecs
-    except Exception as e:
-        show_error(f"텍스트 임베딩 오류: {str(e)}")
-        return []
-
-
-# ===== Text chunking =====
-def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 200) -> list[str]:
-    text = text or ""
-    chunks = []
-    start = 0
-    n = len(text)
-    while start < n:
-        end = min(start + chunk_size, n)
-        chunks.append(text[start:end])
-        if end == n:
-            break
-        start = max(0, end - overlap)
-    return chunks
-
+# ===== Upload & index UI =====
+STAGE_LABELS = {
+    'queued': "대기 중",
+    'parse': "텍스트 추출 중",
+    'chunk': "청크 나누는 중",
+    'embed': "임베딩 계산 중",
+    'store': "저장 중",
+    'done': "완료",
+}
+
+def _render_ingest_status():
+    """인덱싱 작업 진행 상황 표시 (작업은 백그라운드 작업자 풀에서 실행됨)"""
+    jobs = list_user_jobs(user['id'])
+    if not jobs:
+        return
+    for job in jobs:
+        name = job['file_name']
+        if job['status'] in ('queued', 'running'):
+            st.progress(job['progress'], text=f"{name} · {STAGE_LABELS.get(job['stage'], job['stage'])}")
+        elif job['status'] == 'failed':
+            show_error(f"{name}: 인덱싱 실패 - {job['error']}")
+        elif job['failed']:
+            shown = ", ".join(str(i) for i in job['failed'][:10])
+            show_warning(f"{name}: {job['inserted']} 청크 저장, {len(job['failed'])} 청크 실패 (번호: {shown}{' …' if len(job['failed']) > 10 else ''})")
+        elif job.get('mode') == 'unchanged':
+            st.caption(f"✅ {name}: 이미 인덱싱된 파일이에요 (변경 없음)")
+        elif job.get('mode') == 'incremental':
+            st.caption(f"✅ {name}: 변경된 청크 {job['inserted']}개만 반영했어요 (기존 {job['reused']}개 재사용)")
+        else:
+            st.caption(f"✅ {name}: 인덱싱 완료 ({job['inserted']} 청크)")
+        for w in job['warnings']:
+            st.caption(f"⚠️ {name}: {w}")
 
-# ===== PDF/Text parsers =====
-def parse_pdf_bytes(pdf_bytes: bytes) -> list[tuple[int, str]]:
-    """Return list of (page_no, text) for each page."""
-    try:
-        import fitz  # PyMuPDF
-    except Exception:
-        show_error("PDF 처리를 위해 'pip install pymupdf' 설치가 필요합니다.")
-        return []
-    try:
-        doc = fitz.open(stream=pdf_bytes, filetype='pdf')
-        pages = []
-        for i in range(doc.page_count):
-            page = doc.load_page(i)
-            text = page.get_text("text") or ""
-            pages.append((i + 1, text))
-        return pages
-    except Exception as e:
-        show_error(f"PDF 파싱 오류: {str(e)}")
-        return []
 
-def read_text_bytes(txt_bytes: bytes) -> str:
-    for enc in ('utf-8', 'cp949', 'euc-kr', 'utf-16'):
-        try:
-            return txt_bytes.decode(enc)
-        except Exception:
-            continue
-    return txt_bytes.decode('utf-8', errors='ignore')
+# 진행 중에는 상태 영역만 주기적으로 다시 그립니다 (Streamlit 버전에 따라 fragment 미지원 시 수동 새로고침)
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
 
 
-# ===== Upload & index UI =====
 with st.container(border=True):
     st.subheader("문서 업로드/인덱싱")
     files = st.file_uploader("PDF 또는 텍스트 파일 업로드", type=["pdf", "txt"], accept_multiple_files=True)
     if files:
-        model = _load_embed_model()
-        if not model:
-            st.stop()
         # Supabase 연결 확인 (환경 변수 미설정/연결 실패 시 명확한 안내)
         client = get_supabase_client()
         if not client:
             show_error("Supabase 연결 설정(SUPABASE_URL/SUPABASE_KEY)이 필요합니다. Supabase 대시보드 SQL Editor에서 database/schema.sql을 실행해 테이블/RPC도 준비하세요.")
             st.stop()
-        progress = st.progress(0.0, text="인덱싱 준비 중…")
-        total_chunks = 0
-        failed_chunks = 0
-        processed_files = 0
-        for idx, f in enumerate(files, start=1):
-            try:
-                file_bytes = f.read()
-                content_type = 'application/pdf' if f.type == 'application/pdf' or f.name.lower().endswith('.pdf') else 'text/plain'
-                doc_row = create_document(user_id=user['id'], title=f.name, file_name=f.name, content_type=content_type)
-                if not doc_row:
-                    show_error(f"문서 메타 저장 실패: {f.name}")
-                    continue
-
-                if content_type == 'application/pdf':
-                    # 페이지를 한 번에 메모리에 올리지 않고, 페이지별로 청크를 생성하며 제한을 적용
-                    page_chunks = []
-                    meta_list = []
-                    try:
-                        import fitz  # PyMuPDF
-                        pdf = fitz.open(stream=file_bytes, filetype='pdf')
-                        MAX_CHUNKS = 500
-                        for pno in range(pdf.page_count):
-                            if len(page_chunks) >= MAX_CHUNKS:
-                                show_warning(f"페이지 {pno+1}부터는 청크 제한({MAX_CHUNKS})으로 건너뜁니다.")
-                                break
-                            page = pdf.load_page(pno)
-                            ptxt = page.get_text("text") or ""
-                            cks = chunk_text(ptxt)
-                            for ck in cks:
-                                if len(page_chunks) >= MAX_CHUNKS:
-                                    break
-                                page_chunks.append(ck)
-                                meta_list.append({"page": pno + 1, "file": f.name})
-                        pdf.close()
-                    except Exception as e:
-                        show_error(f"PDF 파싱 오류: {str(e)}")
-                        page_chunks = []
-                        meta_list = []
-                else:
-                    text = read_text_bytes(file_bytes)
-                    page_chunks = chunk_text(text)
-                    meta_list = [{"file": f.name} for _ in page_chunks]
-
-                # 너무 많은 청크는 제한해 서버 과부하 방지
-                MAX_CHUNKS = 500
-                if len(page_chunks) > MAX_CHUNKS:
-                    show_warning(f"청크가 {len(page_chunks)}개로 너무 많아 {MAX_CHUNKS}개만 저장합니다.")
-                    page_chunks = page_chunks[:MAX_CHUNKS]
-                    meta_list = meta_list[:MAX_CHUNKS]
-
-                # embed and store (배치 처리)
-                embeddings = _embed_texts(model, page_chunks, batch_size=32)
-                for ci, (ck, emb, meta) in enumerate(zip(page_chunks, embeddings, meta_list)):
-                    ok = add_document_chunk(
-                        document_id=doc_row['id'],
-                        user_id=user['id'],
-                        content=ck,
-                        embedding=emb,
-                        chunk_index=ci,
-                        metadata=meta,
-                    )
-                    if ok:
-                        total_chunks += 1
-                    else:
-                        failed_chunks += 1
-                processed_files += 1
-                progress.progress(processed_files / len(files), text=f"{processed_files}/{len(files)} 파일 처리 완료")
-            except Exception as e:
-                show_error(f"파일 처리 오류({f.name}): {str(e)}")
-        if failed_chunks > 0:
-            show_error(f"인덱싱 일부 실패: 총 {processed_files}개 파일, {total_chunks} 청크 저장, {failed_chunks} 청크 실패")
-        else:
-            show_success(f"인덱싱 완료: 총 {processed_files}개 파일, {total_chunks} 청크 저장")
+        # 작업 제출은 파일 내용 기준으로 멱등이라, 재실행 때 같은 파일이 다시 처리되지 않습니다
+        # (실패한 파일도 마찬가지이며, "다시 시도"를 눌렀을 때만 다시 처리합니다)
+        for f in files:
+            content_type = 'application/pdf' if f.type == 'application/pdf' or f.name.lower().endswith('.pdf') else 'text/plain'
+            job_id = submit_ingest_job(user_id=user['id'], file_name=f.name, file_bytes=f.getvalue(), content_type=content_type)
+            job = get_job_status(job_id)
+            if job and job['status'] == 'failed' and st.button(f"🔁 {f.name} 다시 시도", key=f"ingest_retry_{job_id}"):
+                submit_ingest_job(user_id=user['id'], file_name=f.name, file_bytes=f.getvalue(), content_type=content_type, retry=True)
+                st.rerun()
+
+    if _fragment and has_active_jobs(user['id']):
+        _fragment(run_every=2)(_render_ingest_status)()
+    else:
+        _render_ingest_status()
+        if has_active_jobs(user['id']) and st.button("진행 상황 새로고침"):
+            st.rerun()
 
     # Show my documents
     try:
@@ -239,17 +133,25 @@ with st.container(border=True):
 
     question = st.chat_input("문서에 대해 궁금한 점을 물어보세요…")
     if question:
-        model = _load_embed_model()
-        if not model:
-            st.stop()
+        model = load_embed_model()
+        if getattr(model, 'is_fallback', False):
+            show_warning(f"임베딩 모델 로드 오류: {model.error}. 임시로 폴백 임베더(영벡터)를 사용합니다. 'pip install sentence-transformers' 설치 후 재시도하세요.")
         add_message('user', question)
 
         # retrieve relevant chunks
-        q_emb = _embed_texts(model, [question])
+        q_emb = embed_texts(model, [question])
         q_vec = q_emb[0] if q_emb else None
         top_chunks = []
-        if q_vec:
+        timings = None
+        if config.RAG_HYBRID_ENABLED:
+            # 벡터 + 키워드 검색 (성취기준 코드/이름처럼 정확한 용어도 찾도록)
+            top_chunks, timings = hybrid_search(user_id=user['id'], query_text=question, query_embedding=q_vec, match_count=5)
+        elif q_vec:
             top_chunks = search_document_chunks(user_id=user['id'], query_embedding=q_vec, match_count=5)
+        if timings and config.DEBUG_MODE:
+            stages = " · ".join(f"{k} {v:.0f}ms" for k, v in timings.items() if isinstance(v, float))
+            skipped = f" (시간 초과: {', '.join(timings['skipped'])})" if timings['skipped'] else ""
+            st.caption(f"검색 시간: {stages}{skipped}")
 
         # build context
         context_lines = []
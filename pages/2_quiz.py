@@ -10,7 +10,9 @@ import streamlit as st
 
 from utils.session_manager import require_login, get_current_user
 from utils.helpers import render_auth_modals, render_sidebar_auth_controls, render_sidebar_navigation
-from quiz.quiz_generator import generate_quiz
+from quiz.quiz_generator import stream_quiz
+from quiz import quiz_pool
+import config
 
 st.set_page_config(page_title="🎯 퀴즈", page_icon="🎯", layout="wide")
 with st.sidebar:
@@ -33,8 +35,21 @@ with col3:
 difficulty = st.slider("난이도", 1, 5, 2)
 
 if st.button("퀴즈 생성하기"):
-    data = generate_quiz(category, user.get('grade'), qtype, int(count), int(difficulty))
-    st.session_state["quiz_data"] = data
+    # 문제가 하나 완성될 때마다 미리보기로 보여줍니다 (풀이 화면은 다 만든 뒤 표시)
+    questions = []
+    preview = st.empty()
+    for q in stream_quiz(category, user.get('grade'), qtype, int(count), int(difficulty), user_id=user.get('id')):
+        questions.append(q)
+        with preview.container():
+            st.caption(f"문제를 만드는 중이에요... ({len(questions)}/{int(count)})")
+            for idx, item in enumerate(questions):
+                st.markdown(f"**Q{idx+1}. {item.get('question','')}**")
+    preview.empty()
+    # 방금 고른 조건의 다음 문제를 미리 만들어 두면 다음 "퀴즈 생성하기"가 바로 끝납니다
+    # (조건을 바꿀 때마다 하지 않고 실제로 생성한 조합만)
+    if config.QUIZ_POOL_ENABLED:
+        quiz_pool.prefetch(category, user.get('grade'), qtype, int(difficulty), user_id=user.get('id'))
+    st.session_state["quiz_data"] = {"questions": questions}
     st.session_state["quiz_answers"] = {}
     st.success("퀴즈가 생성되었어요!")
 
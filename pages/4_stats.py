@@ -9,7 +9,12 @@ import pandas as pd
 import plotly.express as px
 
 from utils.session_manager import require_login, get_current_user
-from database.supabase_manager import fetch_recent_conversations, get_quiz_attempts
+from database.supabase_manager import (
+    count_conversations,
+    get_learning_stats,
+    get_user_quiz_stats,
+    get_quiz_stats_by_category,
+)
 from utils.helpers import render_auth_modals, render_sidebar_auth_controls, render_sidebar_navigation
 
 st.set_page_config(page_title="📊 통계", page_icon="📊", layout="wide")
@@ -22,15 +27,25 @@ user = get_current_user()
 
 st.title("📊 나의 학습 통계")
 
-# 대화 기록 로드
-convs = fetch_recent_conversations(user_id=user['id'], limit=200)
-quizzes = get_quiz_attempts(user_id=user['id'])
+# 대화/일자별 퀴즈 통계는 일별 집계(learning_stats)에서 읽습니다 (원본 대화/퀴즈 행 전송 없음)
+daily_stats = get_learning_stats(user['id'], days=30)
+quiz_daily = [
+    {
+        'date': str(d.get('date'))[:10],
+        'total': d.get('quiz_count') or 0,
+        'correct': d.get('quiz_correct') or 0,
+        'accuracy': round((d.get('quiz_correct') or 0) / d['quiz_count'] * 100, 1),
+    }
+    for d in daily_stats if d.get('quiz_count')
+]
+# 퀴즈 통계는 DB에서 집계된 숫자만 받아옵니다 (quiz_data JSON 전송 없음)
+quiz_summary = get_user_quiz_stats(user['id'])
+quiz_by_cat = get_quiz_stats_by_category(user['id'])
 
 # 요약
-total_msgs = len(convs)
-quiz_total = len(quizzes)
-quiz_correct = sum(1 for q in quizzes if q.get('is_correct'))
-quiz_acc = round((quiz_correct/quiz_total*100) if quiz_total else 0, 1)
+total_msgs = count_conversations(user['id'])
+quiz_total = quiz_summary['total']
+quiz_acc = quiz_summary['accuracy']
 
 col1, col2, col3 = st.columns(3)
 with col1:
@@ -40,25 +55,25 @@ with col2:
 with col3:
     st.metric("퀴즈 정답률", f"{quiz_acc}%")
 
-# 일자별 메시지 수 그래프
-if convs:
-    df_msgs = pd.DataFrame([
-        {"date": c.get('created_at', '')[:10], "count": 1, "category": c.get('category_id')} for c in convs
+# 일자별 메시지 수 그래프 (최근 30일)
+if any(d.get('message_count') for d in daily_stats):
+    daily = pd.DataFrame([
+        {"date": str(d.get('date'))[:10], "count": d.get('message_count') or 0} for d in daily_stats
     ])
-    daily = df_msgs.groupby('date')['count'].sum().reset_index()
     fig = px.bar(daily, x='date', y='count', title='일자별 대화 메시지 수')
     st.plotly_chart(fig, use_container_width=True)
 else:
     st.info("아직 대화 기록이 충분하지 않아요.")
 
-# 퀴즈 정확도 표
-if quizzes:
-    df_q = pd.DataFrame([
-        {"date": q.get('created_at', '')[:10], "correct": 1 if q.get('is_correct') else 0} for q in quizzes
-    ])
-    daily_q = df_q.groupby('date')['correct'].mean().reset_index()
-    daily_q['accuracy(%)'] = (daily_q['correct']*100).round(1)
+# 퀴즈 정확도 표 (최근 30일)
+if quiz_daily:
+    daily_q = pd.DataFrame(quiz_daily).rename(columns={'accuracy': 'accuracy(%)'})
     st.subheader("일자별 퀴즈 정확도")
-    st.dataframe(daily_q[['date','accuracy(%)']], use_container_width=True)
+    st.dataframe(daily_q[['date','total','accuracy(%)']], use_container_width=True)
 else:
     st.info("퀴즈 기록이 아직 없어요.")
+
+if quiz_by_cat:
+    st.subheader("과목별 퀴즈 정확도")
+    df_cat = pd.DataFrame(quiz_by_cat).rename(columns={'accuracy': 'accuracy(%)'})
+    st.dataframe(df_cat[['category_name','total','accuracy(%)']], use_container_width=True)
@@ -0,0 +1,152 @@
+#(선택) pip install numpy sentence-transformers
+
+# ========================================
+# AI 학습 도우미 - 문항 중복 검사
+# ========================================
+# 문제은행에 같은(또는 거의 같은) 문항이 계속 쌓이지 않도록 저장 전에 확인합니다.
+# - 정확히 같은 문항: 유형 + 정규화한 문항 텍스트(공백/문장부호/대소문자 무시)의 해시
+# - 거의 같은 문항: 문항 + 보기 임베딩의 코사인 유사도가 QB_DUP_SIMILARITY% 이상
+# 임베딩은 문서 도우미와 같은 모델/캐시(rag/embeddings.py)를 씁니다.
+# 모델을 쓸 수 없으면 해시 비교만 합니다.
+# 문항 정규화/해시는 퀴즈 풀·퀴즈 생성기도 이 모듈의 것을 함께 씁니다.
+# ========================================
+
+import hashlib
+import re
+
+import config
+from database.supabase_manager import list_question_bank_fingerprints
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[QUIZ-DEDUP-{level}] {message}")
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+def normalize_question(text: str) -> str:
+    """비교용 문항 텍스트 (공백/문장부호/대소문자 무시)"""
+    return re.sub(r"[\W_]+", "", str(text or "").lower())
+
+
+def question_hash(question: dict) -> str:
+    """유형 + 정규화한 문항 텍스트의 SHA-256"""
+    key = f"{question.get('type', '')}:{normalize_question(question.get('question', ''))}"
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def _embed_text(question: dict) -> str:
+    """보기까지 합쳐서 비교 ('다음 중 옳은 것은?'처럼 짧은 문항끼리 잘못 겹치지 않게)"""
+    options = question.get('options') or []
+    if isinstance(options, list) and options:
+        return f"{question.get('question', '')}\n" + " / ".join(str(o) for o in options)
+    return str(question.get('question', ''))
+
+
+def _similarities(new_vectors: list, old_vectors: list) -> list[list[float]]:
+    """정규화된 벡터끼리 내적 = 코사인 유사도"""
+    if np is not None:
+        return (np.asarray(new_vectors, dtype=np.float32) @ np.asarray(old_vectors, dtype=np.float32).T).tolist()
+    return [[sum(a * b for a, b in zip(n, o)) for o in old_vectors] for n in new_vectors]
+
+
+def _embed(texts: list[str]) -> list | None:
+    """임베딩 (모델을 쓸 수 없으면 None)"""
+    try:
+        from rag.embeddings import load_embed_model, embed_texts
+
+        model = load_embed_model()
+        if getattr(model, 'is_fallback', False):
+            return None
+        vectors = embed_texts(model, texts)
+        return vectors if len(vectors) == len(texts) else None
+    except Exception as e:
+        debug_print(f"임베딩 오류 → 해시 비교만 사용: {str(e)}", "WARNING")
+        return None
+
+
+def check_duplicates(created_by: int, questions: list[dict], threshold: float | None = None) -> list[dict]:
+    """
+    새 문항들이 교사의 문제은행(최근 QB_DUP_SCAN_LIMIT개) 또는 서로와 겹치는지 확인합니다.
+
+    매개변수:
+        created_by: 교사 id
+        questions: [{'type', 'question', 'options', ...}]
+        threshold: 비슷한 문항으로 볼 유사도 (0~1, 기본 QB_DUP_SIMILARITY%)
+
+    반환값:
+        문항 순서대로 [{'hash', 'status': 'new' | 'duplicate' | 'similar',
+                        'similarity', 'match'(겹친 문항 텍스트)}]
+    """
+    threshold = config.QB_DUP_SIMILARITY / 100.0 if threshold is None else threshold
+    existing = list_question_bank_fingerprints(created_by, limit=config.QB_DUP_SCAN_LIMIT)
+    # 해시 컬럼이 없는 예전 문항도 같은 방식으로 다시 계산해 비교
+    by_hash = {row.get('question_hash') or question_hash(row): row for row in existing}
+
+    results = []
+    batch_hashes = {}
+    for i, q in enumerate(questions):
+        h = question_hash(q)
+        match = by_hash.get(h)
+        if match is None and h in batch_hashes:
+            match = questions[batch_hashes[h]]
+        batch_hashes.setdefault(h, i)
+        results.append({
+            'hash': h,
+            'status': 'duplicate' if match is not None else 'new',
+            'similarity': 1.0 if match is not None else 0.0,
+            'match': match.get('question') if match is not None else None,
+        })
+
+    pending = [i for i, r in enumerate(results) if r['status'] == 'new']
+    if not pending:
+        return results
+    new_texts = [_embed_text(questions[i]) for i in pending]
+    old_texts = [_embed_text(row) for row in existing]
+    vectors = _embed(new_texts + old_texts)
+    if vectors is None:
+        return results
+    new_vectors, old_vectors = vectors[:len(pending)], vectors[len(pending):]
+
+    # 기존 문항과 비교
+    if old_vectors:
+        for i, scores in zip(pending, _similarities(new_vectors, old_vectors)):
+            best = max(range(len(scores)), key=scores.__getitem__)
+            if scores[best] >= threshold:
+                results[i].update(status='similar', similarity=round(scores[best], 3), match=existing[best].get('question'))
+    # 같은 묶음 안에서 앞 문항과 비교
+    batch_scores = _similarities(new_vectors, new_vectors)
+    for a, i in enumerate(pending):
+        if results[i]['status'] != 'new':
+            continue
+        for b in range(a):
+            if results[pending[b]]['status'] == 'new' and batch_scores[a][b] >= threshold:
+                results[i].update(status='similar', similarity=round(batch_scores[a][b], 3), match=questions[pending[b]].get('question'))
+                break
+    flagged = sum(1 for r in results if r['status'] != 'new')
+    if flagged:
+        debug_print(f"문항 {len(questions)}개 중 {flagged}개가 기존/서로와 겹침", "INFO")
+    return results
+
+
+def mark_saved(questions: list[dict], results: list[dict] | None, saved_hashes: set) -> list[dict]:
+    """
+    방금 저장한 문항을 'duplicate'로 표시한 검사 결과를 돌려줍니다 (DB를 다시 검사하지 않음).
+
+    매개변수:
+        questions: check_duplicates에 넘긴 문항들
+        results: check_duplicates 결과 (없으면 해시만 계산)
+        saved_hashes: 이제 문제은행에 있는 문항 해시
+    """
+    marked = []
+    for q, r in zip(questions, results or [None] * len(questions)):
+        r = dict(r) if r else {'hash': question_hash(q), 'status': 'new', 'similarity': 0.0, 'match': None}
+        if r['status'] == 'new' and r['hash'] in saved_hashes:
+            r.update(status='duplicate', similarity=1.0, match=q.get('question'))
+        marked.append(r)
+    return marked
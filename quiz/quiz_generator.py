@@ -5,14 +5,23 @@
 # ========================================
 # 이 파일은 DeepSeek AI에게 요청해서 퀴즈를 자동으로 만들어줍니다.
 # - 객관식/OX/단답형을 지원합니다.
-# - 혹시 AI가 이상한 형식으로 보내면 안전하게 '기본 퀴즈'로 대체합니다.
+# - 답변을 스트리밍으로 받아 문제 하나가 완성될 때마다 바로 내보냅니다 (stream_quiz).
+#   형식이 깨진 문제는 그 문제만 버립니다.
+# - 문제를 하나도 못 받으면 안전하게 '기본 퀴즈'로 대체합니다.
+# - (선택) 퀴즈 풀(quiz/quiz_pool.py)에 미리 만들어 둔 문제가 있으면 바로 꺼내 줍니다.
 # ========================================
 
-import json
+import queue
+import threading
 import streamlit as st
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
 from typing import Literal
 
-from ai.deepseek_handler import generate_chat_response
+from ai.deepseek_handler import stream_chat_response
+from quiz import quiz_pool
+from quiz.dedup import question_hash
+from quiz.stream_parser import QuestionStreamParser
 import config
 
 
@@ -31,8 +40,36 @@ def debug_print(message, level="INFO"):
 
 QuizType = Literal["multiple", "true_false", "short_answer"]
 
+# 문제 하나에 필요한 출력 토큰, 요청 하나의 출력 토큰 예산
+QUESTION_MAX_TOKENS = 160
+REQUEST_MAX_TOKENS = 800
+# 요청 하나에 담을 최대 문제 수 (이보다 많으면 여러 요청으로 나눠 동시에 생성)
+QUESTIONS_PER_REQUEST = max(1, REQUEST_MAX_TOKENS // QUESTION_MAX_TOKENS)
 
-def _build_quiz_prompt(category: str, grade: str | None, quiz_type: QuizType, count: int, difficulty: int) -> str:
+_executor = None
+_executor_lock = threading.Lock()
+_DONE = object()
+
+
+def _build_quiz_prompt(
+    category: str,
+    grade: str | None,
+    quiz_type: QuizType,
+    count: int,
+    difficulty: int,
+    avoid: list[str] | None = None,
+    part: tuple[int, int] | None = None,
+) -> str:
+    avoid_text = ""
+    if avoid:
+        # 풀 보충 때: 이미 있는 문제와 겹치지 않게 (같은 프롬프트 반복도 피함)
+        avoid_text = "\n다음 문제들과 겹치지 않는 새로운 문제로 출제하세요:\n" + "\n".join(f"- {q[:80]}" for q in avoid) + "\n"
+    if part:
+        # 나눠서 만들 때: 묶음마다 다른 개념을 다루도록 (같은 요청으로 합쳐지지 않게도 함)
+        avoid_text += (
+            f"\n이 요청은 전체 문제 세트 중 {part[0] + 1}/{part[1]}번째 묶음입니다. "
+            f"다른 묶음과 겹치지 않도록, 단원을 {part[1]}부분으로 나눴을 때 {part[0] + 1}번째 부분의 개념 위주로 출제하세요.\n"
+        )
     return f"""
 당신은 학생을 위한 퀴즈 출제 도우미입니다.
 
@@ -42,7 +79,7 @@ def _build_quiz_prompt(category: str, grade: str | None, quiz_type: QuizType, co
 - 유형: {quiz_type}  # multiple(객관식), true_false(OX), short_answer(단답형)
 - 문제 수: {count}
 - 난이도: {difficulty}  # 1(쉬움)~5(어려움)
-
+{avoid_text}
 JSON만 반환하세요. 형식은 아래 예시를 정확히 따르세요.
 
 {{
@@ -88,37 +125,213 @@ def _fallback_quiz(quiz_type: QuizType, count: int) -> dict:
     return {"questions": questions}
 
 
-def generate_quiz(category: str, grade: str | None, quiz_type: QuizType = "multiple", count: int = 5, difficulty: int = 2) -> dict:
-    try:
-        prompt = _build_quiz_prompt(category, grade, quiz_type, count, difficulty)
-        ok, text = generate_chat_response(
-            category=category,
-            grade=grade,
-            is_teacher=False,
-            conversation_messages=[{"role": "user", "content": prompt}]
-        )
-        if not ok:
-            debug_print("AI 생성 실패 → 기본 퀴즈로 대체", "WARNING")
-            return _fallback_quiz(quiz_type, count)
-        
-        # JSON 파싱 시도
+def _valid_question(question: dict, quiz_type: QuizType) -> dict | None:
+    """문제 하나의 형식을 확인합니다 (쓸 수 없으면 None)"""
+    if not str(question.get("question") or "").strip():
+        return None
+    if question.get("answer") is None or str(question.get("answer")).strip() == "":
+        return None
+    question.setdefault("type", quiz_type)
+    if question["type"] == "multiple":
+        options = question.get("options")
+        if not isinstance(options, list) or len(options) < 2:
+            return None
+    return question
+
+
+def _get_executor():
+    """묶음 요청 작업자 풀 (여러 세션이 동시에 불러도 한 번만 만듦)"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, config.LLM_MAX_CONCURRENCY), thread_name_prefix="quiz-fanout")
+        return _executor
+
+
+def _shard_sizes(count: int) -> list[int]:
+    """문제 수를 요청 하나의 예산에 맞게 고르게 나눔 (예: 12 → [4, 4, 4])"""
+    shards = -(-count // QUESTIONS_PER_REQUEST)
+    base, extra = divmod(count, shards)
+    return [base + (1 if i < extra else 0) for i in range(shards)]
+
+
+def _iter_single_request(
+    category: str,
+    grade: str | None,
+    quiz_type: QuizType,
+    count: int,
+    difficulty: int,
+    avoid: list[str] | None = None,
+    part: tuple[int, int] | None = None,
+    stop: threading.Event | None = None,
+):
+    """
+    요청 하나를 스트리밍으로 받으며 문제가 완성될 때마다 내보냅니다 (깨진 문제는 버림)
+    stop이 설정되면 다음 조각을 받는 즉시 멈춥니다. 스트림을 닫으면 게이트웨이 호출도
+    취소됩니다 (같은 요청을 함께 읽는 다른 쪽이 없을 때).
+    """
+    prompt = _build_quiz_prompt(category, grade, quiz_type, count, difficulty, avoid, part)
+    parser = QuestionStreamParser()
+    yielded = 0
+    with closing(stream_chat_response(
+        category=category,
+        grade=grade,
+        is_teacher=False,
+        conversation_messages=[{"role": "user", "content": prompt}],
+        max_tokens=max(REQUEST_MAX_TOKENS, count * QUESTION_MAX_TOKENS),
+    )) as chunks:
+        for text in chunks:
+            if stop is not None and stop.is_set():
+                return
+            for question in parser.feed(text):
+                question = _valid_question(question, quiz_type)
+                if question is None:
+                    parser.broken += 1
+                    continue
+                yielded += 1
+                yield question
+                if yielded >= count:
+                    return
+    if parser.broken:
+        debug_print(f"형식이 깨진 문제 {parser.broken}개를 건너뛰었어요", "WARNING")
+
+
+def _iter_fanout(category: str, grade: str | None, quiz_type: QuizType, sizes: list[int], difficulty: int, avoid: list[str] | None):
+    """
+    묶음별 요청을 동시에 보내고 도착하는 순서대로 문제를 내보냅니다.
+    실제 동시 호출 수/속도는 LLM 게이트웨이의 전역 제한을 따릅니다.
+    읽는 쪽이 그만두면(문제가 다 모였거나 화면을 떠남) 남은 요청도 멈춥니다.
+    """
+    results = queue.Queue()
+    stop = threading.Event()
+
+    def run(index: int, size: int):
+        source = None
         try:
-            # 코드 블록 형태로 오면 제거
-            cleaned = text.strip().strip('`')
-            # 첫/마지막 ```json 제거
-            if cleaned.lower().startswith("json"):
-                cleaned = cleaned[4:].strip()
-            data = json.loads(cleaned)
-            if "questions" in data and isinstance(data["questions"], list) and len(data["questions"]) > 0:
-                debug_print("퀴즈 JSON 파싱 성공", "SUCCESS")
-                return data
-            else:
-                debug_print("퀴즈 JSON 구조가 비정상 → 기본 퀴즈", "WARNING")
-                return _fallback_quiz(quiz_type, count)
+            if stop.is_set():
+                return
+            source = _iter_single_request(category, grade, quiz_type, size, difficulty, avoid, part=(index, len(sizes)), stop=stop)
+            for question in source:
+                if stop.is_set():
+                    break
+                results.put(question)
         except Exception as e:
-            debug_print(f"JSON 파싱 오류: {str(e)} → 기본 퀴즈", "ERROR")
-            return _fallback_quiz(quiz_type, count)
+            debug_print(f"묶음 {index + 1}/{len(sizes)} 생성 오류: {str(e)}", "ERROR")
+        finally:
+            if source is not None:
+                # 스트림을 닫으면 게이트웨이의 업스트림 호출도 취소되어 자리/속도 제한 예산을 돌려줍니다
+                source.close()
+            results.put(_DONE)
+
+    executor = _get_executor()
+    for index, size in enumerate(sizes):
+        executor.submit(run, index, size)
+    try:
+        finished = 0
+        while finished < len(sizes):
+            item = results.get()
+            if item is _DONE:
+                finished += 1
+                continue
+            yield item
+    finally:
+        stop.set()
+
+
+def iter_requested_questions(category: str, grade: str | None, quiz_type: QuizType, count: int, difficulty: int, avoid: list[str] | None = None):
+    """
+    AI 답변을 스트리밍으로 받으며 문제가 하나 완성될 때마다 내보냅니다.
+    - 문제가 많으면 QUESTIONS_PER_REQUEST개씩 나눠 동시에 요청하고, 겹치는 문제는 뺍니다
+    - 겹치거나 일부 요청이 실패해 모자라면 한 번 더 요청해 채웁니다
+    - 깨진 문제는 그 문제만 버립니다. (기본 퀴즈로 대체하지 않음)
+    """
+    sizes = _shard_sizes(count)
+    seen = set()
+    collected = []
+    duplicates = 0
+
+    def accept(question: dict) -> bool:
+        nonlocal duplicates
+        h = question_hash(question)
+        if h in seen:
+            duplicates += 1
+            return False
+        seen.add(h)
+        collected.append(question)
+        return True
+
+    if len(sizes) == 1:
+        source = _iter_single_request(category, grade, quiz_type, count, difficulty, avoid)
+    else:
+        debug_print(f"문제 {count}개를 {len(sizes)}개 요청으로 나눠 동시에 생성 {sizes}", "INFO")
+        source = _iter_fanout(category, grade, quiz_type, sizes, difficulty, avoid)
+    try:
+        for question in source:
+            if accept(question):
+                yield question
+                if len(collected) >= count:
+                    break
+    finally:
+        # 다 모였으면 아직 도는 묶음 요청을 바로 멈춥니다
+        source.close()
+
+    missing = count - len(collected)
+    if missing > 0:
+        debug_print(f"모자란 {missing}문제 추가 요청 (겹친 문제 {duplicates}개)", "INFO")
+        topup_avoid = (avoid or []) + [q.get('question', '') for q in collected]
+        for question in _iter_single_request(category, grade, quiz_type, missing, difficulty, topup_avoid):
+            if accept(question):
+                yield question
+                if len(collected) >= count:
+                    break
+    if collected:
+        debug_print(f"퀴즈 {len(collected)}문제 스트리밍 파싱 성공", "SUCCESS")
+
+
+def request_questions(category: str, grade: str | None, quiz_type: QuizType, count: int, difficulty: int, avoid: list[str] | None = None) -> list[dict] | None:
+    """
+    AI에게 문제를 요청합니다 (기본 퀴즈로 대체하지 않음, 퀴즈 풀 보충에도 사용)
+
+    반환값:
+        문제 목록, 하나도 못 받으면 None
+    """
+    questions = list(iter_requested_questions(category, grade, quiz_type, count, difficulty, avoid))
+    return questions or None
+
+
+def stream_quiz(category: str, grade: str | None, quiz_type: QuizType = "multiple", count: int = 5, difficulty: int = 2, user_id: int | None = None, use_pool: bool = True):
+    """
+    문제를 하나씩 내보내는 제너레이터 (화면에서 1번 문제부터 바로 보여줄 때 사용)
+    풀에 문제가 있으면 바로 꺼내고, 하나도 못 만들면 기본 퀴즈를 내보냅니다.
+    use_pool=False면 풀에서 꺼내지도, 만든 문제를 풀에 넣지도 않습니다 (교사 문제은행용).
+    """
+    use_pool = use_pool and config.QUIZ_POOL_ENABLED
+    questions = []
+    try:
+        if use_pool:
+            pooled = quiz_pool.take(category, grade, quiz_type, count, difficulty, user_id=user_id)
+            if pooled:
+                yield from pooled
+                return
+
+        for question in iter_requested_questions(category, grade, quiz_type, count, difficulty):
+            questions.append(question)
+            yield question
     except Exception as e:
         debug_print(f"퀴즈 생성 중 알 수 없는 오류: {str(e)}", "ERROR")
-        return _fallback_quiz(quiz_type, count)
 
+    if not questions:
+        debug_print("AI 생성 실패 → 기본 퀴즈로 대체", "WARNING")
+        yield from _fallback_quiz(quiz_type, count)["questions"]
+        return
+    if use_pool:
+        # 직접 만든 문제도 풀에 넣어 다른 학생이 바로 받을 수 있게 합니다
+        quiz_pool.add_questions(category, grade, quiz_type, difficulty, questions, user_id=user_id)
+
+
+def generate_quiz(category: str, grade: str | None, quiz_type: QuizType = "multiple", count: int = 5, difficulty: int = 2, user_id: int | None = None, use_pool: bool = True) -> dict:
+    """
+    퀴즈를 만들어 돌려줍니다. 실패하면 기본 퀴즈로 대체합니다.
+    user_id를 주면 퀴즈 풀에서 그 학생이 아직 받지 않은 문제만 꺼냅니다.
+    """
+    return {"questions": list(stream_quiz(category, grade, quiz_type, count, difficulty, user_id=user_id, use_pool=use_pool))}
@@ -0,0 +1,229 @@
+# ========================================
+# AI 학습 도우미 - 퀴즈 풀 (미리 만들어 둔 문제)
+# ========================================
+# "퀴즈 생성하기"를 누를 때마다 AI를 기다리지 않도록
+# (과목, 학년, 유형, 난이도)별로 문제를 미리 만들어 두고 바로 꺼내 줍니다.
+# - 백그라운드 작업 스레드가 풀을 채우고, 학생에게 남은 새 문제가
+#   QUIZ_POOL_LOW_WATER보다 적어지면 다시 보충합니다
+# - 학생마다 이미 받은 문제를 기억해 같은 문제가 다시 나오지 않게 합니다
+# - 오래된 문제와 한동안 쓰지 않은 풀은 QUIZ_POOL_TTL이 지나면 버립니다
+# 메모리에만 보관합니다 (서버를 다시 시작하면 비워짐).
+# ========================================
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from quiz.dedup import question_hash
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[QUIZ-POOL-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 학생 한 명당 기억할 (이미 받은) 문제 수
+SEEN_PER_USER = 500
+# 기억할 학생 수 (오래 안 쓴 학생부터 잊음)
+MAX_USERS = 5000
+# 새 문제를 만들 때 "겹치지 말 것"으로 알려줄 기존 문제 수
+AVOID_SAMPLES = 15
+
+
+_pools: dict[tuple, dict] = {}
+_seen: OrderedDict = OrderedDict()
+_lock = threading.RLock()  # _schedule_refill → _get_executor처럼 잡은 채로 다시 잡는 경우가 있음
+_executor = None
+_pending: set = set()
+_stats = {'hits': 0, 'misses': 0, 'refills': 0, 'refill_failed': 0, 'added': 0, 'duplicates': 0, 'expired': 0}
+
+
+def _key(category: str, grade: str | None, quiz_type: str, difficulty: int) -> tuple:
+    return (category, grade or "", quiz_type, int(difficulty))
+
+
+def _get_executor():
+    """보충 작업자 풀 (여러 스레드가 동시에 불러도 한 번만 만듦)"""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=max(1, config.QUIZ_POOL_WORKERS), thread_name_prefix="quiz-pool")
+        return _executor
+
+
+def _expire(now: float):
+    """오래된 문제/풀 정리 (호출 측에서 _lock 보유)"""
+    ttl = config.QUIZ_POOL_TTL
+    for key in list(_pools):
+        pool = _pools[key]
+        if now - pool['last_used'] > ttl and key not in _pending:
+            del _pools[key]
+            _stats['expired'] += 1
+            continue
+        fresh = [q for q in pool['questions'] if now - q['created_at'] <= ttl]
+        if len(fresh) != len(pool['questions']):
+            _stats['expired'] += len(pool['questions']) - len(fresh)
+            pool['questions'] = fresh
+
+
+def _pool(key: tuple, now: float) -> dict:
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = {'questions': [], 'last_used': now}
+    pool['last_used'] = now
+    return pool
+
+
+def _seen_for(user_id) -> OrderedDict | None:
+    """학생이 이미 받은 문제 해시 (호출 측에서 _lock 보유)"""
+    if user_id is None:
+        return None
+    seen = _seen.get(user_id)
+    if seen is None:
+        seen = _seen[user_id] = OrderedDict()
+        while len(_seen) > MAX_USERS:
+            _seen.popitem(last=False)
+    else:
+        _seen.move_to_end(user_id)
+    return seen
+
+
+def _mark_seen(seen: OrderedDict | None, hashes: list[str]):
+    if seen is None:
+        return
+    for h in hashes:
+        seen[h] = True
+        seen.move_to_end(h)
+    while len(seen) > SEEN_PER_USER:
+        seen.popitem(last=False)
+
+
+def _unseen(pool: dict, seen: OrderedDict | None) -> list[dict]:
+    return [q for q in pool['questions'] if seen is None or q['hash'] not in seen]
+
+
+def _schedule_refill(key: tuple):
+    """보충 작업 예약 (같은 풀은 한 번에 하나만). 호출 측에서 _lock 보유"""
+    if key in _pending:
+        return
+    _pending.add(key)
+    _get_executor().submit(_refill, key)
+
+
+def _refill(key: tuple):
+    """백그라운드에서 문제 QUIZ_POOL_BATCH개를 새로 만들어 풀에 추가"""
+    from quiz.quiz_generator import request_questions
+
+    category, grade, quiz_type, difficulty = key
+    try:
+        with _lock:
+            pool = _pools.get(key)
+            avoid = [q['data'].get('question', '') for q in (pool['questions'][-AVOID_SAMPLES:] if pool else [])]
+        questions = request_questions(category, grade or None, quiz_type, config.QUIZ_POOL_BATCH, difficulty, avoid=avoid)
+        if questions:
+            added = add_questions(category, grade, quiz_type, difficulty, questions)
+            with _lock:
+                _stats['refills'] += 1
+            debug_print(f"풀 보충 {key}: {added}개 추가", "INFO")
+        else:
+            with _lock:
+                _stats['refill_failed'] += 1
+            debug_print(f"풀 보충 실패 {key}", "WARNING")
+    except Exception as e:
+        with _lock:
+            _stats['refill_failed'] += 1
+        debug_print(f"풀 보충 오류 {key}: {str(e)}", "ERROR")
+    finally:
+        with _lock:
+            _pending.discard(key)
+
+
+def add_questions(category: str, grade: str | None, quiz_type: str, difficulty: int, questions: list[dict], user_id=None) -> int:
+    """
+    만든 문제를 풀에 넣습니다 (이미 있는 문제는 건너뜀).
+    user_id를 주면 그 학생은 이 문제들을 이미 받은 것으로 기록합니다.
+
+    반환값:
+        새로 추가된 문제 수
+    """
+    now = time.time()
+    key = _key(category, grade, quiz_type, difficulty)
+    with _lock:
+        pool = _pool(key, now)
+        existing = {q['hash'] for q in pool['questions']}
+        hashes = []
+        added = 0
+        for data in questions:
+            h = question_hash(data)
+            hashes.append(h)
+            if h in existing:
+                _stats['duplicates'] += 1
+                continue
+            existing.add(h)
+            pool['questions'].append({'hash': h, 'data': data, 'created_at': now})
+            added += 1
+        # 한도를 넘으면 오래된 문제부터 버림
+        if len(pool['questions']) > config.QUIZ_POOL_MAX:
+            pool['questions'] = pool['questions'][-config.QUIZ_POOL_MAX:]
+        _stats['added'] += added
+        _mark_seen(_seen_for(user_id), hashes)
+    return added
+
+
+def take(category: str, grade: str | None, quiz_type: str, count: int, difficulty: int, user_id=None) -> list[dict] | None:
+    """
+    풀에서 학생이 아직 받지 않은 문제 count개를 꺼냅니다.
+    모자라면 None을 돌려주고(호출 측이 직접 생성), 남은 새 문제가 적으면 보충을 예약합니다.
+    """
+    now = time.time()
+    key = _key(category, grade, quiz_type, difficulty)
+    with _lock:
+        _expire(now)
+        pool = _pool(key, now)
+        seen = _seen_for(user_id)
+        unseen = _unseen(pool, seen)
+        picked = unseen[:count] if len(unseen) >= count else None
+        if picked:
+            _mark_seen(seen, [q['hash'] for q in picked])
+            _stats['hits'] += 1
+        else:
+            _stats['misses'] += 1
+        remaining = len(unseen) - (len(picked) if picked else 0)
+        if remaining < config.QUIZ_POOL_LOW_WATER:
+            _schedule_refill(key)
+    if picked:
+        debug_print(f"풀에서 문제 {count}개 제공 {key} (남은 새 문제 {remaining}개)", "INFO")
+        return [dict(q['data']) for q in picked]
+    return None
+
+
+def prefetch(category: str, grade: str | None, quiz_type: str, difficulty: int, user_id=None):
+    """조건의 풀이 비어 있으면 미리 채우기 시작합니다 (학생이 그 조건으로 퀴즈를 만든 뒤 호출)"""
+    now = time.time()
+    key = _key(category, grade, quiz_type, difficulty)
+    with _lock:
+        pool = _pool(key, now)
+        if len(_unseen(pool, _seen_for(user_id))) < config.QUIZ_POOL_LOW_WATER:
+            _schedule_refill(key)
+
+
+def get_pool_stats() -> dict:
+    """
+    퀴즈 풀 통계
+
+    반환값:
+        {'hits', 'misses', 'refills', 'refill_failed', 'added', 'duplicates', 'expired',
+         'pools', 'questions', 'pending_refills'}
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['pools'] = len(_pools)
+        stats['questions'] = sum(len(p['questions']) for p in _pools.values())
+        stats['pending_refills'] = len(_pending)
+    return stats
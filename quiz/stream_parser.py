@@ -0,0 +1,134 @@
+# ========================================
+# AI 학습 도우미 - 퀴즈 JSON 스트리밍 파서
+# ========================================
+# AI 답변이 조각조각 도착하는 동안 {"questions": [ {...}, {...} ]}를 읽어
+# 문제 객체 하나가 닫히는 즉시 꺼내 줍니다.
+# - 전체 답변을 기다리지 않고 1번 문제부터 화면에 보여줄 수 있습니다
+# - 문제 하나가 깨져 있어도 그 문제만 버리고 나머지는 살립니다
+# - ```json 코드 블록, 앞뒤 설명 문장, # 주석, 끝의 쉼표는 무시합니다
+# ========================================
+
+import json
+import re
+
+
+_TRAILING_COMMA_RE = re.compile(r",\s*([}\]])")
+
+
+def _strip_comments(text: str) -> str:
+    """문자열 바깥의 # 주석 제거 (프롬프트 예시를 그대로 따라 쓴 경우)"""
+    out = []
+    in_string = escaped = in_comment = False
+    for ch in text:
+        if in_comment:
+            if ch == "\n":
+                in_comment = False
+                out.append(ch)
+            continue
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == "#":
+            in_comment = True
+            continue
+        out.append(ch)
+    return "".join(out)
+
+
+def _loads_lenient(text: str):
+    """그대로 읽어 보고, 안 되면 주석/끝 쉼표를 정리해서 한 번 더 시도"""
+    try:
+        return json.loads(text)
+    except ValueError:
+        pass
+    try:
+        return json.loads(_TRAILING_COMMA_RE.sub(r"\1", _strip_comments(text)))
+    except ValueError:
+        return None
+
+
+class QuestionStreamParser:
+    """
+    조각을 feed()로 넣으면 새로 완성된 문제 객체 목록을 돌려줍니다.
+
+    배열 안에 들어 있는 객체 중 'question' 키가 있는 것을 문제로 봅니다.
+    (보기 배열 안의 객체 등 다른 객체는 무시)
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.pos = 0
+        self.stack: list[tuple[str, int]] = []  # (여는 괄호, 시작 위치)
+        self.in_string = False
+        self.escaped = False
+        self.in_comment = False
+        self.parsed = 0
+        self.broken = 0
+
+    def feed(self, text: str) -> list[dict]:
+        self.buffer += text
+        found = []
+        buf = self.buffer
+        i = self.pos
+        while i < len(buf):
+            ch = buf[i]
+            if self.in_comment:
+                if ch == "\n":
+                    self.in_comment = False
+            elif self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif ch == "\\":
+                    self.escaped = True
+                elif ch == '"':
+                    self.in_string = False
+            elif ch == '"':
+                self.in_string = True
+            elif ch == "#" and self.stack:
+                self.in_comment = True
+            elif ch in "{[":
+                self.stack.append((ch, i))
+            elif ch in "}]" and self.stack:
+                if self.stack[-1][0] != ("{" if ch == "}" else "["):
+                    self._recover()
+                else:
+                    opener, start = self.stack.pop()
+                    if ch == "}" and self.stack and self.stack[-1][0] == "[":
+                        item = self._object(buf[start:i + 1])
+                        if item is not None:
+                            found.append(item)
+            i += 1
+        self.pos = i
+        # 처리가 끝난 앞부분은 버퍼에서 정리 (열린 괄호가 없을 때만)
+        if not self.stack and not self.in_string:
+            self.buffer = ""
+            self.pos = 0
+        return found
+
+    def _recover(self):
+        """
+        짝이 맞지 않는 닫는 괄호: 배열 안의 객체(문제 후보)를 하나 닫을 때까지 되돌리고
+        그 문제는 깨진 것으로 셉니다. 뒤따르는 문제들은 다시 같은 배열 아래에서 읽힙니다.
+        (예: "options": ["x", "y"} 처럼 ]를 빠뜨린 경우)
+        """
+        while self.stack:
+            opener, _ = self.stack.pop()
+            if opener == "{" and self.stack and self.stack[-1][0] == "[":
+                self.broken += 1
+                return
+
+    def _object(self, text: str) -> dict | None:
+        data = _loads_lenient(text)
+        if not isinstance(data, dict):
+            self.broken += 1
+            return None
+        if 'question' not in data:
+            return None
+        self.parsed += 1
+        return data
@@ -0,0 +1,5 @@
+# ========================================
+# 문서/RAG 모듈 초기화
+# ========================================
+# 이 파일이 있으면 rag 폴더를 패키지로 인식합니다
+# ========================================
@@ -0,0 +1,152 @@
+# ========================================
+# AI 학습 도우미 - 문서 청크 나누기
+# ========================================
+# 긴 문서를 임베딩하기 좋은 크기의 조각(청크)으로 나눕니다.
+# - 문단 → 문장(한국어 종결어미 포함) 단위로 자르고, 토큰 예산 안에서 문장을 채웁니다.
+# - 문단 중간에서 끊길 때만 앞 청크의 마지막 문장을 겹쳐 넣습니다 (적응형 겹침).
+# - 청크는 페이지를 넘지 않으므로 인용 페이지 번호가 정확합니다.
+# - iter_chunks()는 페이지별로 청크를 바로바로 내보내는 제너레이터입니다.
+# ========================================
+
+import re
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 청크 하나의 목표 토큰 수 (all-MiniLM-L6-v2 최대 입력 256토큰 - 특수 토큰)
+CHUNK_TOKEN_BUDGET = 240
+# 겹침 최대 비율 (토큰 예산 대비)
+OVERLAP_RATIO = 0.15
+# 현재 청크가 이 비율 이상 찼으면 문단 경계에서 새 청크를 시작합니다
+PARAGRAPH_FLUSH_RATIO = 0.6
+
+
+_PARAGRAPH_RE = re.compile(r"\n\s*\n")
+# 문장 끝: 마침표/물음표/느낌표(+닫는 따옴표/괄호) 뒤 공백, 또는 '~다/요/죠/음/함/됨/임'으로 끝나는 줄
+_SENTENCE_RE = re.compile(r"(?<=[.!?。？！])[\"'”’)\]]*\s+|(?<=[다요죠음함됨임])\s*\n")
+_HANGUL_RE = re.compile(r"[가-힣]")
+_WORD_RE = re.compile(r"[^\s가-힣]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """토크나이저 없이 쓰는 토큰 수 추정 (한글은 글자당 1토큰, 그 외는 단어당 약 1.3토큰)"""
+    hangul = len(_HANGUL_RE.findall(text))
+    words = len(_WORD_RE.findall(text))
+    return hangul + int(words * 1.3 + 0.5)
+
+
+def make_token_counter(model):
+    """
+    임베딩 모델의 토크나이저로 토큰 수를 세는 함수 반환
+    (토크나이저가 없는 폴백 임베더면 estimate_tokens)
+    """
+    tokenizer = getattr(model, 'tokenizer', None)
+    if tokenizer is None or not hasattr(tokenizer, 'tokenize'):
+        return estimate_tokens
+    return lambda text: len(tokenizer.tokenize(text))
+
+
+def token_budget_for(model, default: int = CHUNK_TOKEN_BUDGET) -> int:
+    """모델 최대 입력 길이에 맞춘 토큰 예산 (특수 토큰 2개 제외)"""
+    max_len = getattr(model, 'max_seq_length', None)
+    return min(default, max_len - 2) if isinstance(max_len, int) and max_len > 2 else default
+
+
+def _split_sentences(paragraph: str) -> list[str]:
+    sentences = []
+    for part in _SENTENCE_RE.split(paragraph):
+        # PDF 줄바꿈은 문장 중간에도 들어가므로 공백으로 합칩니다
+        sentence = " ".join(part.split())
+        if sentence:
+            sentences.append(sentence)
+    return sentences
+
+
+def _split_chars(word: str, max_tokens: int, count) -> list[str]:
+    """띄어쓰기 없는 긴 문자열(긴 URL 등)을 예산에 맞춰 글자 수로 자릅니다"""
+    step = max(1, len(word) * max_tokens // max(1, count(word)))
+    return [word[i:i + step] for i in range(0, len(word), step)]
+
+
+def _split_long(sentence: str, max_tokens: int, count) -> list[str]:
+    """예산보다 긴 문장을 단어 단위로 자릅니다"""
+    pieces, current = [], []
+    for word in sentence.split(" "):
+        if count(word) > max_tokens:
+            if current:
+                pieces.append(" ".join(current))
+                current = []
+            pieces.extend(_split_chars(word, max_tokens, count))
+            continue
+        if current and count(" ".join(current + [word])) > max_tokens:
+            pieces.append(" ".join(current))
+            current = []
+        current.append(word)
+    if current:
+        pieces.append(" ".join(current))
+    return pieces
+
+
+def _units(text: str, max_tokens: int, count):
+    """(문장, 토큰 수, 문단 첫 문장 여부)를 순서대로 내보냅니다"""
+    for paragraph in _PARAGRAPH_RE.split(text or ""):
+        first = True
+        for sentence in _split_sentences(paragraph):
+            tokens = count(sentence)
+            parts = _split_long(sentence, max_tokens, count) if tokens > max_tokens else [sentence]
+            for part in parts:
+                yield part, (tokens if len(parts) == 1 else count(part)), first
+                first = False
+
+
+def _chunk_page(text: str, max_tokens: int, overlap_ratio: float, count):
+    overlap_budget = int(max_tokens * overlap_ratio)
+    current: list[tuple[str, int]] = []
+    used = 0
+    has_new = False  # 겹친 문장 말고 새 문장이 들어갔는지
+    for sentence, tokens, starts_paragraph in _units(text, max_tokens, count):
+        full = used + tokens > max_tokens
+        at_boundary = starts_paragraph and used >= max_tokens * PARAGRAPH_FLUSH_RATIO
+        if current and has_new and (full or at_boundary):
+            yield " ".join(s for s, _ in current)
+            # 문단 중간에서 끊겼을 때만, 예산 안에 드는 마지막 문장을 겹쳐 문맥을 이어줍니다
+            carry = []
+            if not starts_paragraph and overlap_budget:
+                kept = 0
+                for s, t in reversed(current):
+                    if kept + t > overlap_budget or kept + t + tokens > max_tokens:
+                        break
+                    carry.insert(0, (s, t))
+                    kept += t
+            current, used, has_new = carry, sum(t for _, t in carry), False
+        current.append((sentence, tokens))
+        used += tokens
+        has_new = True
+    if current and has_new:
+        yield " ".join(s for s, _ in current)
+
+
+def iter_chunks(pages, max_tokens: int = CHUNK_TOKEN_BUDGET, overlap_ratio: float = OVERLAP_RATIO, token_counter=None):
+    """
+    페이지별로 청크를 만들어 바로 내보내는 제너레이터
+
+    매개변수:
+        pages: (page_no, text)를 내보내는 반복 가능 객체 (텍스트 파일은 page_no가 None)
+        max_tokens: 청크 하나의 토큰 예산
+        overlap_ratio: 문단 중간에서 끊길 때 겹쳐 넣을 최대 비율
+        token_counter: 텍스트 → 토큰 수 함수 (기본: estimate_tokens)
+
+    반환값:
+        (page_no, chunk) 제너레이터
+    """
+    count = token_counter or estimate_tokens
+    for page_no, text in pages:
+        for chunk in _chunk_page(text, max_tokens, overlap_ratio, count):
+            yield page_no, chunk
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_TOKEN_BUDGET, overlap_ratio: float = OVERLAP_RATIO, token_counter=None) -> list[str]:
+    """텍스트 하나를 청크 리스트로 나눕니다"""
+    return [chunk for _, chunk in iter_chunks([(None, text)], max_tokens, overlap_ratio, token_counter)]
@@ -0,0 +1,165 @@
+# ========================================
+# AI 학습 도우미 - 임베딩 캐시 (SQLite)
+# ========================================
+# 같은 텍스트를 다시 임베딩하지 않도록 결과를 디스크에 저장합니다.
+# - 키: 모델 이름 + 공백 정규화한 텍스트의 SHA-256
+# - 값: float32 바이트 (numpy 없이 array 모듈로 저장)
+# - 크기 제한: 최대 개수를 넘으면 가장 오래 안 쓴 항목부터 삭제 (LRU)
+# 서버를 재시작해도 캐시가 유지됩니다.
+# ========================================
+
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+
+import config
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[EMBED-CACHE-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+CACHE_PATH = os.path.join(config.CURRENT_DIR, 'temp', 'embed_cache.sqlite3')
+# 한 번에 조회할 키 수 (SQLite 변수 개수 제한 대비)
+_LOOKUP_BATCH = 500
+
+
+_conn = None
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+_entry_count = None
+
+
+def text_hash(text: str) -> str:
+    """공백을 정규화한 텍스트의 SHA-256"""
+    return hashlib.sha256(" ".join((text or "").split()).encode('utf-8')).hexdigest()
+
+
+def _get_conn():
+    """SQLite 연결 (프로세스당 1개, 호출 측에서 _lock 보유)"""
+    global _conn, _entry_count
+    if _conn is None:
+        os.makedirs(os.path.dirname(CACHE_PATH), exist_ok=True)
+        _conn = sqlite3.connect(CACHE_PATH, check_same_thread=False)
+        _conn.execute("PRAGMA journal_mode=WAL")
+        _conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " model TEXT NOT NULL,"
+            " text_hash TEXT NOT NULL,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL,"
+            " PRIMARY KEY (model, text_hash))"
+        )
+        _conn.execute("CREATE INDEX IF NOT EXISTS idx_embeddings_last_used ON embeddings(last_used)")
+        _entry_count = _conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+    return _conn
+
+
+def get_many(model_name: str, texts: list[str]) -> list[list[float] | None]:
+    """
+    텍스트별 캐시된 임베딩 반환 (없으면 해당 위치에 None)
+    """
+    if not config.EMBED_CACHE_ENABLED or not texts:
+        return [None] * len(texts)
+    keys = [text_hash(t) for t in texts]
+    found: dict[str, bytes] = {}
+    try:
+        with _lock:
+            conn = _get_conn()
+            unique = list(dict.fromkeys(keys))
+            for i in range(0, len(unique), _LOOKUP_BATCH):
+                part = unique[i:i + _LOOKUP_BATCH]
+                marks = ",".join("?" * len(part))
+                rows = conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? AND text_hash IN ({marks})",
+                    [model_name, *part],
+                ).fetchall()
+                found.update(rows)
+            if found:
+                now = time.time()
+                conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model_name, h) for h in found],
+                )
+                conn.commit()
+    except Exception as e:
+        debug_print(f"캐시 조회 오류(무시): {str(e)}", "WARNING")
+        return [None] * len(texts)
+
+    result = []
+    for h in keys:
+        blob = found.get(h)
+        result.append(array('f', blob).tolist() if blob is not None else None)
+    hits = sum(1 for v in result if v is not None)
+    with _lock:
+        _stats['hits'] += hits
+        _stats['misses'] += len(result) - hits
+    return result
+
+
+def put_many(model_name: str, texts: list[str], vectors: list[list[float]]):
+    """임베딩 저장 후, 최대 개수를 넘으면 오래 안 쓴 항목부터 삭제"""
+    global _entry_count
+    if not config.EMBED_CACHE_ENABLED or not texts:
+        return
+    now = time.time()
+    rows = [(model_name, text_hash(t), array('f', v).tobytes(), now) for t, v in zip(texts, vectors)]
+    try:
+        with _lock:
+            conn = _get_conn()
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO embeddings (model, text_hash, vector, last_used) VALUES (?, ?, ?, ?)",
+                rows,
+            )
+            added = conn.total_changes - before
+            _entry_count += added
+            _stats['writes'] += added
+            limit = config.EMBED_CACHE_MAX_ENTRIES
+            if _entry_count > limit:
+                # 매번 조금씩 지우지 않도록 한도의 90%까지 줄입니다
+                excess = _entry_count - int(limit * 0.9)
+                conn.execute(
+                    "DELETE FROM embeddings WHERE rowid IN ("
+                    " SELECT rowid FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+                    (excess,),
+                )
+                _entry_count -= excess
+                _stats['evictions'] += excess
+            conn.commit()
+    except Exception as e:
+        debug_print(f"캐시 저장 오류(무시): {str(e)}", "WARNING")
+
+
+def get_cache_stats() -> dict:
+    """
+    캐시 적중 통계
+
+    반환값:
+        {'hits', 'misses', 'hit_rate', 'writes', 'evictions', 'entries'}
+    """
+    with _lock:
+        stats = dict(_stats)
+        stats['entries'] = _entry_count
+    total = stats['hits'] + stats['misses']
+    stats['hit_rate'] = round(stats['hits'] / total * 100, 1) if total else 0.0
+    return stats
+
+
+def clear_cache():
+    """캐시 전체 삭제"""
+    global _entry_count
+    with _lock:
+        conn = _get_conn()
+        conn.execute("DELETE FROM embeddings")
+        conn.commit()
+        _entry_count = 0
+    debug_print("임베딩 캐시 초기화", "INFO")
@@ -0,0 +1,184 @@
+#pip install sentence-transformers
+
+# ========================================
+# AI 학습 도우미 - 임베딩 서비스 (프로세스 내부)
+# ========================================
+# 여러 세션/작업자 스레드의 임베딩 요청을 한 줄로 모아 처리합니다.
+# - 앱 시작 때 백그라운드에서 모델을 미리 불러옵니다 (첫 업로드/질문 대기 제거)
+# - 전용 스레드 하나가 요청 큐에서 텍스트를 모아 한 번에 인코딩합니다
+#   (최대 배치 크기 또는 최대 대기 시간까지)
+# - 질문처럼 작은 요청이 문서 인덱싱 같은 큰 요청 뒤에 밀리지 않도록,
+#   큰 요청은 배치 크기로 나눠 낮은 우선순위로 넣습니다
+# - 처리량/지연 통계를 get_service_stats()로 확인할 수 있습니다
+# ========================================
+
+import itertools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+import config
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[EMBED-SERVICE-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 이 개수 이하의 텍스트 요청은 우선 처리합니다 (질문 임베딩 등)
+INTERACTIVE_MAX_TEXTS = 4
+# 지연 통계에 보관할 최근 요청 수
+LATENCY_WINDOW = 500
+
+
+_PRIORITY_INTERACTIVE = 0
+_PRIORITY_BULK = 1
+
+_queue: queue.PriorityQueue = queue.PriorityQueue()
+_seq = itertools.count()
+_worker = None
+_start_lock = threading.Lock()
+_stats_lock = threading.Lock()
+_stats = {'requests': 0, 'texts': 0, 'batches': 0, 'encode_seconds': 0.0, 'errors': 0}
+_latencies: deque = deque(maxlen=LATENCY_WINDOW)
+_started_at = None
+
+
+def start_embedding_service(warm: bool = True):
+    """
+    배치 처리 스레드를 시작합니다 (여러 번 불러도 한 번만 시작).
+    warm이면 그 스레드에서 모델을 먼저 불러오므로 호출한 쪽은 기다리지 않습니다.
+    """
+    global _worker, _started_at
+    if _worker is not None and _worker.is_alive():
+        return
+    with _start_lock:
+        if _worker is not None and _worker.is_alive():
+            return
+        _started_at = time.time()
+        _worker = threading.Thread(target=_run, args=(warm,), name="embed-service", daemon=True)
+        _worker.start()
+    debug_print("임베딩 서비스 시작", "INFO")
+
+
+def _submit(texts: list[str], priority: int) -> Future:
+    future = Future()
+    future.enqueued_at = time.perf_counter()
+    _queue.put((priority, next(_seq), texts, future))
+    return future
+
+
+def encode(texts: list[str], timeout: float | None = None, batch_size: int | None = None) -> list[list[float]]:
+    """
+    텍스트를 정규화된 임베딩으로 변환 (다른 요청과 묶여서 처리됩니다)
+    batch_size: 많은 텍스트를 나눠 넣을 크기 (EMBED_MAX_BATCH를 넘지 않음)
+    모델 로드 실패 시 RuntimeError
+    """
+    if not texts:
+        return []
+    start_embedding_service()
+    batch_size = max(1, min(batch_size or config.EMBED_MAX_BATCH, config.EMBED_MAX_BATCH))
+    if len(texts) <= INTERACTIVE_MAX_TEXTS:
+        futures = [_submit(list(texts), _PRIORITY_INTERACTIVE)]
+    else:
+        futures = [_submit(texts[i:i + batch_size], _PRIORITY_BULK) for i in range(0, len(texts), batch_size)]
+    vectors = []
+    for future in futures:
+        vectors.extend(future.result(timeout=timeout))
+    return vectors
+
+
+def _collect_batch():
+    """첫 요청을 기다린 뒤, 배치 크기나 대기 시간 한도까지 요청을 더 모읍니다"""
+    first = _queue.get()
+    batch = [first]
+    size = len(first[2])
+    deadline = time.perf_counter() + config.EMBED_MAX_WAIT_MS / 1000
+    while size < config.EMBED_MAX_BATCH:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            break
+        try:
+            item = _queue.get(timeout=remaining)
+        except queue.Empty:
+            break
+        if size + len(item[2]) > config.EMBED_MAX_BATCH:
+            # 넘치는 요청은 다음 배치로 (순서 유지를 위해 같은 우선순위/번호로 되돌림)
+            _queue.put(item)
+            break
+        batch.append(item)
+        size += len(item[2])
+    return batch
+
+
+def _run(warm: bool):
+    from rag.embeddings import load_embed_model, _encode
+
+    if warm:
+        started = time.perf_counter()
+        model = load_embed_model()
+        if not getattr(model, 'is_fallback', False):
+            # torch 초기화/스레드 풀 준비까지 끝내 둡니다
+            _encode(model, ["warm up"], 1)
+        debug_print(f"모델 준비 완료 ({time.perf_counter() - started:.1f}s)", "SUCCESS")
+
+    while True:
+        batch = _collect_batch()
+        texts = [t for _, _, item_texts, _ in batch for t in item_texts]
+        started = time.perf_counter()
+        try:
+            model = load_embed_model()
+            if getattr(model, 'is_fallback', False):
+                raise RuntimeError(f"임베딩 모델을 불러오지 못했습니다: {model.error}")
+            vectors = _encode(model, texts, len(texts))
+        except Exception as e:
+            debug_print(f"배치 인코딩 오류: {str(e)}", "ERROR")
+            with _stats_lock:
+                _stats['errors'] += 1
+            for _, _, _, future in batch:
+                future.set_exception(e)
+            continue
+        finished = time.perf_counter()
+        offset = 0
+        for _, _, item_texts, future in batch:
+            future.set_result(vectors[offset:offset + len(item_texts)])
+            offset += len(item_texts)
+        with _stats_lock:
+            _stats['requests'] += len(batch)
+            _stats['texts'] += len(texts)
+            _stats['batches'] += 1
+            _stats['encode_seconds'] += finished - started
+            _latencies.extend((finished - future.enqueued_at) * 1000 for _, _, _, future in batch)
+
+
+def get_service_stats() -> dict:
+    """
+    임베딩 서비스 통계
+
+    반환값:
+        {'running', 'queued', 'requests', 'texts', 'batches', 'avg_batch_size',
+         'texts_per_second'(인코딩 시간 기준), 'latency_ms': {'avg', 'p50', 'p95'}, 'errors'}
+    """
+    with _stats_lock:
+        stats = dict(_stats)
+        latencies = sorted(_latencies)
+    stats['running'] = _worker is not None and _worker.is_alive()
+    stats['queued'] = _queue.qsize()
+    stats['avg_batch_size'] = round(stats['texts'] / stats['batches'], 1) if stats['batches'] else 0.0
+    stats['texts_per_second'] = round(stats['texts'] / stats['encode_seconds'], 1) if stats['encode_seconds'] else 0.0
+    if latencies:
+        stats['latency_ms'] = {
+            'avg': round(sum(latencies) / len(latencies), 1),
+            'p50': round(latencies[len(latencies) // 2], 1),
+            'p95': round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+        }
+    else:
+        stats['latency_ms'] = {'avg': 0.0, 'p50': 0.0, 'p95': 0.0}
+    del stats['encode_seconds']
+    return stats
@@ -0,0 +1,105 @@
+#pip install sentence-transformers
+
+# ========================================
+# AI 학습 도우미 - 문서 임베딩
+# ========================================
+# 문서 청크와 질문을 벡터(384차원)로 바꿔줍니다.
+# - 모델은 서버 프로세스당 한 번만 불러옵니다 (페이지/작업자 스레드가 공유).
+# - sentence-transformers가 없으면 영벡터를 돌려주는 폴백 임베더를 씁니다.
+# - 한 번 계산한 임베딩은 디스크 캐시에 저장해 재사용합니다.
+# - 캐시에 없는 텍스트는 임베딩 서비스(rag/embedding_service.py)가 다른 요청과 묶어 인코딩합니다.
+# ========================================
+
+import threading
+
+import config
+from rag import embed_cache, embedding_service
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[RAG-{level}] {message}")
+
+
+# ========================================
+# 모델 설정
+# ========================================
+
+EMBED_DIM = 384
+EMBED_MODEL_NAME = 'sentence-transformers/all-MiniLM-L6-v2'
+
+
+class ZeroEmbedder:
+    """가벼운 폴백 임베더: 384차원 영벡터 반환 (업로드/검색은 제한적이지만 서버 중단 방지)"""
+    is_fallback = True
+
+    def __init__(self, error: str = ""):
+        self.error = error
+
+    def encode(self, texts, normalize_embeddings=True):
+        # 순수 파이썬으로 고정 영벡터 반환 (numpy 미의존)
+        return [[0.0] * EMBED_DIM for _ in range(len(texts))]
+
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def load_embed_model():
+    """
+    임베딩 모델을 반환합니다 (프로세스 전역 싱글톤, 스레드 안전).
+    로드에 실패하면 ZeroEmbedder를 반환하며, is_fallback 속성으로 구분할 수 있어요.
+    """
+    global _model
+    if _model is not None:
+        return _model
+    with _model_lock:
+        if _model is not None:
+            return _model
+        try:
+            from sentence_transformers import SentenceTransformer
+            _model = SentenceTransformer(EMBED_MODEL_NAME)
+            debug_print(f"임베딩 모델 로드 완료: {EMBED_MODEL_NAME}", "SUCCESS")
+        except Exception as e:
+            debug_print(f"임베딩 모델 로드 오류 → 폴백 임베더 사용: {str(e)}", "ERROR")
+            _model = ZeroEmbedder(str(e))
+        return _model
+
+
+def _encode(model, texts: list[str], batch_size: int) -> list[list[float]]:
+    # 대량 텍스트는 배치로 나눠 인코딩해 메모리/CPU 급증을 방지
+    all_vecs: list[list[float]] = []
+    for i in range(0, len(texts), batch_size):
+        batch = texts[i:i+batch_size]
+        vecs = model.encode(batch, normalize_embeddings=True)
+        # encode 결과가 numpy 배열 또는 파이썬 리스트 모두 지원
+        try:
+            all_vecs.extend([v.tolist() for v in vecs])
+        except Exception:
+            all_vecs.extend([list(v) for v in vecs])
+    return all_vecs
+
+
+def embed_texts(model, texts: list[str], batch_size: int = 32) -> list[list[float]]:
+    """
+    텍스트 리스트를 정규화된 임베딩 리스트로 변환합니다.
+    캐시(rag/embed_cache.py)에 있는 텍스트는 다시 계산하지 않고,
+    나머지는 임베딩 서비스에서 다른 세션 요청과 함께 배치로 인코딩합니다.
+    실패하면 빈 리스트를 반환합니다.
+    """
+    try:
+        # 폴백 임베더의 영벡터는 캐시하지 않음
+        if getattr(model, 'is_fallback', False):
+            return _encode(model, texts, batch_size)
+
+        vectors = embed_cache.get_many(EMBED_MODEL_NAME, texts)
+        missing = [i for i, v in enumerate(vectors) if v is None]
+        if missing:
+            fresh = embedding_service.encode([texts[i] for i in missing], batch_size=batch_size)
+            for i, v in zip(missing, fresh):
+                vectors[i] = v
+            embed_cache.put_many(EMBED_MODEL_NAME, [texts[i] for i in missing], fresh)
+        return vectors
+    except Exception as e:
+        debug_print(f"텍스트 임베딩 오류: {str(e)}", "ERROR")
+        return []
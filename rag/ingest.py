@@ -0,0 +1,389 @@
+#pip install pymupdf sentence-transformers
+
+# ========================================
+# AI 학습 도우미 - 문서 인덱싱 작업 큐
+# ========================================
+# 업로드한 문서를 백그라운드 작업자 풀에서 인덱싱합니다.
+# 단계: 파싱(parse) → 청크(chunk) → 임베딩(embed) → 저장(store)
+# - Streamlit 스크립트 스레드를 막지 않고, 페이지는 상태만 조회합니다.
+# - 같은 사용자가 같은 파일(내용 해시 기준)을 다시 올리면 아무 작업도 하지 않고,
+#   같은 이름의 수정본이면 바뀐 청크만 다시 임베딩/저장합니다.
+# - 동시에 여러 교사가 올려도 작업자 수(RAG_INGEST_WORKERS)만큼만 처리합니다.
+# ========================================
+
+import hashlib
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import config
+from rag.pdf_extract import iter_pdf_pages, page_count
+from rag.chunking import iter_chunks, make_token_counter, token_budget_for
+from rag.embeddings import load_embed_model, embed_texts
+from rag.retrieval import get_retrieval_backend
+from rag import lexical
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[INGEST-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 완료/실패한 작업 상태를 보관하는 시간 (초)
+JOB_RETENTION_SECONDS = 60 * 60
+
+STAGES = ("queued", "parse", "chunk", "embed", "store", "done")
+
+
+# ========================================
+# 파서
+# ========================================
+
+def file_hash(file_bytes: bytes) -> str:
+    """파일 내용의 SHA-256 해시 (중복 업로드 판별용)"""
+    return hashlib.sha256(file_bytes).hexdigest()
+
+
+def read_text_bytes(txt_bytes: bytes) -> str:
+    for enc in ('utf-8', 'cp949', 'euc-kr', 'utf-16'):
+        try:
+            return txt_bytes.decode(enc)
+        except Exception:
+            continue
+    return txt_bytes.decode('utf-8', errors='ignore')
+
+
+def _parse_pages(file_bytes: bytes, content_type: str):
+    """
+    (page_no, text)를 순서대로 내보내는 반복 가능 객체와 전체 페이지 수 반환
+    텍스트 파일은 page_no가 None인 한 페이지입니다. PDF는 여러 프로세스에서 나눠 추출합니다.
+    """
+    if content_type != 'application/pdf':
+        return [(None, read_text_bytes(file_bytes))], 1
+    return iter_pdf_pages(file_bytes), page_count(file_bytes)
+
+
+# ========================================
+# 작업 상태 저장소
+# ========================================
+
+_jobs: dict[str, dict] = {}
+_jobs_lock = threading.Lock()
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=max(1, config.RAG_INGEST_WORKERS),
+                    thread_name_prefix="rag-ingest",
+                )
+    return _executor
+
+
+def _update_job(job_id: str, **fields):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job:
+            job.update(fields)
+            job['updated_at'] = time.time()
+
+
+def _prune_jobs():
+    """오래된 완료/실패 작업 정리"""
+    cutoff = time.time() - JOB_RETENTION_SECONDS
+    with _jobs_lock:
+        for job_id in [k for k, j in _jobs.items() if j['status'] in ('done', 'failed') and j['updated_at'] < cutoff]:
+            _jobs.pop(job_id, None)
+
+
+def get_job_status(job_id: str) -> dict | None:
+    """작업 상태 사본 반환 (없으면 None)"""
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        return dict(job, warnings=list(job['warnings'])) if job else None
+
+
+def list_user_jobs(user_id: int) -> list[dict]:
+    """사용자의 작업 상태 목록 (최근 제출 순)"""
+    with _jobs_lock:
+        jobs = [dict(j, warnings=list(j['warnings'])) for j in _jobs.values() if j['user_id'] == user_id]
+    return sorted(jobs, key=lambda j: j['created_at'], reverse=True)
+
+
+def has_active_jobs(user_id: int) -> bool:
+    """대기/진행 중인 작업이 있는지"""
+    return any(j['status'] in ('queued', 'running') for j in list_user_jobs(user_id))
+
+
+# ========================================
+# 작업 제출/실행
+# ========================================
+
+def submit_ingest_job(user_id: int, file_name: str, file_bytes: bytes, content_type: str, retry: bool = False) -> str:
+    """
+    문서 인덱싱 작업을 큐에 넣고 작업 ID를 반환합니다.
+    같은 사용자의 같은 내용 파일 작업이 이미 있으면(실패한 작업 포함) 그 작업 ID를 그대로 돌려줍니다.
+    (Streamlit 재실행마다 같은 파일이 다시 제출되어도 한 번만 처리됩니다.)
+    retry=True면 실패한 작업을 지우고 다시 제출합니다 (사용자가 "다시 시도"를 눌렀을 때).
+    """
+    _prune_jobs()
+    digest = file_hash(file_bytes)
+    with _jobs_lock:
+        for job in list(_jobs.values()):
+            if job['user_id'] == user_id and job['file_hash'] == digest:
+                if not (retry and job['status'] == 'failed'):
+                    return job['job_id']
+                del _jobs[job['job_id']]
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        _jobs[job_id] = {
+            'job_id': job_id,
+            'user_id': user_id,
+            'file_name': file_name,
+            'file_hash': digest,
+            'content_type': content_type,
+            'status': 'queued',     # queued | running | done | failed
+            'stage': 'queued',      # STAGES 중 하나
+            'progress': 0.0,        # 0.0 ~ 1.0
+            'mode': None,           # new | incremental | unchanged
+            'document_id': None,
+            'total_chunks': 0,
+            'reused': 0,
+            'inserted': 0,
+            'failed': [],
+            'warnings': [],
+            'error': None,
+            'created_at': now,
+            'updated_at': now,
+        }
+    _get_executor().submit(_run_job, job_id, file_bytes)
+    debug_print(f"인덱싱 작업 제출: {file_name} ({job_id[:8]})", "INFO")
+    return job_id
+
+
+def _warn(job_id: str, message: str):
+    with _jobs_lock:
+        job = _jobs.get(job_id)
+        if job:
+            job['warnings'].append(message)
+
+
+def chunk_hash(text: str) -> str:
+    """공백을 정규화한 청크 텍스트의 SHA-256 (내용이 같으면 같은 해시)"""
+    return hashlib.sha256(" ".join((text or "").split()).encode('utf-8')).hexdigest()
+
+
+def _plan_incremental(existing_rows: list[dict], new_hashes: list[str]):
+    """
+    기존 청크와 새 청크를 해시로 짝지어 재사용/새로 임베딩/삭제 대상을 나눕니다.
+    
+    반환값:
+        (reuse, embed_indexes, stale_ids)
+        reuse: [(새 chunk_index, 기존 행)]
+        embed_indexes: 새로 임베딩해야 하는 chunk_index 리스트
+        stale_ids: 더 이상 쓰이지 않는 기존 청크 id 리스트
+    """
+    pool: dict[str, list[dict]] = {}
+    stale_ids = []
+    for row in existing_rows:
+        if row.get('chunk_hash'):
+            pool.setdefault(row['chunk_hash'], []).append(row)
+        else:
+            # 해시 컬럼 도입 전에 저장된 청크는 비교할 수 없어 새로 만듭니다
+            stale_ids.append(row['id'])
+    reuse, embed_indexes = [], []
+    for i, h in enumerate(new_hashes):
+        if pool.get(h):
+            reuse.append((i, pool[h].pop(0)))
+        else:
+            embed_indexes.append(i)
+    stale_ids.extend(r['id'] for rows in pool.values() for r in rows)
+    return reuse, embed_indexes, stale_ids
+
+
+def _run_job(job_id: str, file_bytes: bytes):
+    """작업자 스레드에서 실행되는 파이프라인"""
+    from database.supabase_manager import (
+        create_document,
+        add_document_chunks,
+        get_document_by_hash,
+        get_latest_document_by_name,
+        list_document_chunk_hashes,
+        delete_document_chunks,
+        update_document_chunk_positions,
+        update_document,
+        invalidate_retrieval_cache,
+    )
+
+    job = get_job_status(job_id)
+    if not job:
+        return
+    file_name = job['file_name']
+    user_id = job['user_id']
+    try:
+        # 0) 같은 내용의 파일이 이미 인덱싱되어 있으면 아무 작업도 하지 않음
+        _update_job(job_id, status='running', stage='parse', progress=0.02)
+        same = get_document_by_hash(user_id, job['file_hash'])
+        if same:
+            _update_job(job_id, status='done', stage='done', progress=1.0, mode='unchanged', document_id=same['id'])
+            debug_print(f"변경 없는 재업로드 → 건너뜀: {file_name}", "INFO")
+            return
+
+        # 1) 파싱 + 2) 청크: 추출된 페이지를 바로바로 청크로 나눕니다
+        _update_job(job_id, progress=0.05)
+        pages, total_pages = _parse_pages(file_bytes, job['content_type'])
+        _update_job(job_id, stage='chunk', progress=0.1)
+        # 임베딩 모델의 토크나이저 기준으로 토큰 예산에 맞춰 자릅니다
+        model = load_embed_model()
+        max_chunks = config.RAG_MAX_CHUNKS
+
+        def _tracked(pages):
+            for done, page in enumerate(pages, 1):
+                if done % 10 == 0:
+                    _update_job(job_id, progress=0.1 + 0.2 * done / max(1, total_pages))
+                yield page
+
+        chunks, metas = [], []
+        page_stream = _tracked(pages)
+        try:
+            for page_no, ck in iter_chunks(page_stream, max_tokens=token_budget_for(model), token_counter=make_token_counter(model)):
+                if max_chunks and len(chunks) >= max_chunks:
+                    if page_no:
+                        _warn(job_id, f"페이지 {page_no} 이후는 청크 제한({max_chunks})으로 건너뜁니다.")
+                    else:
+                        _warn(job_id, f"청크 제한({max_chunks})을 넘는 부분은 저장하지 않습니다.")
+                    break
+                chunks.append(ck)
+                metas.append({"page": page_no, "file": file_name} if page_no else {"file": file_name})
+        finally:
+            # 중간에 멈췄으면 남은 페이지 추출을 취소합니다
+            page_stream.close()
+            if hasattr(pages, 'close'):
+                pages.close()
+        if not chunks:
+            _update_job(job_id, status='failed', error="추출된 텍스트가 없습니다.")
+            return
+        hashes = [chunk_hash(ck) for ck in chunks]
+
+        # 같은 이름의 이전 문서가 있으면 바뀐 청크만 다시 임베딩 (수정본 업로드)
+        previous = get_latest_document_by_name(user_id, file_name)
+        # 로컬 검색 백엔드에 재사용 청크를 넣을 때 저장된 임베딩을 그대로 쓰도록 함께 받습니다
+        backend = get_retrieval_backend()
+        if previous:
+            existing_rows = list_document_chunk_hashes(previous['id'], with_embeddings=backend.mirrors_chunks)
+            if existing_rows is None:
+                _update_job(job_id, status='failed', error="기존 문서 청크 목록을 불러오지 못했습니다.")
+                return
+            reuse, embed_indexes, stale_ids = _plan_incremental(existing_rows, hashes)
+            mode = 'incremental'
+        else:
+            reuse, embed_indexes, stale_ids = [], list(range(len(chunks))), []
+            mode = 'new'
+
+        # 3) 임베딩 (새로 생긴/바뀐 청크만)
+        _update_job(job_id, stage='embed', progress=0.3, total_chunks=len(chunks), mode=mode, reused=len(reuse))
+        embeddings = []
+        if embed_indexes:
+            if getattr(model, 'is_fallback', False):
+                _warn(job_id, "임베딩 모델을 불러오지 못해 폴백 임베더(영벡터)를 사용했습니다.")
+            embeddings = embed_texts(model, [chunks[i] for i in embed_indexes], batch_size=32)
+            if len(embeddings) != len(embed_indexes):
+                _update_job(job_id, status='failed', error="텍스트 임베딩에 실패했습니다.")
+                return
+
+        # 4) 저장
+        _update_job(job_id, stage='store', progress=0.7)
+        if previous:
+            document_id = previous['id']
+        else:
+            doc_row = create_document(
+                user_id=user_id,
+                title=file_name,
+                file_name=file_name,
+                content_type=job['content_type'],
+            )
+            if not doc_row:
+                _update_job(job_id, status='failed', error="문서 메타 저장에 실패했습니다.")
+                return
+            document_id = doc_row['id']
+
+        # 내용 해시는 모든 청크가 저장된 뒤에만 기록합니다. 중간에 멈추거나 실패해도
+        # 같은 파일을 다시 올리면 '변경 없음'으로 건너뛰지 않고 다시 맞춥니다.
+        # 문서 안의 청크 위치는 유일하므로, 수정본이면 빠진 청크를 지우고 재사용 청크를
+        # 새 위치로 옮겨 자리를 비운 뒤에 새 청크를 저장합니다
+        moved_ok = deleted_ok = True
+        if previous:
+            update_document(document_id, content_hash=None)
+            deleted_ok = delete_document_chunks(stale_ids, user_id=user_id)
+            moved = [
+                {'id': row['id'], 'chunk_index': i, 'metadata': metas[i]}
+                for i, row in reuse
+                if row.get('chunk_index') != i or (row.get('metadata') or {}) != metas[i]
+            ]
+            moved_ok = update_document_chunk_positions(moved, user_id=user_id)
+
+        rows = [
+            {
+                'document_id': document_id,
+                'user_id': user_id,
+                'chunk_index': i,
+                'content': chunks[i],
+                'embedding': emb,
+                'metadata': metas[i],
+                'chunk_hash': hashes[i],
+            }
+            for i, emb in zip(embed_indexes, embeddings)
+        ]
+        result = add_document_chunks(rows, batch_size=50) if rows else {'inserted': 0, 'failed': []}
+
+        if moved_ok and deleted_ok and not result['failed']:
+            update_document(document_id, content_hash=job['file_hash'])
+        else:
+            _warn(job_id, "일부 청크 저장/정리에 실패했어요. 같은 파일을 다시 올리면 맞춰집니다.")
+
+        failed = set(result['failed'])
+        # 키워드(BM25) 색인은 문서 단위로 교체합니다 (다른 문서 색인은 그대로)
+        lexical.replace_document(user_id, document_id, [
+            {'chunk_index': i, 'content': chunks[i], 'metadata': metas[i]}
+            for i in range(len(chunks))
+            if i not in failed
+        ])
+
+        # 로컬 검색 백엔드는 문서 청크 사본을 직접 보관하므로 함께 갱신합니다
+        if backend.mirrors_chunks:
+            vectors = dict(zip(embed_indexes, embeddings))
+            # 재사용 청크는 DB에 저장된 임베딩을 그대로 씁니다 (다시 계산하지 않음)
+            vectors.update((i, row['embedding']) for i, row in reuse if row.get('embedding') is not None)
+            backend.replace_document(user_id, document_id, [
+                {'chunk_index': i, 'content': chunks[i], 'metadata': metas[i], 'embedding': vectors[i]}
+                for i in range(len(chunks))
+                if i in vectors and i not in failed
+            ])
+        invalidate_retrieval_cache(user_id)
+
+        _update_job(
+            job_id,
+            status='done',
+            stage='done',
+            progress=1.0,
+            document_id=document_id,
+            inserted=result['inserted'],
+            failed=result['failed'],
+        )
+        debug_print(
+            f"인덱싱 완료({mode}): {file_name} (새 청크 {result['inserted']}/{len(rows)}, 재사용 {len(reuse)}, 삭제 {len(stale_ids)})",
+            "SUCCESS",
+        )
+    except Exception as e:
+        debug_print(f"인덱싱 작업 오류({file_name}): {str(e)}", "ERROR")
+        _update_job(job_id, status='failed', error=str(e))
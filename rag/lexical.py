@@ -0,0 +1,185 @@
+# ========================================
+# AI 학습 도우미 - 문서 키워드 검색 (BM25)
+# ========================================
+# 임베딩 모델이 한국어 고유명사/성취기준 코드(예: [6국01-02])를 잘 못 찾는 경우를 보완합니다.
+# - SQLite FTS5 역색인 (temp/lexical_index.sqlite3), 점수는 FTS5 내장 bm25()
+# - 토큰: 영문/숫자/한글 단어 + 한글 2글자 조각(조사가 붙은 단어도 찾도록)
+# - 문서 인덱싱 때 해당 문서 청크만 교체하므로 전체를 다시 만들지 않습니다.
+# - 사용자마다 FTS5 테이블을 따로 둡니다 (chunks_<user_id>).
+#   bm25의 IDF(단어 희귀도)/평균 청크 길이가 그 사용자 문서만으로 계산되고,
+#   검색 비용도 다른 사용자의 문서 양과 상관없습니다.
+# ========================================
+
+import json
+import os
+import re
+import sqlite3
+import threading
+
+import config
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[LEXICAL-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+INDEX_PATH = os.path.join(config.CURRENT_DIR, 'temp', 'lexical_index.sqlite3')
+# 검색어 토큰 최대 개수 (너무 긴 질문으로 FTS 쿼리가 커지는 것 방지)
+MAX_QUERY_TOKENS = 64
+# 색인 파일 형식 버전 (바뀌면 기존 색인을 버리고 DB에서 다시 채움)
+INDEX_VERSION = 2
+
+
+_TOKEN_RE = re.compile(r"[0-9a-z가-힣]+")
+_HANGUL_RE = re.compile(r"[가-힣]")
+
+_conn = None
+_lock = threading.Lock()
+_tables: set[str] = set()
+
+
+def tokenize(text: str) -> list[str]:
+    """단어 토큰 + 한글 단어의 2글자 조각"""
+    tokens = []
+    for word in _TOKEN_RE.findall((text or "").lower()):
+        tokens.append(word)
+        if len(word) > 2 and _HANGUL_RE.search(word):
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def _get_conn():
+    """SQLite 연결 (프로세스당 1개, 호출 측에서 _lock 보유)"""
+    global _conn
+    if _conn is None:
+        os.makedirs(os.path.dirname(INDEX_PATH), exist_ok=True)
+        conn = sqlite3.connect(INDEX_PATH, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        # DB의 기존 청크로 한 번 채운 사용자 (이후에는 인덱싱 때만 갱신)
+        conn.execute("CREATE TABLE IF NOT EXISTS seeded_users (user_id INTEGER PRIMARY KEY)")
+        if conn.execute("PRAGMA user_version").fetchone()[0] < INDEX_VERSION:
+            # 예전 형식(모든 사용자 공용 chunks 테이블)은 버리고 사용자별로 다시 채웁니다
+            conn.execute("DROP TABLE IF EXISTS chunks")
+            conn.execute("DELETE FROM seeded_users")
+            conn.execute(f"PRAGMA user_version = {INDEX_VERSION}")
+            conn.commit()
+        _conn = conn
+    return _conn
+
+
+def _table(conn, user_id: int) -> str:
+    """사용자 전용 FTS5 테이블 이름 (없으면 만듦, 호출 측에서 _lock 보유)"""
+    name = f"chunks_{int(user_id)}".replace("-", "n")
+    if name not in _tables:
+        conn.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {name} USING fts5("
+            " tokens, document_id UNINDEXED, chunk_index UNINDEXED,"
+            " content UNINDEXED, metadata UNINDEXED)"
+        )
+        _tables.add(name)
+    return name
+
+
+def is_seeded(user_id: int) -> bool:
+    with _lock:
+        return _get_conn().execute("SELECT 1 FROM seeded_users WHERE user_id = ?", (user_id,)).fetchone() is not None
+
+
+def _insert_rows(conn, table: str, document_id: int, entries: list[dict]):
+    conn.executemany(
+        f"INSERT INTO {table} (tokens, document_id, chunk_index, content, metadata) VALUES (?, ?, ?, ?, ?)",
+        [
+            (
+                " ".join(tokenize(e.get('content'))),
+                document_id,
+                e.get('chunk_index'),
+                e.get('content') or '',
+                json.dumps(e.get('metadata') or {}, ensure_ascii=False),
+            )
+            for e in entries
+        ],
+    )
+
+
+def replace_document(user_id: int, document_id: int, entries: list[dict]):
+    """
+    문서 하나의 청크를 교체합니다.
+
+    매개변수:
+        entries: [{'chunk_index', 'content', 'metadata'}]
+    """
+    try:
+        with _lock:
+            conn = _get_conn()
+            table = _table(conn, user_id)
+            conn.execute(f"DELETE FROM {table} WHERE document_id = ?", (document_id,))
+            _insert_rows(conn, table, document_id, entries)
+            conn.commit()
+    except Exception as e:
+        debug_print(f"키워드 색인 갱신 오류(무시): {str(e)}", "WARNING")
+
+
+def seed_user(user_id: int, rows: list[dict]):
+    """DB에 있던 사용자 청크로 색인을 처음 채웁니다"""
+    by_doc: dict[int, list[dict]] = {}
+    for r in rows:
+        by_doc.setdefault(r['document_id'], []).append(r)
+    try:
+        with _lock:
+            conn = _get_conn()
+            table = _table(conn, user_id)
+            conn.execute(f"DELETE FROM {table}")
+            for document_id, entries in by_doc.items():
+                _insert_rows(conn, table, document_id, entries)
+            conn.execute("INSERT OR IGNORE INTO seeded_users (user_id) VALUES (?)", (user_id,))
+            conn.commit()
+        debug_print(f"사용자 {user_id} 키워드 색인 생성: 청크 {len(rows)}개", "INFO")
+    except Exception as e:
+        debug_print(f"키워드 색인 생성 오류(무시): {str(e)}", "WARNING")
+
+
+def search(user_id: int, query: str, limit: int = 20, document_id: int | None = None) -> list[dict]:
+    """
+    BM25 점수 상위 청크 반환
+
+    반환값:
+        [{'document_id', 'chunk_index', 'content', 'metadata', 'bm25'}] (bm25는 클수록 관련성 높음)
+    """
+    tokens = list(dict.fromkeys(tokenize(query)))[:MAX_QUERY_TOKENS]
+    if not tokens:
+        return []
+    match = " OR ".join(f'"{t}"' for t in tokens)
+    try:
+        with _lock:
+            conn = _get_conn()
+            table = _table(conn, user_id)
+            sql = (
+                f"SELECT document_id, chunk_index, content, metadata, bm25({table}) AS score FROM {table}"
+                f" WHERE {table} MATCH ?"
+            )
+            params = [match]
+            if document_id is not None:
+                sql += " AND document_id = ?"
+                params.append(document_id)
+            sql += " ORDER BY score LIMIT ?"
+            params.append(limit)
+            rows = conn.execute(sql, params).fetchall()
+    except Exception as e:
+        debug_print(f"키워드 검색 오류: {str(e)}", "ERROR")
+        return []
+    return [
+        {
+            'document_id': doc_id,
+            'chunk_index': chunk_index,
+            'content': content,
+            'metadata': json.loads(metadata or '{}'),
+            # FTS5 bm25()는 관련성이 높을수록 더 작은(음수) 값입니다
+            'bm25': -score,
+        }
+        for doc_id, chunk_index, content, metadata, score in rows
+    ]
@@ -0,0 +1,167 @@
+#pip install pymupdf
+
+# ========================================
+# AI 학습 도우미 - PDF 텍스트 추출 (병렬/스트리밍)
+# ========================================
+# 큰 PDF를 페이지 묶음(샤드)으로 나눠 여러 프로세스에서 동시에 추출하고,
+# (page_no, text)를 페이지 순서대로 바로바로 내보냅니다.
+# - 작업 프로세스에는 PDF 바이트 대신 임시 파일 경로만 넘깁니다 (복사 최소화)
+# - 아직 내보내지 않은 텍스트가 메모리 한도(RAG_PDF_MEMORY_MB)를 넘지 않도록
+#   동시에 처리하는 샤드 수를 조절합니다
+# - 소비 측이 중간에 멈추면(청크 예산 도달 등) 남은 샤드는 취소합니다
+# 작업 프로세스에서도 이 모듈을 불러오므로, 무거운 모듈(config/streamlit)은 함수 안에서 불러옵니다.
+# ========================================
+
+import multiprocessing
+import os
+import tempfile
+import threading
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+
+def debug_print(message, level="INFO"):
+    import config
+
+    if config.DEBUG_MODE:
+        print(f"[PDF-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+# 샤드 하나의 페이지 수
+SHARD_PAGES = 16
+# 이 페이지 수 미만이면 프로세스 풀 없이 현재 스레드에서 추출
+MIN_PARALLEL_PAGES = 48
+# 처음 샤드 크기를 모를 때 가정하는 페이지당 텍스트 크기 (바이트)
+ASSUMED_PAGE_BYTES = 4 * 1024
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _open_pdf(path_or_bytes):
+    try:
+        import fitz  # PyMuPDF
+    except ImportError:
+        raise RuntimeError("PDF 처리를 위해 'pip install pymupdf' 설치가 필요합니다.")
+    if isinstance(path_or_bytes, (bytes, bytearray)):
+        return fitz.open(stream=path_or_bytes, filetype='pdf')
+    return fitz.open(path_or_bytes)
+
+
+def _extract_range(path: str, start: int, end: int) -> list[tuple[int, str]]:
+    """[start, end) 페이지 텍스트 추출 (작업 프로세스에서 실행)"""
+    pdf = _open_pdf(path)
+    try:
+        return [(pno + 1, pdf.load_page(pno).get_text("text") or "") for pno in range(start, min(end, pdf.page_count))]
+    finally:
+        pdf.close()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # 스레드가 많은 Streamlit 서버에서 fork는 교착 위험이 있어 spawn을 씁니다
+            _pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def page_count(file_bytes: bytes) -> int:
+    """PDF 전체 페이지 수"""
+    pdf = _open_pdf(file_bytes)
+    try:
+        return pdf.page_count
+    finally:
+        pdf.close()
+
+
+def iter_pdf_pages(file_bytes: bytes, workers: int | None = None, memory_mb: int | None = None):
+    """
+    PDF 페이지 텍스트를 순서대로 내보내는 제너레이터
+
+    매개변수:
+        file_bytes: PDF 파일 내용
+        workers: 작업 프로세스 수 (기본: RAG_PDF_WORKERS, 1이면 현재 스레드에서 추출)
+        memory_mb: 아직 내보내지 않은 텍스트의 메모리 한도 (기본: RAG_PDF_MEMORY_MB)
+
+    반환값:
+        (page_no, text) 제너레이터 (page_no는 1부터)
+    """
+    import config
+
+    workers = workers or config.RAG_PDF_WORKERS
+    limit_bytes = (memory_mb or config.RAG_PDF_MEMORY_MB) * 1024 * 1024
+    total = page_count(file_bytes)
+
+    if workers <= 1 or total < MIN_PARALLEL_PAGES:
+        pdf = _open_pdf(file_bytes)
+        try:
+            for pno in range(total):
+                yield pno + 1, pdf.load_page(pno).get_text("text") or ""
+        finally:
+            pdf.close()
+        return
+
+    fd, path = tempfile.mkstemp(suffix='.pdf')
+    with os.fdopen(fd, 'wb') as f:
+        f.write(file_bytes)
+    shards = deque((start, min(start + SHARD_PAGES, total)) for start in range(0, total, SHARD_PAGES))
+    pending = deque()
+    page_bytes = ASSUMED_PAGE_BYTES
+    pool = _get_pool(workers)
+    try:
+        while shards or pending:
+            # 처리 중인 샤드 텍스트 합이 한도 안에 들도록 동시 샤드 수를 정합니다 (최소 1개)
+            window = max(1, min(workers * 2, limit_bytes // max(1, page_bytes * SHARD_PAGES)))
+            while shards and len(pending) < window:
+                start, end = shards.popleft()
+                future = None
+                if pool is not None:
+                    try:
+                        future = pool.submit(_extract_range, path, start, end)
+                    except (BrokenProcessPool, RuntimeError):
+                        pool = None
+                pending.append((start, end, future))
+            start, end, future = pending.popleft()
+            pages = None
+            if future is not None:
+                try:
+                    pages = future.result()
+                except BrokenProcessPool:
+                    # 다음 작업은 새 풀을 쓰도록 비웁니다
+                    _reset_pool()
+                    pool = None
+                except CancelledError:
+                    pool = None
+            if pages is None:
+                # 프로세스 풀을 쓸 수 없으면 남은 샤드는 현재 스레드에서 추출합니다
+                if future is not None:
+                    debug_print("프로세스 풀 오류 → 현재 스레드에서 추출", "WARNING")
+                pages = _extract_range(path, start, end)
+            if pages:
+                # 최근 샤드 기준으로 페이지당 텍스트 크기를 갱신합니다 (한글 글자당 약 3바이트로 계산)
+                page_bytes = max(1, sum(len(t) * 3 for _, t in pages) // len(pages))
+            yield from pages
+    finally:
+        for _, _, future in pending:
+            if future:
+                future.cancel()
+        try:
+            os.remove(path)
+        except OSError:
+            # 취소되지 않은 샤드가 아직 읽는 중이면 (Windows) 삭제 실패 → 임시 폴더 정리에 맡깁니다
+            pass
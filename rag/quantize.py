@@ -0,0 +1,78 @@
+#pip install numpy
+
+# ========================================
+# AI 학습 도우미 - 임베딩 양자화
+# ========================================
+# 정규화된 float32 임베딩을 작은 코드로 바꿔 1차 후보 검색에 씁니다.
+# - int8: 벡터별 배율(scale)로 -127~127 정수화 (4배 작음)
+# - binary: 부호 비트만 저장, 해밍 거리로 비교 (32배 작음)
+# 1차로 코드만 훑어 후보를 고른 뒤, 후보만 원래 float 벡터로 다시 점수를 매깁니다.
+# ========================================
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+QUANTIZATION_KINDS = ("none", "int8", "binary")
+
+# 바이트별 1비트 개수 (해밍 거리 계산용)
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8) if np is not None else None
+
+
+def int8_codes(matrix):
+    """
+    (codes, scales) 반환
+    codes: int8 [n, dim], scales: float32 [n] (원래 값 ≈ codes * scale)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    scales = np.abs(matrix).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+def binary_codes(matrix):
+    """부호 비트를 8개씩 묶은 uint8 [n, dim/8]"""
+    return np.packbits(np.asarray(matrix) > 0, axis=1)
+
+
+def int8_scores(codes, scales, query):
+    """int8 코드로 근사한 내적 점수 (클수록 가까움)"""
+    q_codes, q_scale = int8_codes(np.asarray(query, dtype=np.float32)[None, :])
+    # int8끼리 곱하면 넘치므로 int32로 계산
+    dots = np.asarray(codes, dtype=np.int32) @ q_codes[0].astype(np.int32)
+    return dots * np.asarray(scales) * q_scale[0]
+
+
+def hamming_distances(bits, query):
+    """부호 비트 해밍 거리 (작을수록 가까움)"""
+    q_bits = binary_codes(np.asarray(query, dtype=np.float32)[None, :])[0]
+    return _POPCOUNT[np.bitwise_xor(np.asarray(bits), q_bits)].sum(axis=1, dtype=np.int32)
+
+
+def prefilter(kind: str, store: dict, query, candidates: int, rows=None):
+    """
+    양자화 코드로 상위 후보 위치를 고릅니다.
+
+    매개변수:
+        kind: 'int8' 또는 'binary'
+        store: {'int8', 'scales', 'bits'} 코드 배열
+        query: 정규화된 질문 벡터
+        candidates: 남길 후보 수
+        rows: 검색 대상 행 위치 (None이면 전체)
+
+    반환값:
+        후보 행 위치 배열 (rows 기준이 아닌 전체 행 기준)
+    """
+    if kind == 'binary':
+        bits = store['bits'] if rows is None else store['bits'][rows]
+        order = -hamming_distances(bits, query)
+    else:
+        codes = store['int8'] if rows is None else store['int8'][rows]
+        scales = store['scales'] if rows is None else store['scales'][rows]
+        order = int8_scores(codes, scales, query)
+    k = min(candidates, len(order))
+    top = np.argpartition(-order, k - 1)[:k]
+    return top if rows is None else np.asarray(rows)[top]
@@ -0,0 +1,378 @@
+# ========================================
+# AI 학습 도우미 - 문서 검색 백엔드
+# ========================================
+# search_document_chunks()가 실제 검색을 맡기는 백엔드를 고릅니다.
+# - pgvector: Supabase의 match_document_chunks RPC (기본값)
+# - local: 프로세스 내부 벡터 인덱스 (rag/vector_index.py, DB 호출 없음)
+# RAG_RETRIEVAL_BACKEND 환경 변수로 선택하고,
+# 새 백엔드는 register_backend()로 추가할 수 있습니다.
+#
+# hybrid_search()는 벡터 검색과 키워드(BM25) 검색을 함께 돌려
+# 순위 융합(RRF)하고, 설정 시 cross-encoder로 상위 후보를 다시 정렬합니다.
+# 전체 시간 예산(RAG_SEARCH_BUDGET_MS)을 넘는 단계는 건너뜁니다.
+# ========================================
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import config
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[RETRIEVAL-{level}] {message}")
+
+
+class RetrievalBackend:
+    """
+    검색 백엔드 기본 형태
+
+    mirrors_chunks가 True인 백엔드는 인덱싱 때 청크 사본(임베딩 포함)을 받아 직접 보관합니다.
+    """
+    name = "base"
+    mirrors_chunks = False
+
+    def search(self, user_id: int, query_embedding: list[float], match_count: int, document_id: int | None = None) -> list[dict]:
+        """[{'id', 'document_id', 'content', 'metadata', 'similarity'}] 반환"""
+        raise NotImplementedError
+
+    def replace_document(self, user_id: int, document_id: int, entries: list[dict]):
+        """문서 하나의 청크를 통째로 교체 (mirrors_chunks 백엔드만 사용)"""
+
+    def remove_document(self, user_id: int, document_id: int):
+        """문서 하나의 청크 제거 (mirrors_chunks 백엔드만 사용)"""
+
+
+class PgvectorBackend(RetrievalBackend):
+    """
+    Supabase pgvector RPC로 검색
+    RAG_VECTOR_QUANTIZATION이 binary면 부호 비트 1차 검색 + float 재채점 RPC를 씁니다
+    (schema.sql 17번 미적용 시 기본 RPC로 돌아감).
+    """
+    name = "pgvector"
+
+    # 일시적인 오류 뒤 양자화 RPC를 다시 시도하기까지 기다릴 시간(초)
+    BINARY_RETRY_SECONDS = 60
+
+    def __init__(self):
+        self._binary_available = True
+        self._binary_retry_at = 0.0
+
+    @staticmethod
+    def _is_missing_function(error: Exception) -> bool:
+        """RPC/함수가 DB에 없는 오류인지 (PostgREST PGRST202, Postgres 42883)"""
+        text = str(error)
+        return any(mark in text for mark in ("PGRST202", "42883", "Could not find the function", "does not exist"))
+
+    def search(self, user_id, query_embedding, match_count, document_id=None):
+        from database.supabase_manager import get_supabase_client, vector_literal
+
+        client = get_supabase_client()
+        if not client:
+            return []
+        params = {
+            'query_embedding': vector_literal(query_embedding),
+            'match_count': match_count,
+            'user_id_input': user_id,
+            'document_id_input': document_id
+        }
+        if config.RAG_VECTOR_QUANTIZATION == 'binary' and self._binary_available and time.monotonic() >= self._binary_retry_at:
+            try:
+                res = client.rpc('match_document_chunks_binary', dict(params, candidate_count=match_count * config.RAG_RESCORE_FACTOR)).execute()
+                return res.data or []
+            except Exception as e:
+                if self._is_missing_function(e):
+                    # schema.sql 17번이 적용되지 않은 DB → 이 프로세스에서는 다시 시도하지 않음
+                    self._binary_available = False
+                    debug_print(f"match_document_chunks_binary 없음 → 기본 검색 사용: {str(e)}", "WARNING")
+                else:
+                    self._binary_retry_at = time.monotonic() + self.BINARY_RETRY_SECONDS
+                    debug_print(f"match_document_chunks_binary 오류 → {self.BINARY_RETRY_SECONDS}초 동안 기본 검색 사용: {str(e)}", "WARNING")
+        res = client.rpc('match_document_chunks', params).execute()
+        return res.data or []
+
+
+class LocalVectorBackend(RetrievalBackend):
+    """
+    프로세스 내부 벡터 인덱스로 검색
+    사용자 인덱스가 아직 없으면 처음 한 번만 DB의 청크로 채웁니다.
+    """
+    name = "local"
+    mirrors_chunks = True
+
+    def __init__(self):
+        self._sync_lock = threading.Lock()
+
+    def search(self, user_id, query_embedding, match_count, document_id=None):
+        from rag import vector_index
+
+        rows = vector_index.search(user_id, query_embedding, match_count, document_id)
+        if rows is None:
+            self.sync_from_database(user_id)
+            rows = vector_index.search(user_id, query_embedding, match_count, document_id)
+        return rows or []
+
+    def replace_document(self, user_id, document_id, entries):
+        from rag import vector_index
+
+        # 인덱스가 없는 상태에서 바로 쓰면 이 문서만 든 인덱스가 생겨
+        # 기존 문서가 검색에서 빠지므로, 먼저 DB 청크로 채웁니다
+        self.sync_from_database(user_id)
+        if not vector_index.has_index(user_id):
+            # DB에서 채우지 못했으면 건너뜀 (다음 검색 때 DB에서 이 문서까지 함께 채움)
+            return
+        vector_index.replace_document(user_id, document_id, entries)
+
+    def remove_document(self, user_id, document_id):
+        from rag import vector_index
+
+        if not vector_index.has_index(user_id):
+            # 아직 채우지 않은 인덱스는 다음 검색 때 DB 기준으로 만들어집니다
+            return
+        vector_index.remove_document(user_id, document_id)
+
+    def sync_from_database(self, user_id: int):
+        """DB에 저장된 사용자 청크로 로컬 인덱스를 다시 만듭니다"""
+        from rag import vector_index
+        from database.supabase_manager import export_document_chunks
+
+        with self._sync_lock:
+            if vector_index.has_index(user_id):
+                return
+            rows = export_document_chunks(user_id)
+            if rows is None:
+                # DB 연결이 없으면 빈 인덱스를 만들지 않고 다음 검색 때 다시 시도합니다
+                return
+            vector_index.rebuild_user_index(user_id, rows)
+
+
+_backends = {
+    'pgvector': PgvectorBackend,
+    'local': LocalVectorBackend,
+}
+_instances: dict[str, RetrievalBackend] = {}
+_instances_lock = threading.Lock()
+
+
+def register_backend(name: str, factory):
+    """검색 백엔드 추가 (factory는 인자 없이 RetrievalBackend를 만드는 호출 가능 객체)"""
+    with _instances_lock:
+        _backends[name] = factory
+        _instances.pop(name, None)
+
+
+def get_retrieval_backend(name: str | None = None) -> RetrievalBackend:
+    """
+    설정(RAG_RETRIEVAL_BACKEND)에 맞는 검색 백엔드 반환 (프로세스당 1개)
+    알 수 없는 이름이거나 local인데 numpy가 없으면 pgvector를 씁니다.
+    """
+    name = (name or config.RAG_RETRIEVAL_BACKEND or 'pgvector').lower()
+    if name not in _backends:
+        debug_print(f"알 수 없는 검색 백엔드 '{name}' → pgvector 사용", "WARNING")
+        name = 'pgvector'
+    if name == 'local':
+        from rag import vector_index
+
+        if not vector_index.is_available():
+            debug_print("numpy가 없어 로컬 인덱스를 쓸 수 없습니다 → pgvector 사용", "WARNING")
+            name = 'pgvector'
+    with _instances_lock:
+        if name not in _instances:
+            _instances[name] = _backends[name]()
+        return _instances[name]
+
+
+# ========================================
+# 하이브리드 검색 (벡터 + 키워드 + 재정렬)
+# ========================================
+
+# RRF 상수 (순위 1위와 10위의 점수 차이를 완만하게)
+RRF_K = 60
+# cross-encoder 입력으로 자를 청크 길이 (글자)
+RERANK_MAX_CHARS = 1000
+
+_search_executor = None
+_search_executor_lock = threading.Lock()
+_reranker = None
+_reranker_error = None
+_reranker_lock = threading.Lock()
+_search_stats = {'searches': 0, 'timeouts': 0, 'stage_ms': {}}
+_search_stats_lock = threading.Lock()
+
+
+def _get_search_executor() -> ThreadPoolExecutor:
+    global _search_executor
+    if _search_executor is None:
+        with _search_executor_lock:
+            if _search_executor is None:
+                _search_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="rag-search")
+    return _search_executor
+
+
+def _timed(func, *args):
+    """(결과, 걸린 시간 ms) 반환"""
+    started = time.perf_counter()
+    result = func(*args)
+    return result, (time.perf_counter() - started) * 1000
+
+
+def _vector_candidates(user_id, query_embedding, limit, document_id):
+    from database.supabase_manager import search_document_chunks
+
+    if not query_embedding:
+        return []
+    return search_document_chunks(user_id=user_id, query_embedding=query_embedding, match_count=limit, document_id=document_id)
+
+
+def _lexical_candidates(user_id, query_text, limit, document_id):
+    from rag import lexical
+
+    if not lexical.is_seeded(user_id):
+        # 하이브리드 검색 도입 전에 올린 문서도 찾을 수 있도록 처음 한 번 DB에서 채웁니다
+        from database.supabase_manager import export_document_chunks
+
+        rows = export_document_chunks(user_id, with_embeddings=False)
+        if rows is not None:
+            lexical.seed_user(user_id, rows)
+    return lexical.search(user_id, query_text, limit=limit, document_id=document_id)
+
+
+def _fuse(vector_rows: list[dict], lexical_rows: list[dict]) -> list[dict]:
+    """역순위 융합(RRF): 두 목록에서의 순위로 점수를 매겨 합칩니다"""
+    merged: dict[tuple, dict] = {}
+
+    def key(row):
+        # pgvector 결과에는 chunk_index가 없어 문서 + 공백 정규화한 내용으로 짝짓습니다
+        return (row.get('document_id'), " ".join((row.get('content') or '').split()))
+
+    for rank, row in enumerate(vector_rows):
+        item = merged.setdefault(key(row), dict(row, bm25=None, score=0.0))
+        item['score'] += 1.0 / (RRF_K + rank + 1)
+    for rank, row in enumerate(lexical_rows):
+        k = key(row)
+        if k not in merged:
+            merged[k] = {
+                'id': None,
+                'document_id': row['document_id'],
+                'content': row['content'],
+                'metadata': row['metadata'],
+                'similarity': None,
+                'bm25': None,
+                'score': 0.0,
+            }
+        merged[k]['bm25'] = row['bm25']
+        merged[k]['score'] += 1.0 / (RRF_K + rank + 1)
+    return sorted(merged.values(), key=lambda r: r['score'], reverse=True)
+
+
+def _load_reranker():
+    """cross-encoder 모델 (RAG_RERANK_MODEL 미설정 또는 로드 실패 시 None)"""
+    global _reranker, _reranker_error
+    if not config.RAG_RERANK_MODEL or _reranker_error:
+        return None
+    if _reranker is None:
+        with _reranker_lock:
+            if _reranker is None and not _reranker_error:
+                try:
+                    from sentence_transformers import CrossEncoder
+
+                    _reranker = CrossEncoder(config.RAG_RERANK_MODEL)
+                    debug_print(f"재정렬 모델 로드: {config.RAG_RERANK_MODEL}", "SUCCESS")
+                except Exception as e:
+                    _reranker_error = str(e)
+                    debug_print(f"재정렬 모델 로드 실패(재정렬 생략): {_reranker_error}", "WARNING")
+    return _reranker
+
+
+def _rerank(query_text: str, rows: list[dict]) -> list[dict] | None:
+    model = _load_reranker()
+    if model is None or not rows:
+        return None
+    scores = model.predict([(query_text, (r.get('content') or '')[:RERANK_MAX_CHARS]) for r in rows])
+    for row, score in zip(rows, scores):
+        row['rerank_score'] = float(score)
+    return sorted(rows, key=lambda r: r['rerank_score'], reverse=True)
+
+
+def _record_timings(timings: dict):
+    with _search_stats_lock:
+        _search_stats['searches'] += 1
+        if timings['skipped']:
+            _search_stats['timeouts'] += 1
+        for stage, ms in timings.items():
+            if isinstance(ms, float):
+                total, count = _search_stats['stage_ms'].get(stage, (0.0, 0))
+                _search_stats['stage_ms'][stage] = (total + ms, count + 1)
+
+
+def hybrid_search(user_id: int, query_text: str, query_embedding: list[float] | None, match_count: int = 5, document_id: int | None = None):
+    """
+    벡터 + 키워드 검색을 순위 융합한 상위 청크 반환
+
+    반환값:
+        (rows, timings)
+        rows: [{'id', 'document_id', 'content', 'metadata', 'similarity', 'bm25', 'score', ('rerank_score')}]
+        timings: {'vector', 'lexical', 'fusion', 'rerank', 'total'} 단계별 ms (실행 안 한 단계는 None)
+                 + 'skipped': 시간 예산 초과로 결과를 버린 단계 목록
+    """
+    started = time.perf_counter()
+    deadline = started + config.RAG_SEARCH_BUDGET_MS / 1000
+    candidates = max(match_count, config.RAG_SEARCH_CANDIDATES)
+    timings = {'vector': None, 'lexical': None, 'fusion': None, 'rerank': None, 'total': None, 'skipped': []}
+
+    executor = _get_search_executor()
+    futures = {
+        'vector': executor.submit(_timed, _vector_candidates, user_id, query_embedding, candidates, document_id),
+        'lexical': executor.submit(_timed, _lexical_candidates, user_id, query_text, candidates, document_id),
+    }
+    results = {}
+    for stage, future in futures.items():
+        try:
+            results[stage], timings[stage] = future.result(timeout=max(0.0, deadline - time.perf_counter()))
+        except FutureTimeoutError:
+            # 늦게 끝난 단계는 기다리지 않습니다 (작업은 뒤에서 마저 끝나고 캐시/색인에 남습니다)
+            results[stage] = []
+            timings['skipped'].append(stage)
+        except Exception as e:
+            debug_print(f"{stage} 검색 오류: {str(e)}", "ERROR")
+            results[stage] = []
+
+    fusion_started = time.perf_counter()
+    fused = _fuse(results['vector'], results['lexical'])
+    timings['fusion'] = (time.perf_counter() - fusion_started) * 1000
+
+    rows = fused[:match_count]
+    if config.RAG_RERANK_MODEL and len(fused) > 1:
+        remaining = deadline - time.perf_counter()
+        if remaining > 0:
+            future = executor.submit(_timed, _rerank, query_text, [dict(r) for r in fused[:config.RAG_RERANK_TOP_N]])
+            try:
+                reranked, timings['rerank'] = future.result(timeout=remaining)
+                if reranked:
+                    rows = reranked[:match_count]
+            except FutureTimeoutError:
+                timings['skipped'].append('rerank')
+            except Exception as e:
+                debug_print(f"재정렬 오류: {str(e)}", "ERROR")
+        else:
+            timings['skipped'].append('rerank')
+
+    timings['total'] = (time.perf_counter() - started) * 1000
+    _record_timings(timings)
+    return rows, timings
+
+
+def get_search_stats() -> dict:
+    """
+    하이브리드 검색 단계별 평균 시간
+
+    반환값:
+        {'searches', 'timeouts', 'avg_ms': {단계: 평균 ms}}
+    """
+    with _search_stats_lock:
+        return {
+            'searches': _search_stats['searches'],
+            'timeouts': _search_stats['timeouts'],
+            'avg_ms': {stage: round(total / count, 1) for stage, (total, count) in _search_stats['stage_ms'].items()},
+        }
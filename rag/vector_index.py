@@ -0,0 +1,306 @@
+#pip install numpy
+#(선택) pip install hnswlib
+
+# ========================================
+# AI 학습 도우미 - 로컬 벡터 인덱스 (프로세스 내부)
+# ========================================
+# 사용자별 문서 청크 임베딩을 디스크(temp/vector_index)에 저장하고
+# 메모리 매핑으로 읽어 DB 호출 없이 유사도 검색을 합니다.
+# - 벡터는 정규화해서 저장 → 내적 = 코사인 유사도
+# - 청크 수가 적으면 전체 내적 후 상위 k개 (정확한 검색)
+# - RAG_LOCAL_ANN_THRESHOLD 이상이면 hnswlib(설치된 경우) 근사 검색
+# - RAG_VECTOR_QUANTIZATION이 int8/binary면 양자화 코드로 후보를 고른 뒤 float로 재채점
+# - 파일은 쓸 때마다 새 버전으로 만들고 meta.json이 현재 버전을 가리킵니다
+#   (검색 중인 메모리 매핑 파일을 덮어쓰지 않기 위함)
+# ========================================
+
+import json
+import os
+import threading
+import uuid
+
+import config
+from rag import quantize
+
+
+def debug_print(message, level="INFO"):
+    if config.DEBUG_MODE:
+        print(f"[VECTOR-INDEX-{level}] {message}")
+
+
+# ========================================
+# 사용자가 설정할 변수
+# ========================================
+
+INDEX_DIR = os.path.join(config.CURRENT_DIR, 'temp', 'vector_index')
+# HNSW 인덱스 파라미터 (값이 클수록 정확하지만 느리고 메모리를 더 씁니다)
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+# 양자화 1차 검색을 쓰기 시작하는 청크 수 (이보다 적으면 전체 float 내적이 더 빠름)
+QUANT_MIN_ROWS = 2000
+
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    import hnswlib
+except ImportError:
+    hnswlib = None
+
+
+def is_available() -> bool:
+    """numpy가 설치되어 있어야 로컬 인덱스를 쓸 수 있습니다"""
+    return np is not None
+
+
+# 사용자별로 불러온 인덱스: {user_id: {'vectors', 'codes', 'meta', 'doc_ids', 'ann'}}
+_loaded: dict[int, dict] = {}
+_lock = threading.RLock()
+
+
+def _user_dir(user_id: int) -> str:
+    return os.path.join(INDEX_DIR, f"user_{user_id}")
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (matrix / norms).astype(np.float32)
+
+
+def _load(user_id: int) -> dict | None:
+    """디스크의 인덱스를 메모리 매핑으로 불러옵니다 (없으면 None). 호출 측에서 _lock 보유"""
+    if user_id in _loaded:
+        return _loaded[user_id]
+    meta_path = os.path.join(_user_dir(user_id), 'meta.json')
+    if not os.path.exists(meta_path):
+        return None
+    with open(meta_path, 'r', encoding='utf-8') as f:
+        meta = json.load(f)
+    codes = None
+    if meta['rows']:
+        path = _user_dir(user_id)
+        vectors = np.load(os.path.join(path, meta['vectors_file']), mmap_mode='r')
+        base = meta['vectors_file'][:-len('.npy')]
+        if os.path.exists(os.path.join(path, f"{base}.bits.npy")):
+            codes = {
+                'int8': np.load(os.path.join(path, f"{base}.int8.npy"), mmap_mode='r'),
+                'scales': np.load(os.path.join(path, f"{base}.scales.npy")),
+                'bits': np.load(os.path.join(path, f"{base}.bits.npy"), mmap_mode='r'),
+            }
+    else:
+        vectors = np.zeros((0, 0), dtype=np.float32)
+    index = {
+        'vectors': vectors,
+        'codes': codes,
+        'meta': meta['rows'],
+        'doc_ids': np.array([r['document_id'] for r in meta['rows']], dtype=np.int64),
+        'ann': None,
+    }
+    _loaded[user_id] = index
+    return index
+
+
+def _write(user_id: int, vectors, rows: list[dict]):
+    """새 버전 파일로 저장한 뒤 meta.json을 교체합니다. 호출 측에서 _lock 보유"""
+    path = _user_dir(user_id)
+    os.makedirs(path, exist_ok=True)
+    base = f"vectors-{uuid.uuid4().hex[:8]}"
+    vectors_file = f"{base}.npy"
+    if rows:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        np.save(os.path.join(path, vectors_file), vectors)
+        # 양자화 코드도 함께 저장 (int8: float의 1/4, binary: 1/32 크기)
+        int8, scales = quantize.int8_codes(vectors)
+        np.save(os.path.join(path, f"{base}.int8.npy"), int8)
+        np.save(os.path.join(path, f"{base}.scales.npy"), scales)
+        np.save(os.path.join(path, f"{base}.bits.npy"), quantize.binary_codes(vectors))
+    tmp_path = os.path.join(path, 'meta.json.tmp')
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({'vectors_file': vectors_file, 'rows': rows}, f, ensure_ascii=False)
+    os.replace(tmp_path, os.path.join(path, 'meta.json'))
+    _loaded.pop(user_id, None)
+    # 이전 버전 정리 (다른 스레드가 아직 매핑 중이면 다음 저장 때 지워집니다)
+    for name in os.listdir(path):
+        if name.startswith('vectors-') and not name.startswith(f"{base}."):
+            try:
+                os.remove(os.path.join(path, name))
+            except OSError:
+                pass
+
+
+def has_index(user_id: int) -> bool:
+    """사용자 인덱스 파일이 있는지"""
+    return os.path.exists(os.path.join(_user_dir(user_id), 'meta.json'))
+
+
+def replace_document(user_id: int, document_id: int, entries: list[dict]):
+    """
+    문서 하나의 청크를 통째로 교체합니다.
+
+    매개변수:
+        entries: [{'id'(없어도 됨), 'chunk_index', 'content', 'metadata', 'embedding'}]
+    """
+    if not is_available():
+        return
+    with _lock:
+        index = _load(user_id)
+        if index is not None and index['meta']:
+            keep = index['doc_ids'] != document_id
+            old_vectors = np.asarray(index['vectors'])[keep]
+            old_rows = [r for r, k in zip(index['meta'], keep) if k]
+        else:
+            old_vectors, old_rows = None, []
+        new_rows = [
+            {
+                'id': e.get('id'),
+                'document_id': document_id,
+                'chunk_index': e.get('chunk_index'),
+                'content': e.get('content') or '',
+                'metadata': e.get('metadata') or {},
+            }
+            for e in entries
+        ]
+        if entries:
+            new_vectors = _normalize(np.array([e['embedding'] for e in entries], dtype=np.float32))
+            vectors = new_vectors if old_vectors is None or not len(old_vectors) else np.vstack([old_vectors, new_vectors])
+        else:
+            vectors = old_vectors if old_vectors is not None else np.zeros((0, 0), dtype=np.float32)
+        _write(user_id, vectors, old_rows + new_rows)
+    debug_print(f"사용자 {user_id} 문서 {document_id}: 청크 {len(entries)}개 반영", "INFO")
+
+
+def remove_document(user_id: int, document_id: int):
+    """문서 하나의 청크를 인덱스에서 제거"""
+    replace_document(user_id, document_id, [])
+
+
+def rebuild_user_index(user_id: int, rows: list[dict]):
+    """
+    사용자 인덱스 전체를 다시 만듭니다 (DB에 있던 청크로 처음 채울 때 사용)
+
+    매개변수:
+        rows: [{'id', 'document_id', 'chunk_index', 'content', 'metadata', 'embedding'}]
+    """
+    if not is_available():
+        return
+    rows = [r for r in rows if r.get('embedding') is not None]
+    with _lock:
+        meta = [
+            {
+                'id': r.get('id'),
+                'document_id': r['document_id'],
+                'chunk_index': r.get('chunk_index'),
+                'content': r.get('content') or '',
+                'metadata': r.get('metadata') or {},
+            }
+            for r in rows
+        ]
+        vectors = _normalize(np.array([r['embedding'] for r in rows], dtype=np.float32)) if rows else np.zeros((0, 0), dtype=np.float32)
+        _write(user_id, vectors, meta)
+    debug_print(f"사용자 {user_id} 인덱스 재구성: 청크 {len(rows)}개", "INFO")
+
+
+def _get_ann(index: dict):
+    """HNSW 인덱스를 만들어 둡니다 (hnswlib 미설치 또는 임계값 미만이면 None). 호출 측에서 _lock 보유"""
+    n = len(index['meta'])
+    if hnswlib is None or n < config.RAG_LOCAL_ANN_THRESHOLD:
+        return None
+    if index['ann'] is None:
+        vectors = np.asarray(index['vectors'])
+        ann = hnswlib.Index(space='ip', dim=vectors.shape[1])
+        ann.init_index(max_elements=n, ef_construction=HNSW_EF_CONSTRUCTION, M=HNSW_M)
+        ann.add_items(vectors, np.arange(n))
+        ann.set_ef(HNSW_EF_SEARCH)
+        index['ann'] = ann
+        debug_print(f"HNSW 인덱스 생성: {n}개", "INFO")
+    return index['ann']
+
+
+def _result(index: dict, i: int, score: float) -> dict:
+    row = index['meta'][i]
+    return {
+        'id': row['id'],
+        'document_id': row['document_id'],
+        'content': row['content'],
+        'metadata': row['metadata'],
+        'similarity': float(score),
+    }
+
+
+def search(user_id: int, query_embedding: list[float], match_count: int = 5, document_id: int | None = None) -> list[dict] | None:
+    """
+    유사도 상위 청크 반환 (match_document_chunks RPC와 같은 형식)
+    인덱스 파일이 없으면 None을 돌려줘 호출 측이 DB에서 채울 수 있게 합니다.
+    """
+    if not is_available():
+        return None
+    with _lock:
+        index = _load(user_id)
+        if index is None:
+            return None
+        ann = _get_ann(index)
+    n = len(index['meta'])
+    if not n or match_count <= 0:
+        return []
+    query = np.asarray(query_embedding, dtype=np.float32)
+    norm = np.linalg.norm(query)
+    if norm == 0:
+        return []
+    query = query / norm
+
+    if ann is not None:
+        # 문서 필터가 있으면 넉넉히 가져와 거른 뒤, 모자라면 정확한 검색으로 넘어갑니다
+        k = min(n, match_count if document_id is None else match_count * 8)
+        labels, distances = ann.knn_query(query, k=k)
+        results = [
+            _result(index, int(i), 1.0 - float(d))
+            for i, d in zip(labels[0], distances[0])
+            if document_id is None or index['doc_ids'][i] == document_id
+        ]
+        if len(results) >= match_count or document_id is None:
+            return results[:match_count]
+
+    candidates = np.flatnonzero(index['doc_ids'] == document_id) if document_id is not None else None
+    total = n if candidates is None else len(candidates)
+    if not total:
+        return []
+    kind = config.RAG_VECTOR_QUANTIZATION
+    if kind in ('int8', 'binary') and index['codes'] is not None and total >= QUANT_MIN_ROWS:
+        # 1차: 양자화 코드로 후보 추림 → 2차: 후보만 float 벡터로 정확히 재채점
+        rows = quantize.prefilter(kind, index['codes'], query, match_count * config.RAG_RESCORE_FACTOR, rows=candidates)
+    else:
+        rows = candidates
+    vectors = index['vectors'] if rows is None else index['vectors'][rows]
+    scores = vectors @ query
+    k = min(match_count, len(scores))
+    top = np.argpartition(-scores, k - 1)[:k]
+    top = top[np.argsort(-scores[top])]
+    return [
+        _result(index, int(i if rows is None else rows[i]), scores[i])
+        for i in top
+    ]
+
+
+def get_index_stats(user_id: int) -> dict:
+    """
+    사용자 인덱스 상태
+
+    반환값:
+        {'chunks', 'documents', 'ann'}
+    """
+    if not is_available():
+        return {'chunks': 0, 'documents': 0, 'ann': False}
+    with _lock:
+        index = _load(user_id)
+        if index is None:
+            return {'chunks': 0, 'documents': 0, 'ann': False}
+        return {
+            'chunks': len(index['meta']),
+            'documents': len(set(index['doc_ids'].tolist())),
+            'ann': index['ann'] is not None,
+        }
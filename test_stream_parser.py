@@ -0,0 +1,35 @@
+"""
+퀴즈 JSON 스트리밍 파서 테스트
+터미널에서 실행: python test_stream_parser.py (또는 pytest)
+"""
+
+from quiz.stream_parser import QuestionStreamParser
+
+
+def _feed_all(text: str, step: int = 7):
+    parser = QuestionStreamParser()
+    found = []
+    for i in range(0, len(text), step):
+        found.extend(parser.feed(text[i:i + step]))
+    return parser, found
+
+
+def test_streams_questions_in_order():
+    text = '```json\n{"questions": [{"question": "a", "answer": "1"}, {"question": "b", "answer": "2"},]}\n```'
+    parser, found = _feed_all(text)
+    assert [q['question'] for q in found] == ["a", "b"]
+    assert parser.broken == 0
+
+
+def test_mismatched_bracket_drops_only_that_question():
+    # 1번 문제의 보기 배열이 ]가 아닌 }로 닫힘 → 1번만 버리고 2, 3번은 살림
+    text = '{"questions":[{"question":"a","options":["x","y"},{"question":"b"},{"question":"c"}]}'
+    parser, found = _feed_all(text)
+    assert [q['question'] for q in found] == ["b", "c"]
+    assert parser.broken == 1
+
+
+if __name__ == "__main__":
+    test_streams_questions_in_order()
+    test_mismatched_bracket_drops_only_that_question()
+    print("✓ 스트리밍 파서 테스트 통과")